@@ -1,6 +1,12 @@
 from http.server import BaseHTTPRequestHandler
-import json
-import re
+import os
+import sys
+
+# Share the transcript helpers with the backend
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend')))
+from api.utils.body import read_json
+from api.utils.serialization import dumps
+from api.utils.video_id import parse_video_id
 
 class handler(BaseHTTPRequestHandler):
     def do_GET(self):
@@ -15,7 +21,7 @@ class handler(BaseHTTPRequestHandler):
             "method": "GET"
         }
         
-        self.wfile.write(json.dumps(response).encode())
+        self.wfile.write(dumps(response))
     
     def do_POST(self):
         self.send_response(200)
@@ -25,26 +31,19 @@ class handler(BaseHTTPRequestHandler):
         
         try:
             # Read the request body
-            content_length = int(self.headers.get('Content-Length', 0))
-            if content_length > 0:
-                post_data = self.rfile.read(content_length).decode('utf-8')
-                data = json.loads(post_data)
+            data = read_json(self)
+            if data:
                 url = data.get('url', '')
             else:
                 response = {'error': 'No data provided', 'status': 'error'}
-                self.wfile.write(json.dumps(response).encode())
+                self.wfile.write(dumps(response))
                 return
             
             # Extract video ID
-            def extract_video_id(url):
-                youtube_id_pattern = r"(?:youtube\.com\/(?:[^\/\n\s]+\/\S+\/|(?:v|e(?:mbed)?)\/|\S*?[?&]v=)|youtu\.be\/)([a-zA-Z0-9_-]{11})"
-                match = re.search(youtube_id_pattern, url)
-                return match.group(1) if match else None
-            
-            video_id = extract_video_id(url)
+            video_id = parse_video_id(url)
             if not video_id:
                 response = {'error': 'Invalid YouTube URL format', 'status': 'error'}
-                self.wfile.write(json.dumps(response).encode())
+                self.wfile.write(dumps(response))
                 return
             
             # Diagnostic information
@@ -114,14 +113,14 @@ class handler(BaseHTTPRequestHandler):
                 diagnostics['library_imported'] = False
                 diagnostics['general_error'] = str(general_error)
             
-            self.wfile.write(json.dumps(diagnostics, indent=2).encode())
+            self.wfile.write(dumps(diagnostics, pretty=True))
             
         except Exception as e:
             error_response = {
                 'error': f'Diagnostic error: {str(e)}',
                 'status': 'error'
             }
-            self.wfile.write(json.dumps(error_response).encode())
+            self.wfile.write(dumps(error_response))
     
     def do_OPTIONS(self):
         self.send_response(200)
@@ -1,19 +1,21 @@
 from http.server import BaseHTTPRequestHandler
 import json
 
+# Serialized once per instance; the body never changes
+RESPONSE = json.dumps({
+    'message': 'Hello from Python on Vercel!',
+    'status': 'success',
+    'version': '1.0.1'
+}).encode()
+
 class handler(BaseHTTPRequestHandler):
     def do_GET(self):
         self.send_response(200)
         self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(RESPONSE)))
         self.send_header('Access-Control-Allow-Origin', '*')
         self.end_headers()
-        
-        response = {
-            'message': 'Hello from Python on Vercel!', 
-            'status': 'success',
-            'version': '1.0.1'
-        }
-        self.wfile.write(json.dumps(response).encode())
+        self.wfile.write(RESPONSE)
     
     def do_OPTIONS(self):
         self.send_response(200)
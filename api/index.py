@@ -3,6 +3,19 @@ import json
 import urllib.parse
 import os
 
+# Serialized once per instance; VERCEL_ENV is fixed for its lifetime
+RESPONSE = json.dumps({
+    'status': 'success',
+    'message': 'YouTube Transcript API is running',
+    'api_endpoints': [
+        '/api/transcript_v2',
+        '/api/transcript/chunks',
+        '/api/languages_v4'
+    ],
+    'timestamp': 'July 14, 2025',
+    'environment': os.environ.get('VERCEL_ENV', 'development')
+}).encode()
+
 class handler(BaseHTTPRequestHandler):
     def _send_cors_headers(self):
         """Send CORS headers"""
@@ -19,18 +32,7 @@ class handler(BaseHTTPRequestHandler):
     def do_GET(self):
         self.send_response(200)
         self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(RESPONSE)))
         self._send_cors_headers()
         self.end_headers()
-        
-        response = {
-            'status': 'success',
-            'message': 'YouTube Transcript API is running',
-            'api_endpoints': [
-                '/api/transcript_v2',
-                '/api/languages_v4'
-            ],
-            'timestamp': 'July 14, 2025',
-            'environment': os.environ.get('VERCEL_ENV', 'development')
-        }
-        
-        self.wfile.write(json.dumps(response).encode())
+        self.wfile.write(RESPONSE)
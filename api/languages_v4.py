@@ -1,218 +1,129 @@
 from http.server import BaseHTTPRequestHandler
-import json
-import urllib.parse
-import re
+import os
+import sys
 
-def extract_video_id(url):
-    """Extract YouTube video ID from various URL formats"""
-    youtube_id_pattern = r"(?:youtube\.com\/(?:[^\/\n\s]+\/\S+\/|(?:v|e(?:mbed)?)\/|\S*?[?&]v=)|youtu\.be\/)([a-zA-Z0-9_-]{11})"
-    match = re.search(youtube_id_pattern, url)
-    return match.group(1) if match else None
+# Share the transcript helpers with the backend
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend')))
+from api.utils.routing import ANY_PATH, Router, RoutedHandlerMixin, json_body
+from api.utils.serialization import dumps
+from api.utils.video_id import parse_video_id
+from api.utils.youtube_client import get_client
+
+def get_languages(video_id):
+    """Build the languages response for a video, with fallbacks when listing fails"""
+    # Try to get languages
+    try:
+        client = get_client()
+
+        # Try to get available languages
+        transcript_list = client.list_transcripts(video_id)
+
+        languages = []
+        for transcript in transcript_list:
+            languages.append({
+                'language_code': transcript.language_code,
+                'language': transcript.language,
+                'is_generated': transcript.is_generated,
+                'is_translatable': transcript.is_translatable
+            })
+
+        return {
+            'languages': languages,
+            'video_id': video_id,
+            'status': 'success'
+        }
+
+    except Exception as e:
+        # If language listing fails, test if ANY transcript is available
+        # before providing fallback options
+        try:
+            # Try to get any available transcript to verify transcripts exist
+            test_transcript = client.get_transcript(video_id)
+            # If we get here, transcripts exist but language listing failed
+            # Provide fallback options
+            return {
+                'languages': [
+                    {'language_code': 'en', 'language': 'English (Auto-detect)', 'is_generated': True, 'is_translatable': False},
+                    {'language_code': 'es', 'language': 'Spanish', 'is_generated': True, 'is_translatable': False},
+                    {'language_code': 'fr', 'language': 'French', 'is_generated': True, 'is_translatable': False},
+                    {'language_code': 'de', 'language': 'German', 'is_generated': True, 'is_translatable': False}
+                ],
+                'video_id': video_id,
+                'status': 'fallback',
+                'note': 'Could not list specific languages. Common options provided - transcript extraction may still work.'
+            }
+        except Exception as transcript_error:
+            # No transcripts available at all
+            return {
+                'languages': [],
+                'video_id': video_id,
+                'status': 'no_transcripts',
+                'error': 'No transcripts available for this video',
+                'note': 'This video does not have any transcripts or subtitles available.'
+            }
+
+def languages_view(handler, request):
+    """Languages for ?url= (GET) or {"url": ...} (POST)"""
+    url = request.param('url') if request.method == 'GET' else request.json.get('url', '')
+
+    if not url:
+        handler.send_json({'error': 'URL parameter is required', 'status': 'error'})
+        return
+
+    # Extract video ID
+    video_id = parse_video_id(url)
+    if not video_id:
+        handler.send_json({'error': 'Invalid YouTube URL format', 'status': 'error'})
+        return
+
+    handler.send_json(get_languages(video_id))
+
+# Vercel routes every /api/languages request here, whatever the path
+router = Router()
+router.add("GET", ANY_PATH, languages_view)
+router.add("POST", ANY_PATH, languages_view, middleware=(json_body(),))
+
+class handler(RoutedHandlerMixin, BaseHTTPRequestHandler):
+    router = router
 
-class handler(BaseHTTPRequestHandler):
     def _send_cors_headers(self):
         """Send CORS headers"""
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
         self.send_header('Access-Control-Allow-Headers', 'Content-Type, X-API-Key')
 
-    def do_OPTIONS(self):
-        """Handle OPTIONS requests for CORS preflight"""
-        self.send_response(200)
+    def send_json(self, data, status_code=200):
+        """Send a JSON response with CORS headers"""
+        body = dumps(data)
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
         self._send_cors_headers()
         self.end_headers()
+        self.wfile.write(body)
 
-    def do_GET(self):
+    def reject(self, status_code, message):
+        """Like this endpoint's other errors, middleware errors are sent with a 200 (unless 5xx)"""
+        self.send_json({'error': message, 'status': 'error'}, 200 if status_code < 500 else status_code)
+
+    def _dispatch(self):
         try:
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/json')
-            self._send_cors_headers()
-            self.end_headers()
-            
-            # Parse query parameters
-            parsed_path = urllib.parse.urlparse(self.path)
-            query_params = urllib.parse.parse_qs(parsed_path.query)
-            url = query_params.get('url', [''])[0]
-            
-            if not url:
-                response = {'error': 'URL parameter is required', 'status': 'error'}
-                self.wfile.write(json.dumps(response).encode())
-                return
-            
-            # Extract video ID
-            video_id = extract_video_id(url)
-            if not video_id:
-                response = {'error': 'Invalid YouTube URL format', 'status': 'error'}
-                self.wfile.write(json.dumps(response).encode())
-                return
-            
-            # Try to get languages
-            try:
-                from youtube_transcript_api import YouTubeTranscriptApi
-                
-                # Try to get available languages
-                transcript_list = YouTubeTranscriptApi.list_transcripts(video_id)
-                
-                languages = []
-                for transcript in transcript_list:
-                    languages.append({
-                        'language_code': transcript.language_code,
-                        'language': transcript.language,
-                        'is_generated': transcript.is_generated,
-                        'is_translatable': transcript.is_translatable
-                    })
-                
-                response = {
-                    'languages': languages,
-                    'video_id': video_id,
-                    'status': 'success'
-                }
-                
-            except Exception as e:
-                # If language listing fails, test if ANY transcript is available
-                # before providing fallback options
-                try:
-                    # Try to get any available transcript to verify transcripts exist
-                    test_transcript = YouTubeTranscriptApi.get_transcript(video_id)
-                    # If we get here, transcripts exist but language listing failed
-                    # Provide fallback options
-                    response = {
-                        'languages': [
-                            {'language_code': 'en', 'language': 'English (Auto-detect)', 'is_generated': True, 'is_translatable': False},
-                            {'language_code': 'es', 'language': 'Spanish', 'is_generated': True, 'is_translatable': False},
-                            {'language_code': 'fr', 'language': 'French', 'is_generated': True, 'is_translatable': False},
-                            {'language_code': 'de', 'language': 'German', 'is_generated': True, 'is_translatable': False}
-                        ],
-                        'video_id': video_id,
-                        'status': 'fallback',
-                        'note': 'Could not list specific languages. Common options provided - transcript extraction may still work.'
-                    }
-                except Exception as transcript_error:
-                    # No transcripts available at all
-                    response = {
-                        'languages': [],
-                        'video_id': video_id,
-                        'status': 'no_transcripts',
-                        'error': 'No transcripts available for this video',
-                        'note': 'This video does not have any transcripts or subtitles available.'
-                    }
-            
-            self.wfile.write(json.dumps(response).encode())
-            
+            self.dispatch()
         except Exception as e:
             # Last resort error handling
             try:
-                self.send_response(500)
-                self.send_header('Content-Type', 'application/json')
-                self.send_header('Access-Control-Allow-Origin', '*')
-                self.end_headers()
-                error_response = {'error': f'Server error: {str(e)}', 'status': 'error'}
-                self.wfile.write(json.dumps(error_response).encode())
+                self.reject(500, f'Server error: {str(e)}')
             except:
                 pass
-    
+
+    def do_GET(self):
+        self._dispatch()
+
     def do_POST(self):
-        try:
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            
-            # Parse POST data
-            content_length = int(self.headers.get('Content-Length', 0))
-            if content_length > 0:
-                post_data = json.loads(self.rfile.read(content_length).decode('utf-8'))
-                url = post_data.get('url', '')
-            else:
-                response = {'error': 'No data provided', 'status': 'error'}
-                self.wfile.write(json.dumps(response).encode())
-                return
-            
-            if not url:
-                response = {'error': 'URL parameter is required', 'status': 'error'}
-                self.wfile.write(json.dumps(response).encode())
-                return
-            
-            # Extract video ID
-            if 'youtu.be/' in url:
-                video_id = url.split('youtu.be/')[1].split('?')[0]
-            elif 'youtube.com/watch?v=' in url:
-                video_id = url.split('v=')[1].split('&')[0]
-            elif 'youtube.com/embed/' in url:
-                video_id = url.split('embed/')[1].split('?')[0]
-            else:
-                response = {'error': 'Invalid YouTube URL format', 'status': 'error'}
-                self.wfile.write(json.dumps(response).encode())
-                return
-            
-            # Try to get languages
-            try:
-                from youtube_transcript_api import YouTubeTranscriptApi
-                
-                # Try to get available languages
-                transcript_list = YouTubeTranscriptApi.list_transcripts(video_id)
-                
-                languages = []
-                for transcript in transcript_list:
-                    languages.append({
-                        'language_code': transcript.language_code,
-                        'language': transcript.language,
-                        'is_generated': transcript.is_generated,
-                        'is_translatable': transcript.is_translatable
-                    })
-                
-                response = {
-                    'languages': languages,
-                    'video_id': video_id,
-                    'status': 'success'
-                }
-                
-            except Exception as e:
-                # If language listing fails, test if ANY transcript is available
-                # before providing fallback options
-                try:
-                    # Try to get any available transcript to verify transcripts exist
-                    test_transcript = YouTubeTranscriptApi.get_transcript(video_id)
-                    # If we get here, transcripts exist but language listing failed
-                    # Provide fallback options
-                    response = {
-                        'languages': [
-                            {'language_code': 'en', 'language': 'English (Auto-detect)', 'is_generated': True, 'is_translatable': False},
-                            {'language_code': 'es', 'language': 'Spanish', 'is_generated': True, 'is_translatable': False},
-                            {'language_code': 'fr', 'language': 'French', 'is_generated': True, 'is_translatable': False},
-                            {'language_code': 'de', 'language': 'German', 'is_generated': True, 'is_translatable': False}
-                        ],
-                        'video_id': video_id,
-                        'status': 'fallback',
-                        'note': 'Could not list specific languages. Common options provided - transcript extraction may still work.'
-                    }
-                except Exception as transcript_error:
-                    # No transcripts available at all
-                    response = {
-                        'languages': [],
-                        'video_id': video_id,
-                        'status': 'no_transcripts',
-                        'error': 'No transcripts available for this video',
-                        'note': 'This video does not have any transcripts or subtitles available.'
-                    }
-            
-            self.wfile.write(json.dumps(response).encode())
-            
-        except Exception as e:
-            # Last resort error handling
-            try:
-                self.send_response(500)
-                self.send_header('Content-Type', 'application/json')
-                self.send_header('Access-Control-Allow-Origin', '*')
-                self.end_headers()
-                error_response = {'error': f'Server error: {str(e)}', 'status': 'error'}
-                self.wfile.write(json.dumps(error_response).encode())
-            except:
-                pass
-    
+        self._dispatch()
+
     def do_OPTIONS(self):
+        """Handle OPTIONS requests for CORS preflight"""
         self.send_response(200)
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type, X-API-Key')
+        self._send_cors_headers()
         self.end_headers()
@@ -1,6 +1,13 @@
 from http.server import BaseHTTPRequestHandler
-import json
 import logging
+import os
+import sys
+
+# Share the transcript helpers with the backend
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend')))
+from api.utils.body import read_json
+from api.utils.serialization import dumps
+from api.utils.video_id import parse_video_id
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -47,7 +54,7 @@ class handler(BaseHTTPRequestHandler):
             "instructions": "POST to this endpoint with 'auto_test': true to run tests"
         }
         
-        self.wfile.write(json.dumps(response, indent=2).encode())
+        self.wfile.write(dumps(response, pretty=True))
     
     def do_POST(self):
         self.send_response(200)
@@ -57,12 +64,7 @@ class handler(BaseHTTPRequestHandler):
         
         try:
             # Read the request body
-            content_length = int(self.headers.get('Content-Length', 0))
-            if content_length > 0:
-                post_data = self.rfile.read(content_length).decode('utf-8')
-                data = json.loads(post_data)
-            else:
-                data = {}
+            data = read_json(self) or {}
             
             if data.get('auto_test', False):
                 # Run automatic tests with known videos
@@ -71,18 +73,18 @@ class handler(BaseHTTPRequestHandler):
                 # Test specific video
                 url = data.get('url', '')
                 if not url:
-                    self.wfile.write(json.dumps({"error": "URL required"}).encode())
+                    self.wfile.write(dumps({"error": "URL required"}))
                     return
                 results = self.test_single_video(url)
             
-            self.wfile.write(json.dumps(results, indent=2).encode())
+            self.wfile.write(dumps(results, pretty=True))
             
         except Exception as e:
             error_response = {
                 'error': f'Test error: {str(e)}',
                 'status': 'error'
             }
-            self.wfile.write(json.dumps(error_response).encode())
+            self.wfile.write(dumps(error_response))
     
     def run_transcript_tests(self):
         """Test multiple known videos that should have transcripts"""
@@ -175,17 +177,14 @@ class handler(BaseHTTPRequestHandler):
         """Test a single video URL"""
         try:
             from youtube_transcript_api import YouTubeTranscriptApi
-            import re
         except ImportError as e:
             return {"error": f"Import failed: {str(e)}", "library_available": False}
         
         # Extract video ID
-        video_id_match = re.search(r"(?:v=|\/)([0-9A-Za-z_-]{11})", url)
-        if not video_id_match:
+        video_id = parse_video_id(url)
+        if not video_id:
             return {"error": "Invalid YouTube URL", "url": url}
         
-        video_id = video_id_match.group(1)
-        
         result = {
             "url": url,
             "video_id": video_id,
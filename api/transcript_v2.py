@@ -1,8 +1,19 @@
 from http.server import BaseHTTPRequestHandler
-import json
-import urllib.parse
 import os
-import re
+import sys
+
+# Share the transcript helpers with the backend
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend')))
+from api.utils.formatting import GROUPINGS
+from api.utils.routing import ANY_PATH, Router, RoutedHandlerMixin, json_body, require_api_key
+from api.utils.segments import (
+    check_string_params, chunks_response, parse_chunking, parse_languages, parse_translate_to, parse_window, transcript_body,
+    transcript_cache, window_response
+)
+from api.utils.serialization import dumps
+from api.utils.transcript_utils import fetch_languages, fetch_translations
+from api.utils.video_id import parse_video_id
+from api.utils.youtube_client import get_client
 
 # Simple security configuration
 REQUIRE_API_KEY = os.environ.get('REQUIRE_API_KEY', 'false').lower() == 'true'
@@ -12,240 +23,261 @@ VALID_API_KEYS = [
     'vercel-production-key'    # Default for testing
 ]
 
-def extract_video_id(url):
-    """Extract YouTube video ID from various URL formats"""
-    youtube_id_pattern = r"(?:youtube\.com\/(?:[^\/\n\s]+\/\S+\/|(?:v|e(?:mbed)?)\/|\S*?[?&]v=)|youtu\.be\/)([a-zA-Z0-9_-]{11})"
-    match = re.search(youtube_id_pattern, url)
-    return match.group(1) if match else None
-
 def get_transcript(video_id, language=None):
-    """Get transcript for a YouTube video"""
+    """Get transcript for a YouTube video, cached for later requests to this instance"""
+    if language == 'auto':
+        language = None
+    transcript = transcript_cache.get(video_id, language)
+    if transcript is not None:
+        return transcript
+    
+    # Imported on first use and shared by later requests to this instance
+    client = get_client()
+    
+    # If language is specified, try that first
+    if language:
+        try:
+            segments = client.get_transcript(video_id, [language])
+        except Exception:
+            # Fallback to default transcript
+            segments = client.get_transcript(video_id)
+    else:
+        segments = client.get_transcript(video_id)
+    
+    return transcript_cache.add(video_id, language, segments)
+
+def get_transcripts(video_id, language, targets):
+    """
+    The transcript keyed by None, or with translate_to its translations keyed
+    by target language (fetched concurrently, each cached on its own)
+    """
+    if targets is None:
+        return {None: get_transcript(video_id, language)}
+    return fetch_translations(video_id, targets, None if language == 'auto' else language)
+
+def success_response(bodies, video_id, language):
+    """One response body as is, or several under 'translations'"""
+    if len(bodies) == 1:
+        (response,) = bodies.values()
+    else:
+        response = {'video_id': video_id, 'translations': bodies}
+    response['language'] = language or 'auto'
+    response['status'] = 'success'
+    return response
+
+def transcript_error_response(video_id, error):
+    """Error body for a failed transcript fetch (sent with a 200)"""
+    error_str = str(error)
+    error_lower = error_str.lower()
+    
+    status = "error"
+    
+    if "could not retrieve a transcript" in error_lower or "subtitles are disabled" in error_lower:
+        status = "no_transcripts"
+    
+    return {
+        'error': error_str,
+        'video_id': video_id,
+        'status': status
+    }
+
+def transcript_view(handler, request):
+    """
+    Transcript for ?url=&language= (GET) or {"url", "language"} (POST)
+
+    start=/end= (seconds) and offset=/limit= (segments) return just the
+    matching segments instead of the whole text; group=sentences or
+    group=paragraphs merges the captions into larger blocks first.
+    translate_to=fr (or fr,de) returns machine translations instead, and
+    languages=en,es,de several tracks keyed by language.
+    """
+    if request.method == 'GET':
+        get = lambda name: request.param(name, None)
+        url = request.param('url')
+        language = request.param('language', None)
+        # GET reports validation errors in the body with a 200
+        invalid_status = 200
+    else:
+        get = request.json.get
+        url = request.json.get('url', '')
+        # Default to None so that default get_transcript is used when no explicit language
+        language = request.json.get('language')
+        invalid_status = 400
+    
     try:
-        from youtube_transcript_api import YouTubeTranscriptApi
-        
-        # If language is specified, try that first
-        if language and language != 'auto':
-            try:
-                transcript = YouTubeTranscriptApi.get_transcript(video_id, languages=[language])
-            except Exception:
-                # Fallback to default transcript
-                transcript = YouTubeTranscriptApi.get_transcript(video_id)
+        check_string_params(get, ('url', 'language', 'group'))
+    except ValueError as e:
+        handler.send_json({'error': str(e), 'status': 'error'}, invalid_status)
+        return
+    if not url:
+        handler.send_json({'error': 'URL parameter is required', 'status': 'error'}, invalid_status)
+        return
+    
+    grouping = get('group') or None
+    if grouping is not None and grouping not in GROUPINGS:
+        handler.send_json({'error': f"Invalid group: must be one of {', '.join(GROUPINGS)}", 'status': 'error'}, invalid_status)
+        return
+    
+    try:
+        window = parse_window(get)
+    except ValueError as e:
+        handler.send_json({'error': f'Invalid transcript window: {str(e)}', 'status': 'error'}, invalid_status)
+        return
+    try:
+        targets = parse_translate_to(get('translate_to'))
+        languages = parse_languages(get('languages'))
+    except ValueError as e:
+        handler.send_json({'error': str(e), 'status': 'error'}, invalid_status)
+        return
+    if languages is not None and targets is not None:
+        handler.send_json({'error': "languages can't be combined with translate_to", 'status': 'error'}, invalid_status)
+        return
+    
+    # Extract video ID
+    video_id = parse_video_id(url)
+    if not video_id:
+        handler.send_json({'error': 'Invalid YouTube URL format', 'status': 'error'}, invalid_status)
+        return
+    
+    if languages is not None:
+        send_languages(handler, video_id, languages, grouping, window)
+        return
+    
+    # Get transcript
+    try:
+        transcripts = get_transcripts(video_id, language, targets)
+    except Exception as e:
+        # Always return 200 for API responses
+        handler.send_json(transcript_error_response(video_id, e))
+        return
+    
+    bodies = {}
+    for target, transcript in transcripts.items():
+        if grouping is not None:
+            transcript = transcript.grouped(grouping)
+        if window is not None:
+            bodies[target] = window_response(transcript, window)
         else:
-            transcript = YouTubeTranscriptApi.get_transcript(video_id)
-            
-        # Format transcript
-        transcript_text = '\n'.join([f"[{int(entry['start'] // 60)}:{int(entry['start'] % 60):02d}] {entry['text']}" for entry in transcript])
-        return transcript_text
+            bodies[target] = {'transcript': transcript.text, 'video_id': video_id}
+            if target:
+                bodies[target]['translation'] = target
+    handler.send_json(success_response(bodies, video_id, language))
+
+def send_languages(handler, video_id, languages, grouping, window):
+    """The transcript in each of several languages, keyed by language, with per-language errors"""
+    try:
+        transcripts, errors = fetch_languages(video_id, languages)
     except Exception as e:
-        raise e
+        handler.send_json(transcript_error_response(video_id, e))
+        return
+    
+    bodies = {}
+    for code, transcript in transcripts.items():
+        if grouping is not None:
+            transcript = transcript.grouped(grouping)
+        bodies[code] = transcript_body(transcript, window)
+    bodies.update((code, {'error': message}) for code, message in errors.items())
+    handler.send_json({'video_id': video_id, 'languages': bodies, 'status': 'success'})
 
-class handler(BaseHTTPRequestHandler):
-    def _validate_access(self):
-        """Simple access validation"""
-        if not REQUIRE_API_KEY:
-            return True
-        
-        # Check for API key in headers
-        api_key = self.headers.get('X-API-Key')
-        if api_key and api_key in VALID_API_KEYS:
-            return True
-        
-        # Check for API key in Authorization header
-        auth_header = self.headers.get('Authorization', '')
-        if auth_header.startswith('Bearer '):
-            token = auth_header[7:]
-            if token in VALID_API_KEYS:
-                return True
-        
-        return False
+def chunks_view(handler, request):
+    """
+    Transcript split into overlapping chunks (/api/transcript/chunks)
+
+    Takes url, language and translate_to like transcript_view, plus size,
+    overlap and unit ("tokens" or "chars").
+    """
+    if request.method == 'GET':
+        get = lambda name: request.param(name, None)
+        invalid_status = 200
+    else:
+        get = request.json.get
+        invalid_status = 400
+    try:
+        check_string_params(get, ('url', 'language', 'unit'))
+    except ValueError as e:
+        handler.send_json({'error': str(e), 'status': 'error'}, invalid_status)
+        return
+    url = get('url') or ''
+    language = get('language')
+    
+    if not url:
+        handler.send_json({'error': 'URL parameter is required', 'status': 'error'}, invalid_status)
+        return
+    try:
+        chunking = parse_chunking(get)
+    except ValueError as e:
+        handler.send_json({'error': f'Invalid chunking: {str(e)}', 'status': 'error'}, invalid_status)
+        return
+    try:
+        targets = parse_translate_to(get('translate_to'))
+    except ValueError as e:
+        handler.send_json({'error': str(e), 'status': 'error'}, invalid_status)
+        return
+    
+    video_id = parse_video_id(url)
+    if not video_id:
+        handler.send_json({'error': 'Invalid YouTube URL format', 'status': 'error'}, invalid_status)
+        return
+    
+    try:
+        transcripts = get_transcripts(video_id, language, targets)
+    except Exception as e:
+        handler.send_json(transcript_error_response(video_id, e))
+        return
+    
+    bodies = {target: chunks_response(transcript, chunking) for target, transcript in transcripts.items()}
+    handler.send_json(success_response(bodies, video_id, language))
+
+# Vercel routes every /api/transcript_v2 request here, whatever the path, and
+# /api/transcript/chunks
+access_checked = require_api_key(VALID_API_KEYS, "Unauthorized access") if REQUIRE_API_KEY else None
+router = Router()
+router.add("GET", "/api/transcript/chunks", chunks_view, middleware=(access_checked,))
+router.add("POST", "/api/transcript/chunks", chunks_view, middleware=(access_checked, json_body()))
+router.add("GET", ANY_PATH, transcript_view, middleware=(access_checked,))
+router.add("POST", ANY_PATH, transcript_view, middleware=(access_checked, json_body()))
+
+class handler(RoutedHandlerMixin, BaseHTTPRequestHandler):
+    router = router
     
     def _send_cors_headers(self):
         """Send CORS headers"""
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
         self.send_header('Access-Control-Allow-Headers', 'Content-Type, X-API-Key, Authorization')
-
-    def do_OPTIONS(self):
-        """Handle OPTIONS requests for CORS preflight"""
-        self.send_response(200)
+    
+    def send_json(self, data, status_code=200):
+        """Send a JSON response with CORS headers"""
+        body = dumps(data)
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
         self._send_cors_headers()
         self.end_headers()
+        self.wfile.write(body)
     
-    def do_GET(self):
+    def reject(self, status_code, message):
+        """Answer a request stopped by middleware (auth, bad body)"""
+        self.send_json({'error': message, 'status': 'error'}, status_code)
+    
+    def _dispatch(self):
         try:
-            # Check access
-            if not self._validate_access():
-                self.send_response(401)
-                self.send_header('Content-Type', 'application/json')
-                self._send_cors_headers()
-                self.end_headers()
-                self.wfile.write(json.dumps({"error": "Unauthorized access", "status": "error"}).encode())
-                return
-
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/json')
-            self._send_cors_headers()
-            self.end_headers()
-            
-            # Parse query parameters
-            parsed_path = urllib.parse.urlparse(self.path)
-            query_params = urllib.parse.parse_qs(parsed_path.query)
-            url = query_params.get('url', [''])[0]
-            language = query_params.get('language', [None])[0]
-            
-            if not url:
-                response = {'error': 'URL parameter is required', 'status': 'error'}
-                self.wfile.write(json.dumps(response).encode())
-                return
-            
-            # Extract video ID
-            video_id = extract_video_id(url)
-            if not video_id:
-                response = {'error': 'Invalid YouTube URL format', 'status': 'error'}
-                self.wfile.write(json.dumps(response).encode())
-                return
-
-            # Get transcript
-            try:
-                transcript = get_transcript(video_id, language)
-                
-                response = {
-                    'transcript': transcript,
-                    'video_id': video_id,
-                    'language': language or 'auto',
-                    'status': 'success'
-                }
-            except Exception as e:
-                # Format error message
-                error_str = str(e)
-                error_lower = error_str.lower()
-                
-                status = "error"
-                
-                if "could not retrieve a transcript" in error_lower or "subtitles are disabled" in error_lower:
-                    status = "no_transcripts"
-                
-                response = {
-                    'error': error_str,
-                    'video_id': video_id,
-                    'status': status
-                }
-            
-            self.wfile.write(json.dumps(response).encode())
-            
+            self.dispatch()
         except Exception as e:
             # Last resort error handling
             try:
-                self.send_response(500)
-                self.send_header('Content-Type', 'application/json')
-                self._send_cors_headers()
-                self.end_headers()
-                error_response = {'error': f'Server error: {str(e)}', 'status': 'error'}
-                self.wfile.write(json.dumps(error_response).encode())
+                self.reject(500, f'Server error: {str(e)}')
             except:
                 pass
+
+    def do_OPTIONS(self):
+        """Handle OPTIONS requests for CORS preflight"""
+        self.send_response(200)
+        self._send_cors_headers()
+        self.end_headers()
+    
+    def do_GET(self):
+        self._dispatch()
     
     def do_POST(self):
-        try:
-            # Check access
-            if not self._validate_access():
-                self.send_response(401)
-                self.send_header('Content-Type', 'application/json')
-                self._send_cors_headers()
-                self.end_headers()
-                self.wfile.write(json.dumps({"error": "Unauthorized access", "status": "error"}).encode())
-                return
-            
-            # Parse POST data
-            content_length = int(self.headers.get('Content-Length', 0))
-            if content_length > 0:
-                post_data = json.loads(self.rfile.read(content_length).decode('utf-8'))
-                url = post_data.get('url', '')
-                # Default to None so that default get_transcript is used when no explicit language
-                language = post_data.get('language')
-            else:
-                self.send_response(400)
-                self.send_header('Content-Type', 'application/json')
-                self._send_cors_headers()
-                self.end_headers()
-                response = {'error': 'No data provided', 'status': 'error'}
-                self.wfile.write(json.dumps(response).encode())
-                return
-            
-            if not url:
-                self.send_response(400)
-                self.send_header('Content-Type', 'application/json')
-                self._send_cors_headers()
-                self.end_headers()
-                response = {'error': 'URL parameter is required', 'status': 'error'}
-                self.wfile.write(json.dumps(response).encode())
-                return
-            
-            # Extract video ID
-            video_id = extract_video_id(url)
-            if not video_id:
-                self.send_response(400)
-                self.send_header('Content-Type', 'application/json')
-                self._send_cors_headers()
-                self.end_headers()
-                response = {'error': 'Invalid YouTube URL format', 'status': 'error'}
-                self.wfile.write(json.dumps(response).encode())
-                return
-            
-            # Get transcript
-            try:
-                transcript = get_transcript(video_id, language)
-                
-                # Send successful response
-                self.send_response(200)
-                self.send_header('Content-Type', 'application/json')
-                self._send_cors_headers()
-                self.end_headers()
-                
-                response = {
-                    'transcript': transcript,
-                    'video_id': video_id,
-                    'language': language or 'auto',
-                    'status': 'success'
-                }
-                self.wfile.write(json.dumps(response).encode())
-                
-            except Exception as e:
-                # Format error message
-                error_str = str(e)
-                error_lower = error_str.lower()
-                
-                status_code = 200  # Always return 200 for API responses
-                status = "error"
-                
-                if "could not retrieve a transcript" in error_lower or "subtitles are disabled" in error_lower:
-                    status = "no_transcripts"
-                
-                # Send error response with 200 status
-                self.send_response(status_code)
-                self.send_header('Content-Type', 'application/json')
-                self._send_cors_headers()
-                self.end_headers()
-                
-                error_response = {
-                    'error': error_str,
-                    'video_id': video_id,
-                    'status': status
-                }
-                self.wfile.write(json.dumps(error_response).encode())
-                
-        except Exception as e:
-            # General error handling
-            try:
-                self.send_response(500)
-                self.send_header('Content-Type', 'application/json')
-                self._send_cors_headers()
-                self.end_headers()
-                
-                error_response = {
-                    'error': f'Server error: {str(e)}',
-                    'status': 'error'
-                }
-                self.wfile.write(json.dumps(error_response).encode())
-            except:
-                pass
+        self._dispatch()
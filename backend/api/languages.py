@@ -14,12 +14,16 @@ from config import config
 
 # Import transcript utilities
 from api.utils.transcript_utils import get_available_languages
-from youtube_transcript_api._errors import TranscriptsDisabled, NoTranscriptFound, VideoUnavailable
+from api.utils.referrers import ReferrerMatcher
+from api.utils.youtube_client import get_client
 
 # Configure logging
 logging.basicConfig(level=getattr(logging, config["LOG_LEVEL"]))
 logger = logging.getLogger(__name__)
 
+# ALLOWED_REFERRERS compiled once, not re-scanned per request
+referrer_matcher = ReferrerMatcher(config["ALLOWED_REFERRERS"])
+
 # For rate limiting
 rate_limits = {}
 last_cleanup = time.time()
@@ -91,27 +95,11 @@ class Handler(BaseHTTPRequestHandler):
                 return
         
         # Verify referrer if allowed referrers are specified
-        if config["ALLOWED_REFERRERS"] and config["ALLOWED_REFERRERS"] != ["*"]:
-            referrer = self.headers.get('Referer', '')
-            valid_referrer = False
-            
-            if referrer:
-                referrer_host = referrer.split('/')[2] if '://' in referrer else referrer
-                
-                for allowed in config["ALLOWED_REFERRERS"]:
-                    # Handle wildcard subdomains
-                    if allowed.startswith('*.') and referrer_host.endswith(allowed[1:]):
-                        valid_referrer = True
-                        break
-                    # Direct match
-                    elif allowed == referrer_host:
-                        valid_referrer = True
-                        break
-            
-            if not valid_referrer:
-                logger.warning(f"Invalid referrer: {referrer} from IP: {client_ip}")
-                self._send_error(403, "Forbidden - Invalid referrer")
-                return
+        referrer = self.headers.get('Referer', '')
+        if not referrer_matcher.allows(referrer):
+            logger.warning(f"Invalid referrer: {referrer} from IP: {client_ip}")
+            self._send_error(403, "Forbidden - Invalid referrer")
+            return
             
         # Parse query parameters
         query_components = urllib.parse.parse_qs(urllib.parse.urlparse(self.path).query)
@@ -122,6 +110,7 @@ class Handler(BaseHTTPRequestHandler):
             return
         
         logger.info(f"Processing request for languages, URL: {url}")
+        client = get_client()
         
         try:
             languages = get_available_languages(url)
@@ -130,11 +119,11 @@ class Handler(BaseHTTPRequestHandler):
             # This catches our custom error messages
             logger.error(f"Value error: {str(ve)}")
             self._send_error(400, str(ve))
-        except (TranscriptsDisabled, NoTranscriptFound) as e:
+        except (client.TranscriptsDisabled, client.NoTranscriptFound) as e:
             # This is a fallback for any transcript errors that weren't converted to ValueError
             logger.error(f"Transcript not available: {str(e)}")
             self._send_error(404, "Transcripts not available for this video")
-        except VideoUnavailable as e:
+        except client.VideoUnavailable as e:
             logger.error(f"Video unavailable: {str(e)}")
             self._send_error(400, "This video is unavailable or does not exist")
         except Exception as e:
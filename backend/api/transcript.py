@@ -12,13 +12,18 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 from config import config
 
 # Import transcript utilities
+from api.utils.body import BodyError, read_json
 from api.utils.transcript_utils import get_transcript_text
-from youtube_transcript_api._errors import TranscriptsDisabled, NoTranscriptFound, VideoUnavailable
+from api.utils.referrers import ReferrerMatcher
+from api.utils.youtube_client import get_client
 
 # Configure logging
 logging.basicConfig(level=getattr(logging, config["LOG_LEVEL"]))
 logger = logging.getLogger(__name__)
 
+# ALLOWED_REFERRERS compiled once, not re-scanned per request
+referrer_matcher = ReferrerMatcher(config["ALLOWED_REFERRERS"])
+
 # For rate limiting
 rate_limits = {}
 last_cleanup = time.time()
@@ -90,33 +95,22 @@ class Handler(BaseHTTPRequestHandler):
                 return
         
         # Verify referrer if allowed referrers are specified
-        if config["ALLOWED_REFERRERS"] and config["ALLOWED_REFERRERS"] != ["*"]:
-            referrer = self.headers.get('Referer', '')
-            valid_referrer = False
-            
-            if referrer:
-                referrer_host = referrer.split('/')[2] if '://' in referrer else referrer
-                
-                for allowed in config["ALLOWED_REFERRERS"]:
-                    # Handle wildcard subdomains
-                    if allowed.startswith('*.') and referrer_host.endswith(allowed[1:]):
-                        valid_referrer = True
-                        break
-                    # Direct match
-                    elif allowed == referrer_host:
-                        valid_referrer = True
-                        break
-            
-            if not valid_referrer:
-                logger.warning(f"Invalid referrer: {referrer} from IP: {client_ip}")
-                self._send_error(403, "Forbidden - Invalid referrer")
-                return
+        referrer = self.headers.get('Referer', '')
+        if not referrer_matcher.allows(referrer):
+            logger.warning(f"Invalid referrer: {referrer} from IP: {client_ip}")
+            self._send_error(403, "Forbidden - Invalid referrer")
+            return
             
-        content_length = int(self.headers['Content-Length'])
-        post_data = self.rfile.read(content_length)
+        try:
+            request_data = read_json(self, config["MAX_BODY_BYTES"], config["BODY_READ_TIMEOUT"]) or {}
+        except BodyError as e:
+            self._send_error(e.status_code, e.message)
+            return
+        if not isinstance(request_data, dict):
+            self._send_error(400, "Invalid JSON")
+            return
         
         try:
-            request_data = json.loads(post_data.decode('utf-8'))
             url = request_data.get('url', '')
             language_code = request_data.get('language', None)
             
@@ -125,6 +119,7 @@ class Handler(BaseHTTPRequestHandler):
                 return
             
             logger.info(f"Processing request for URL: {url}, Language: {language_code or 'auto'}")
+            client = get_client()
             
             try:
                 transcript_text = get_transcript_text(url, language_code)
@@ -133,19 +128,17 @@ class Handler(BaseHTTPRequestHandler):
                 # This catches our custom error messages
                 logger.error(f"Value error: {str(ve)}")
                 self._send_error(400, str(ve))
-            except (TranscriptsDisabled, NoTranscriptFound) as e:
+            except (client.TranscriptsDisabled, client.NoTranscriptFound) as e:
                 # This is a fallback for any transcript errors that weren't converted to ValueError
                 logger.error(f"Transcript not available: {str(e)}")
                 self._send_error(404, "Transcript not available for this video")
-            except VideoUnavailable as e:
+            except client.VideoUnavailable as e:
                 logger.error(f"Video unavailable: {str(e)}")
                 self._send_error(400, "This video is unavailable or does not exist")
             except Exception as e:
                 logger.error(f"Unexpected error: {str(e)}", exc_info=True)
                 self._send_error(500, "An error occurred while processing your request")
                 
-        except json.JSONDecodeError:
-            self._send_error(400, "Invalid JSON")
         except Exception as e:
             logger.error(f"Server error: {str(e)}", exc_info=True)
             self._send_error(500, f"Server error: {str(e)}")
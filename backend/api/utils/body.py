@@ -0,0 +1,148 @@
+import codecs
+import json
+import socket
+
+# Defaults for handlers without a config (the Vercel functions)
+MAX_BODY_BYTES = 1024 * 1024
+BODY_READ_TIMEOUT = 10.0
+# Bodies are read in pieces of this size, so a slow or lying client costs at
+# most one chunk of memory before it is cut off
+CHUNK_SIZE = 64 * 1024
+
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/jsonl", "application/json-lines")
+
+
+class BodyError(Exception):
+    """A request body that can't be accepted, with the status to answer with."""
+
+    def __init__(self, status_code, message):
+        super().__init__(message)
+        self.status_code = status_code
+        self.message = message
+
+
+def content_length(headers, max_bytes=MAX_BODY_BYTES):
+    """
+    Validated Content-Length of a request
+
+    Raises:
+        BodyError: 411 for chunked bodies (http.server can't decode them),
+            400 for a malformed length, 413 when it is over max_bytes
+    """
+    if 'chunked' in headers.get('Transfer-Encoding', '').lower():
+        raise BodyError(411, "Content-Length required")
+    value = headers.get('Content-Length')
+    if not value:
+        return 0
+    try:
+        length = int(value)
+    except ValueError:
+        raise BodyError(400, "Invalid Content-Length")
+    if length < 0:
+        raise BodyError(400, "Invalid Content-Length")
+    if length > max_bytes:
+        raise BodyError(413, f"Request body too large (limit is {max_bytes} bytes)")
+    return length
+
+
+def iter_body(handler, max_bytes=MAX_BODY_BYTES, timeout=BODY_READ_TIMEOUT):
+    """
+    Yield the request body in chunks of at most CHUNK_SIZE bytes
+
+    The length is checked before anything is read, and every read waits at
+    most ``timeout`` seconds. On any BodyError the connection is marked to
+    close, since the rest of the body is left unread.
+
+    Raises:
+        BodyError: See content_length(); also 400 for a body shorter than
+            its Content-Length and 408 when a read times out
+    """
+    try:
+        remaining = content_length(handler.headers, max_bytes)
+    except BodyError:
+        handler.close_connection = True
+        raise
+    if not remaining:
+        return
+
+    connection = getattr(handler, 'connection', None)
+    previous_timeout = connection.gettimeout() if connection is not None else None
+    if connection is not None and timeout is not None:
+        connection.settimeout(timeout)
+    try:
+        while remaining:
+            try:
+                chunk = handler.rfile.read(min(remaining, CHUNK_SIZE))
+            except (socket.timeout, TimeoutError):
+                handler.close_connection = True
+                raise BodyError(408, "Timed out reading the request body")
+            if not chunk:
+                handler.close_connection = True
+                raise BodyError(400, "Request body shorter than Content-Length")
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        if connection is not None and timeout is not None:
+            connection.settimeout(previous_timeout)
+
+
+def read_body(handler, max_bytes=MAX_BODY_BYTES, timeout=BODY_READ_TIMEOUT):
+    """The whole request body as bytes, read with iter_body()'s limits."""
+    return b''.join(iter_body(handler, max_bytes, timeout))
+
+
+def iter_json_lines(chunks):
+    """
+    Decode newline-delimited JSON as it arrives, one value per line
+
+    Only the current partial line is buffered, so a large batch never has
+    to be held as one string before it is parsed.
+
+    Raises:
+        BodyError: 400 for invalid UTF-8 or a line that isn't valid JSON
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    pending = ''
+    try:
+        for chunk in chunks:
+            lines = (pending + decoder.decode(chunk)).split('\n')
+            pending = lines.pop()
+            for line in lines:
+                if line.strip():
+                    yield json.loads(line)
+        pending += decoder.decode(b'', final=True)
+        if pending.strip():
+            yield json.loads(pending)
+    except (UnicodeDecodeError, json.JSONDecodeError):
+        raise BodyError(400, "Invalid JSON")
+
+
+def read_json(handler, max_bytes=MAX_BODY_BYTES, timeout=BODY_READ_TIMEOUT, lines=False):
+    """
+    Read and decode a JSON request body
+
+    Args:
+        handler: http.server request handler
+        max_bytes (int): Largest accepted body
+        timeout (float): Seconds each read may wait
+        lines (bool): Also accept newline-delimited JSON (by Content-Type),
+            decoded incrementally into a list
+
+    Returns:
+        The decoded value, or None for an empty body
+
+    Raises:
+        BodyError: For anything read_body() rejects, or invalid JSON
+    """
+    chunks = iter_body(handler, max_bytes, timeout)
+    content_type = handler.headers.get('Content-Type', '').split(';', 1)[0].strip().lower()
+    if lines and content_type in NDJSON_CONTENT_TYPES:
+        items = list(iter_json_lines(chunks))
+        return items if items else None
+    body = b''.join(chunks)
+    if not body:
+        return None
+    try:
+        return json.loads(body)
+    except (UnicodeDecodeError, json.JSONDecodeError):
+        raise BodyError(400, "Invalid JSON")
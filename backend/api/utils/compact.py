@@ -0,0 +1,105 @@
+from array import array
+from collections.abc import Sequence
+from itertools import islice
+
+
+class CompactSegments(Sequence):
+    """
+    Transcript segments stored column-wise instead of as a list of dicts
+
+    Start times and durations are kept in array('d') columns and the texts
+    in one UTF-8 buffer with an array of offsets, about 20 bytes per
+    segment plus its text, where a dict per segment with its own str and
+    float objects costs several hundred. Reading a segment, by index or
+    iteration, builds the same {'text', 'start', 'duration'} dict the
+    library returns, so code written for lists of dicts works unchanged;
+    formatters that only need starts and texts can use start_text_pairs()
+    and skip the dicts. A slice is another CompactSegments over the same
+    text buffer, so taking a window costs only its columns; its dicts are
+    built when it is iterated, e.g. by the JSON encoder.
+
+    With a codec (see compression.get_codec) the text buffer is kept
+    compressed and inflated whenever texts are read, trading a
+    decompression per read for a smaller buffer. Indexing a single segment
+    inflates the whole buffer too, so code reading many segments should
+    iterate or slice once instead. The start times and durations stay
+    uncompressed for binary search.
+    """
+    __slots__ = ("starts", "durations", "codec", "_text", "_offsets")
+
+    def __init__(self, starts, durations, text, offsets, codec=None):
+        self.starts = starts
+        self.durations = durations
+        self.codec = codec
+        self._text = text if codec is None else codec.compress(text)
+        # Byte offset of each text in the buffer, plus the end of the last one
+        self._offsets = offsets
+
+    @classmethod
+    def from_dicts(cls, segments, codec=None):
+        """Pack segment dicts ('text', 'start', optional 'duration')."""
+        encoded = [segment['text'].encode('utf-8') for segment in segments]
+        offsets = array('I', [0])
+        position = 0
+        for text in encoded:
+            position += len(text)
+            offsets.append(position)
+        return cls(
+            array('d', [segment['start'] for segment in segments]),
+            array('d', [segment.get('duration', 0.0) for segment in segments]),
+            b''.join(encoded),
+            offsets,
+            codec,
+        )
+
+    @property
+    def nbytes(self):
+        """Bytes held by the columns and the (possibly compressed) texts."""
+        columns = (self.starts, self.durations, self._offsets)
+        text = len(self._text) if self.codec is not None else self._offsets[-1] - self._offsets[0]
+        return sum(column.itemsize * len(column) for column in columns) + text
+
+    def __len__(self):
+        return len(self.starts)
+
+    def _buffer(self):
+        return self._text if self.codec is None else self.codec.decompress(self._text)
+
+    def text(self, index):
+        offsets = self._offsets
+        return self._buffer()[offsets[index]:offsets[index + 1]].decode('utf-8')
+
+    def texts(self):
+        """Every segment's text, in order, sliced from the buffer without a Python-level loop."""
+        buffer = self._buffer()
+        offsets = self._offsets
+        spans = map(slice, offsets, islice(offsets, 1, None))
+        if offsets[0] == 0 and offsets[-1] == len(buffer) and buffer.isascii():
+            # Byte offsets are character offsets, so decode once and slice
+            return map(buffer.decode('ascii').__getitem__, spans)
+        return map(bytes.decode, map(buffer.__getitem__, spans))
+
+    def start_text_pairs(self):
+        """(start, text) per segment, without building dicts."""
+        return zip(self.starts, self.texts())
+
+    def _slice(self, first, last):
+        """Segments [first, last), sharing this buffer (inflated if it was compressed)."""
+        return CompactSegments(self.starts[first:last], self.durations[first:last],
+                               self._buffer(), self._offsets[first:last + 1])
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            first, last, step = index.indices(len(self.starts))
+            if step == 1:
+                return self._slice(first, max(first, last))
+            return [self[i] for i in range(first, last, step)]
+        if index < 0:
+            index += len(self.starts)
+        if not 0 <= index < len(self.starts):
+            raise IndexError("segment index out of range")
+        return {'text': self.text(index), 'start': self.starts[index], 'duration': self.durations[index]}
+
+    def __iter__(self):
+        for start, duration, text in zip(self.starts, self.durations, self.texts()):
+            yield {'text': text, 'start': start, 'duration': duration}
@@ -0,0 +1,73 @@
+import logging
+import zlib
+
+logger = logging.getLogger(__name__)
+
+# Codecs the transcript cache can store segment text with; "zstd" needs the
+# zstandard package
+CODECS = ("none", "zlib", "zstd")
+
+# zlib only looks back this far, so a longer preset dictionary is trimmed
+_ZLIB_WINDOW = 32 * 1024
+
+
+class Codec:
+    """A compressor and its decompressor, e.g. Codec("zlib", zlib.compress, zlib.decompress)."""
+    __slots__ = ("name", "compress", "decompress")
+
+    def __init__(self, name, compress, decompress):
+        self.name = name
+        self.compress = compress
+        self.decompress = decompress
+
+
+def _zlib_codec(dictionary, level=6):
+    if not dictionary:
+        return Codec("zlib", lambda data: zlib.compress(data, level), zlib.decompress)
+    zdict = dictionary[-_ZLIB_WINDOW:]
+
+    def compress(data):
+        compressor = zlib.compressobj(level, zdict=zdict)
+        return compressor.compress(data) + compressor.flush()
+
+    def decompress(data):
+        decompressor = zlib.decompressobj(zdict=zdict)
+        return decompressor.decompress(data) + decompressor.flush()
+    return Codec("zlib", compress, decompress)
+
+
+def _zstd_codec(dictionary, level=3):
+    import zstandard
+
+    dict_data = zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+    # Contexts aren't thread-safe; a fresh one per call is cheap next to the work
+    return Codec(
+        "zstd",
+        lambda data: zstandard.ZstdCompressor(level=level, dict_data=dict_data).compress(data),
+        lambda data: zstandard.ZstdDecompressor(dict_data=dict_data).decompress(data),
+    )
+
+
+def get_codec(name, dictionary=b""):
+    """
+    The Codec for one of CODECS, or None for "none"
+
+    Args:
+        name (str): "none", "zlib" or "zstd"
+        dictionary (bytes): Optional shared dictionary, e.g. one trained on
+            caption text with `zstd --train`; zlib uses its last 32 KiB as a
+            preset dictionary
+
+    Raises:
+        ValueError: If name isn't one of CODECS
+    """
+    if name not in CODECS:
+        raise ValueError(f"Unknown compression: {name}")
+    if name == "none":
+        return None
+    if name == "zstd":
+        try:
+            return _zstd_codec(dictionary)
+        except ImportError:
+            logger.warning("zstandard is not installed, compressing with zlib")
+    return _zlib_codec(dictionary)
@@ -0,0 +1,328 @@
+import re
+import threading
+from operator import itemgetter
+
+# Timestamp prefixes ("[m:ss] ") are cached per whole second up to this length
+MAX_CACHED_SECONDS = 24 * 60 * 60
+
+_timestamps = []
+_timestamps_lock = threading.Lock()
+# Seconds part of a prefix ("ss] "), used past the cached range
+_second_suffixes = [f"{second:02d}] " for second in range(60)]
+
+
+def _timestamp_prefix(seconds):
+    minutes, seconds = divmod(seconds, 60)
+    return f"[{minutes}:{seconds:02d}] "
+
+
+def _timestamp_table(max_second):
+    """Return the cached prefix table, grown to cover max_second if possible."""
+    table = _timestamps
+    if max_second >= len(table) and len(table) < MAX_CACHED_SECONDS:
+        with _timestamps_lock:
+            end = min(max_second + 1, MAX_CACHED_SECONDS)
+            table.extend(_timestamp_prefix(second) for second in range(len(table), end))
+    return table
+
+
+_start_and_text = itemgetter('start', 'text')
+
+
+def format_timestamp(start):
+    """Format a start time in seconds as "[m:ss]"."""
+    return f"[{int(start // 60)}:{int(start % 60):02d}]"
+
+
+def format_transcript(transcript_list):
+    """
+    Format transcript segments as "[m:ss] text" lines
+
+    Timestamp prefixes are shared strings taken from a per-second cache and
+    every piece is joined into the result in a single pass, so no per-line
+    strings are built.
+
+    Args:
+        transcript_list (list): Segments with 'start' (seconds) and 'text',
+            or CompactSegments
+
+    Returns:
+        str: One line per segment, separated by newlines
+    """
+    if not transcript_list:
+        return ''
+
+    starts = getattr(transcript_list, 'starts', None)
+    last_start = starts[-1] if starts is not None else transcript_list[-1]['start']
+    table = _timestamp_table(int(last_start) if last_start > 0 else 0)
+    cached = len(table)
+
+    if hasattr(transcript_list, 'start_text_pairs'):
+        pairs = transcript_list.start_text_pairs()
+    else:
+        pairs = map(_start_and_text, transcript_list)
+    parts = []
+    append = parts.append
+    for start, text in pairs:
+        second = int(start)
+        if second < cached and start >= 0:
+            append(table[second])
+        elif start >= 0:
+            minutes, seconds = divmod(second, 60)
+            append(f"[{minutes}:{_second_suffixes[seconds]}")
+        else:
+            append(format_timestamp(start) + ' ')
+        append(text)
+        append('\n')
+    parts.pop()
+    return ''.join(parts)
+
+
+# Ways to merge caption fragments into larger blocks (see group_segments)
+GROUPINGS = ("sentences", "paragraphs")
+# A silence this long (seconds) ends a sentence, and this long a paragraph
+SENTENCE_GAP = 1.5
+PARAGRAPH_GAP = 3.0
+# Unpunctuated (auto-generated) captions are still cut at these lengths (seconds)
+MAX_SENTENCE_SECONDS = 20.0
+MAX_PARAGRAPH_SECONDS = 60.0
+MAX_PARAGRAPH_SENTENCES = 6
+
+# A fragment ending a sentence: . ! ? or an ellipsis, possibly before a closing quote or bracket
+_SENTENCE_END = re.compile(r'[.!?…]["\'”’)\]]*$')
+# "Name: text", the name one to three capitalised words of letters (no
+# digits or sentence punctuation), or the ">>" captions use for a new speaker
+_SPEAKER = re.compile(r"^(?:>>\s*)?([^\W\d_][\w'’-]*(?: [^\W\d_][\w'’-]*){0,2}):\s+\S")
+_SPEAKER_CHANGE = '>>'
+# Capitalised words that introduce ordinary text rather than name a speaker
+_NOT_SPEAKERS = frozenset((
+    "answer", "chapter", "edit", "example", "hint", "note", "part", "question",
+    "remember", "source", "step", "summary", "tip", "update", "warning",
+))
+
+
+def _speaker(text):
+    """(speaker, whether the speaker changes here) for a fragment's text."""
+    # Most captions have no colon, and the substring check is far cheaper than the pattern
+    match = _SPEAKER.match(text) if ':' in text else None
+    if match:
+        name = match.group(1)
+        if all(word[0].isupper() for word in name.split()) and name.lower() not in _NOT_SPEAKERS:
+            return name, True
+    return None, text.startswith(_SPEAKER_CHANGE)
+
+
+def group_segments(transcript_list, grouping="paragraphs"):
+    """
+    Merge caption fragments into sentences or paragraphs
+
+    A sentence ends at closing punctuation or a pause of SENTENCE_GAP
+    seconds; a paragraph ends at a pause of PARAGRAPH_GAP seconds, a new
+    speaker (">>", or a capitalised "Name:"), or after MAX_PARAGRAPH_SENTENCES
+    sentences.
+    Either is cut at its maximum length when the captions have no
+    punctuation to go by.
+
+    Args:
+        transcript_list (list): Segments with 'start', 'duration' and 'text'
+        grouping (str): "sentences" or "paragraphs"
+
+    Returns:
+        list: Segment dicts ('text', 'start', 'duration', 'speaker'), one per
+            block, so they can be formatted and windowed like the captions
+    """
+    if grouping not in GROUPINGS:
+        raise ValueError(f"grouping must be one of {', '.join(GROUPINGS)}")
+    paragraphs = grouping == "paragraphs"
+    max_seconds = MAX_PARAGRAPH_SECONDS if paragraphs else MAX_SENTENCE_SECONDS
+
+    blocks = []
+    words = []
+    block_start = block_end = 0.0
+    sentences = 0
+    speaker = None
+
+    def close():
+        blocks.append({
+            'text': ' '.join(words),
+            'start': block_start,
+            'duration': round(block_end - block_start, 3),
+            'speaker': speaker,
+        })
+        words.clear()
+
+    for item in transcript_list:
+        text = ' '.join(item['text'].split())
+        if not text:
+            continue
+        start = item['start']
+        new_speaker, speaker_changes = _speaker(text)
+        if words:
+            gap = start - block_end
+            if gap >= SENTENCE_GAP:
+                sentences += 1
+            if paragraphs:
+                boundary = gap >= PARAGRAPH_GAP or sentences >= MAX_PARAGRAPH_SENTENCES
+            else:
+                boundary = sentences > 0
+            if boundary or speaker_changes or start - block_start >= max_seconds:
+                close()
+        if not words:
+            block_start = block_end = start
+            sentences = 0
+            if speaker_changes:
+                speaker = new_speaker
+        words.append(text)
+        block_end = max(block_end, start + item.get('duration', 0))
+        if _SENTENCE_END.search(text):
+            sentences += 1
+    if words:
+        close()
+    return blocks
+
+
+# Fewest words a caption must repeat from the one before to count as rolling
+# text; a shorter match is more likely a real repetition ("of the" / "of the")
+MIN_OVERLAP_WORDS = 3
+
+
+def _overlap(previous, current):
+    """
+    Length of the longest suffix of previous that is a prefix of current
+
+    Uses the KMP failure function of current + [separator] + previous, so
+    the cost is linear in the number of words.
+    """
+    sequence = current + [None] + previous
+    failure = [0] * len(sequence)
+    matched = 0
+    for i in range(1, len(sequence)):
+        word = sequence[i]
+        while matched and sequence[matched] != word:
+            matched = failure[matched - 1]
+        if sequence[matched] == word:
+            matched += 1
+        failure[i] = matched
+    return failure[-1]
+
+
+def dedupe_segments(transcript_list):
+    """
+    Remove text repeated from one caption to the next in rolling captions
+
+    Auto-generated tracks often show each line twice: once as it is spoken
+    and again as the first half of the next caption. Words at the start of
+    a caption that repeat the end of the previous caption (at least
+    MIN_OVERLAP_WORDS of them, case-insensitively) are dropped; a caption
+    with nothing left, or identical to the previous one, is merged into it
+    by extending its duration. Each caption is compared with the previous
+    one as captioned, not as trimmed, so the pass is linear in the words.
+
+    Only for auto-generated tracks: in manual captions repeated lines are
+    what was said.
+
+    Args:
+        transcript_list (list): Segments with 'start', 'duration' and 'text'
+
+    Returns:
+        list: New segment dicts; the input is left unchanged
+    """
+    deduped = []
+    previous_words = []
+    for item in transcript_list:
+        words = item['text'].split()
+        folded = [word.casefold() for word in words]
+        overlap = _overlap(previous_words, folded) if previous_words else 0
+        if overlap < MIN_OVERLAP_WORDS and not (overlap and overlap == len(folded) == len(previous_words)):
+            overlap = 0
+        previous_words = folded
+        if deduped and overlap == len(words):
+            last = deduped[-1]
+            end = item['start'] + item.get('duration', 0)
+            last['duration'] = round(max(last['duration'], end - last['start']), 3)
+            continue
+        segment = dict(item)
+        if overlap:
+            segment['text'] = ' '.join(words[overlap:])
+        deduped.append(segment)
+    return deduped
+
+
+# Units a chunk size can be given in; tokens are estimated, not counted by a tokenizer
+CHUNK_UNITS = ("tokens", "chars")
+# Rough characters per token of English text for common LLM tokenizers
+CHARS_PER_TOKEN = 4
+
+
+def _segment_cost(text, unit):
+    """A segment's size in chunk units, counting the space that joins it to the next."""
+    if unit == "chars":
+        return len(text) + 1
+    return max(1, -(-(len(text) + 1) // CHARS_PER_TOKEN))
+
+
+def chunk_segments(transcript_list, size, overlap=0, unit="tokens"):
+    """
+    Split segments into chunks of about `size` units, overlapping by up to `overlap`
+
+    Chunks are made of whole segments, so every chunk starts and ends on a
+    caption boundary and keeps its timestamps; a segment larger than size
+    makes a chunk on its own. Each chunk after the first repeats as many of
+    the previous chunk's last segments as fit in overlap (always starting
+    at least one segment later, so the split moves forward).
+
+    Args:
+        transcript_list (list): Segments with 'start', 'duration' and 'text'
+        size (int): Chunk budget, in unit
+        overlap (int): Budget repeated from the end of the previous chunk
+        unit (str): "tokens" (estimated as CHARS_PER_TOKEN characters) or "chars"
+
+    Returns:
+        list: Dicts with 'index', 'text', 'start', 'end' (seconds), 'size'
+            (in unit) and 'segments' (the [first, last) segment indexes)
+    """
+    if unit not in CHUNK_UNITS:
+        raise ValueError(f"unit must be one of {', '.join(CHUNK_UNITS)}")
+    if hasattr(transcript_list, 'texts'):
+        # Read CompactSegments by column, so compressed text is inflated once
+        texts = [' '.join(text.split()) for text in transcript_list.texts()]
+        starts, durations = transcript_list.starts, transcript_list.durations
+    else:
+        texts = [' '.join(item['text'].split()) for item in transcript_list]
+        starts = durations = None
+    costs = [_segment_cost(text, unit) for text in texts]
+    count = len(texts)
+
+    chunks = []
+    first = 0
+    while first < count:
+        last = first
+        total = 0
+        while last < count and (last == first or total + costs[last] <= size):
+            total += costs[last]
+            last += 1
+        if starts is None:
+            end_item = transcript_list[last - 1]
+            start = transcript_list[first]['start']
+            end = end_item['start'] + end_item.get('duration', 0)
+        else:
+            start = starts[first]
+            end = starts[last - 1] + durations[last - 1]
+        chunks.append({
+            'index': len(chunks),
+            'text': ' '.join(text for text in texts[first:last] if text),
+            'start': start,
+            'end': round(end, 3),
+            'size': total - 1 if unit == "chars" else total,
+            'segments': [first, last],
+        })
+        if last == count:
+            break
+        # Back up over the segments that fit in the overlap
+        next_first = last
+        repeated = 0
+        while next_first - 1 > first and repeated + costs[next_first - 1] <= overlap:
+            next_first -= 1
+            repeated += costs[next_first]
+        first = next_first
+    return chunks
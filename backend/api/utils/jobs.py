@@ -0,0 +1,337 @@
+import json
+import logging
+import secrets
+import sqlite3
+import threading
+import time
+
+from api.utils.metrics import record_job_item
+
+logger = logging.getLogger(__name__)
+
+# Job states; items go pending -> running -> done/failed, or pending -> cancelled
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+CANCELLED = "cancelled"
+ACTIVE_STATES = (QUEUED, RUNNING)
+
+# Results returned per GET /api/jobs/{id} page unless ?limit= says otherwise
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    total INTEGER NOT NULL,
+    done INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS items (
+    job_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    url TEXT NOT NULL,
+    language TEXT,
+    status TEXT NOT NULL DEFAULT 'pending',
+    result TEXT,
+    error TEXT,
+    PRIMARY KEY (job_id, idx)
+);
+CREATE INDEX IF NOT EXISTS items_pending ON items (status, job_id, idx);
+"""
+
+
+class JobNotFound(KeyError):
+    """No job with the requested ID."""
+
+
+class Throttle:
+    """Space calls at least 1/rate seconds apart across threads (rate 0: no limit)."""
+
+    def __init__(self, rate):
+        self.interval = 1 / rate if rate > 0 else 0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+class JobStore:
+    """
+    Jobs and their items in SQLite, so queued work survives a restart
+
+    One connection is shared by every thread behind a lock; each call is a
+    single short transaction.
+    """
+
+    def __init__(self, path):
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def _transaction(self, statements):
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                result = statements(self._db)
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+            return result
+
+    def recover(self):
+        """Requeue items left running by a previous process; returns how many."""
+        return self._transaction(lambda db: db.execute(
+            "UPDATE items SET status = 'pending' WHERE status = 'running'").rowcount)
+
+    def create(self, items):
+        """
+        Add a job for [(url, language)] and return its ID
+
+        Args:
+            items (list): (url, language) pairs; language may be None
+        """
+        job_id = secrets.token_hex(8)
+        now = time.time()
+
+        def insert(db):
+            db.execute("INSERT INTO jobs (id, status, total, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                       (job_id, QUEUED, len(items), now, now))
+            db.executemany("INSERT INTO items (job_id, idx, url, language) VALUES (?, ?, ?, ?)",
+                           ((job_id, idx, url, language) for idx, (url, language) in enumerate(items)))
+        self._transaction(insert)
+        return job_id
+
+    def claim(self):
+        """Mark the oldest pending item of an active job running; returns (job_id, idx, url, language) or None."""
+        def claim(db):
+            row = db.execute(
+                "SELECT i.job_id, i.idx, i.url, i.language FROM items i JOIN jobs j ON j.id = i.job_id"
+                " WHERE i.status = 'pending' AND j.status IN (?, ?) ORDER BY j.created_at, i.idx LIMIT 1",
+                ACTIVE_STATES).fetchone()
+            if row is None:
+                return None
+            db.execute("UPDATE items SET status = 'running' WHERE job_id = ? AND idx = ?", row[:2])
+            db.execute("UPDATE jobs SET status = ?, updated_at = ? WHERE id = ? AND status = ?",
+                       (RUNNING, time.time(), row[0], QUEUED))
+            return row
+        return self._transaction(claim)
+
+    def finish(self, job_id, idx, result=None, error=None):
+        """Store an item's result (or error) and complete the job if it was the last one."""
+        status, counter = ("failed", "failed") if error is not None else ("done", "done")
+
+        def finish(db):
+            updated = db.execute(
+                "UPDATE items SET status = ?, result = ?, error = ? WHERE job_id = ? AND idx = ? AND status = 'running'",
+                (status, result, error, job_id, idx)).rowcount
+            if not updated:
+                return
+            db.execute(f"UPDATE jobs SET {counter} = {counter} + 1, updated_at = ? WHERE id = ?", (time.time(), job_id))
+            db.execute("UPDATE jobs SET status = ? WHERE id = ? AND status = ? AND done + failed = total",
+                       (COMPLETED, job_id, RUNNING))
+        self._transaction(finish)
+
+    def cancel(self, job_id):
+        """
+        Cancel a job's pending items; items already running still finish
+
+        Raises:
+            JobNotFound: If there is no such job
+        """
+        def cancel(db):
+            if db.execute("SELECT 1 FROM jobs WHERE id = ?", (job_id,)).fetchone() is None:
+                raise JobNotFound(job_id)
+            db.execute("UPDATE items SET status = 'cancelled' WHERE job_id = ? AND status = 'pending'", (job_id,))
+            db.execute("UPDATE jobs SET status = ?, updated_at = ? WHERE id = ? AND status IN (?, ?)",
+                       (CANCELLED, time.time(), job_id) + ACTIVE_STATES)
+        self._transaction(cancel)
+
+    def get(self, job_id, offset=0, limit=DEFAULT_PAGE_SIZE):
+        """
+        A job's progress and one page of its items, in submission order
+
+        Raises:
+            JobNotFound: If there is no such job
+        """
+        with self._lock:
+            job = self._db.execute(
+                "SELECT id, status, total, done, failed, created_at, updated_at FROM jobs WHERE id = ?",
+                (job_id,)).fetchone()
+            if job is None:
+                raise JobNotFound(job_id)
+            rows = self._db.execute(
+                "SELECT idx, url, language, status, result, error FROM items WHERE job_id = ?"
+                " ORDER BY idx LIMIT ? OFFSET ?", (job_id, limit, offset)).fetchall()
+        summary = _job_summary(job)
+        summary["offset"] = offset
+        summary["results"] = [_item_result(row) for row in rows]
+        return summary
+
+    def list(self, limit=50):
+        """The most recent jobs, newest first, without their items."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, status, total, done, failed, created_at, updated_at FROM jobs"
+                " ORDER BY created_at DESC LIMIT ?", (limit,)).fetchall()
+        return [_job_summary(row) for row in rows]
+
+
+def _job_summary(row):
+    job_id, status, total, done, failed, created_at, updated_at = row
+    return {
+        "job_id": job_id,
+        "status": status,
+        "total": total,
+        "done": done,
+        "failed": failed,
+        "pending": total - done - failed if status in ACTIVE_STATES else 0,
+        "created_at": created_at,
+        "updated_at": updated_at,
+    }
+
+
+def _item_result(row):
+    idx, url, language, status, result, error = row
+    item = {"index": idx, "url": url, "language": language, "status": status}
+    if result is not None:
+        item["result"] = json.loads(result)
+    if error is not None:
+        item["error"] = error
+    return item
+
+
+class JobManager:
+    """
+    Runs queued job items on a pool of worker threads
+
+    The store is opened and the workers started by start() (or the first
+    submit), not at construction, so importing the server stays cheap.
+    Each item is passed to ``fetch(url, language)``; its return value must
+    be JSON-serializable, and a ValueError's message is stored as the
+    item's error. Calls to fetch are spaced to at most ``rate`` per second
+    across all workers.
+    """
+
+    def __init__(self, path, fetch, workers=4, rate=0, max_items=10000):
+        self.path = path
+        self.fetch = fetch
+        self.workers = workers
+        self.max_items = max_items
+        self.throttle = Throttle(rate)
+        self.store = None
+        self._threads = []
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._start_lock = threading.Lock()
+
+    def start(self):
+        """Open the store, requeue interrupted items and start the workers (idempotent)."""
+        with self._start_lock:
+            if self.store is not None:
+                return
+            self._stop.clear()
+            self.store = JobStore(self.path)
+            requeued = self.store.recover()
+            if requeued:
+                logger.info("Requeued %d job items interrupted by the last shutdown", requeued)
+            for number in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f"job-worker-{number}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        # Resume whatever was queued before a restart
+        self._wake.set()
+
+    def stop(self, timeout=5):
+        """Stop the workers after their current item and close the store."""
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        if self.store is not None:
+            self.store.close()
+            self.store = None
+
+    def submit(self, items):
+        """
+        Queue a job and return its ID
+
+        Args:
+            items (list): (url, language) pairs
+
+        Raises:
+            ValueError: If there are no items or more than max_items
+        """
+        if not items:
+            raise ValueError("No videos provided")
+        if len(items) > self.max_items:
+            raise ValueError(f"Too many videos in one job (limit is {self.max_items})")
+        self.start()
+        job_id = self.store.create(items)
+        self._wake.set()
+        return job_id
+
+    def get(self, job_id, offset=0, limit=DEFAULT_PAGE_SIZE):
+        self.start()
+        return self.store.get(job_id, offset, min(limit, MAX_PAGE_SIZE))
+
+    def list(self):
+        self.start()
+        return self.store.list()
+
+    def cancel(self, job_id):
+        self.start()
+        self.store.cancel(job_id)
+
+    def _work(self):
+        # stop() closes the store and clears self.store, so work on the one opened for this worker
+        store = self.store
+        while not self._stop.is_set():
+            try:
+                item = store.claim()
+            except sqlite3.Error:
+                if self.store is not store:
+                    # Closed by stop() between the check above and the claim
+                    break
+                raise
+            if item is None:
+                # Idle until a submit, or poll now and then in case of a missed wake-up
+                self._wake.wait(1.0)
+                self._wake.clear()
+                continue
+            job_id, idx, url, language = item
+            self.throttle.wait()
+            try:
+                result, error = json.dumps(self.fetch(url, language)), None
+            except ValueError as e:
+                result, error = None, str(e)
+            except Exception as e:
+                logger.error("Job %s item %d failed: %s", job_id, idx, e, exc_info=True)
+                result, error = None, "An error occurred while processing this video"
+            record_job_item("failed" if error is not None else "done")
+            if self.store is not store:
+                # The store was closed while this item ran; recover() requeues it on the next start
+                break
+            try:
+                store.finish(job_id, idx, result=result, error=error)
+            except sqlite3.Error as e:
+                logger.error("Could not store result of job %s item %d: %s", job_id, idx, e)
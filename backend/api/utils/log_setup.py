@@ -0,0 +1,116 @@
+import atexit
+import logging
+import logging.handlers
+import queue
+import sys
+
+from api.utils.metrics import log_records_dropped_total
+
+LOG_FORMAT = "%(levelname)s:%(name)s:%(message)s"
+
+# The active listener, so that reconfiguring does not leak a thread
+_listener = None
+
+
+def _stop_listener():
+    """Flush queued records and stop the background writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(_stop_listener)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler that never blocks the calling thread.
+
+    Records are enqueued as-is (formatting happens on the listener thread);
+    if the queue is full the record is dropped and counted instead.
+    """
+
+    def prepare(self, record):
+        # Resolve exception text on the calling thread, where the traceback
+        # is still available, but leave the message for the listener.
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            log_records_dropped_total.inc()
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep only a fraction of the records logged for high-volume routes.
+
+    Records opt in by passing ``extra={"route": ...}``; records without a
+    route, or with a route that has no configured rate, always pass.
+    Sampling is deterministic: a rate of 0.1 keeps every tenth record.
+    """
+
+    def __init__(self, sample_rates):
+        super().__init__()
+        # route -> keep one record in every N (0 means drop everything)
+        self.intervals = {}
+        for route, rate in sample_rates.items():
+            self.intervals[route] = round(1 / rate) if rate > 0 else 0
+        self.counters = {}
+
+    def filter(self, record):
+        route = getattr(record, "route", None)
+        if route is None or record.levelno >= logging.WARNING:
+            return True
+        interval = self.intervals.get(route)
+        if interval is None or interval == 1:
+            return True
+        if interval == 0:
+            return False
+        count = self.counters.get(route, 0)
+        self.counters[route] = count + 1
+        return count % interval == 0
+
+
+def configure_logging(level="INFO", async_logging=True, queue_size=10000, sample_rates=None):
+    """
+    Configure the root logger for the server
+
+    Args:
+        level (str): Log level name, e.g. "INFO"
+        async_logging (bool): Hand records to a background thread through a
+            bounded queue instead of writing to stderr on the request thread
+        queue_size (int): Maximum number of records waiting to be written
+        sample_rates (dict, optional): Route -> fraction of records to keep
+
+    Returns:
+        logging.Logger: The configured root logger
+    """
+    global _listener
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    _stop_listener()
+
+    stream_handler = logging.StreamHandler(sys.stderr)
+    stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    if async_logging:
+        handler = DroppingQueueHandler(queue.Queue(maxsize=queue_size))
+        _listener = logging.handlers.QueueListener(handler.queue, stream_handler)
+        _listener.start()
+    else:
+        handler = stream_handler
+
+    if sample_rates:
+        handler.addFilter(SamplingFilter(sample_rates))
+
+    root.addHandler(handler)
+    root.setLevel(getattr(logging, level, logging.INFO))
+    return root
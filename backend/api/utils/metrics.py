@@ -0,0 +1,291 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Latency buckets (seconds) shared by the request and upstream histograms
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Routes reported with their own label; anything else is folded into "other"
+# so that arbitrary paths cannot blow up label cardinality.
+KNOWN_ROUTES = frozenset([
+    "/api",
+    "/api/transcript",
+    "/api/transcript_v2",
+    "/api/transcript/chunks",
+    "/api/languages",
+    "/api/languages_v4",
+    "/api/hello",
+    "/api/test",
+    "/api/ping",
+    "/api/diagnostic",
+    "/api/network_test",
+    "/api/transcript_test",
+    "/api/metrics",
+    "/api/debug/profile",
+    "/api/jobs",
+])
+
+
+def _format_labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{value}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter keyed by a tuple of label values."""
+
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues, amount=1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def value(self, *labelvalues):
+        return self._values.get(labelvalues, 0)
+
+    def total(self):
+        with self._lock:
+            return sum(self._values.values())
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for labelvalues, value in items:
+            yield self.name, _format_labels(self.labelnames, labelvalues), value
+
+
+class Gauge(Counter):
+    """Value that can go up and down (e.g. requests currently in flight)."""
+
+    kind = "gauge"
+
+    def dec(self, *labelvalues, amount=1):
+        self.inc(*labelvalues, amount=-amount)
+
+    def set(self, *labelvalues, value):
+        with self._lock:
+            self._values[labelvalues] = value
+
+
+class Histogram:
+    """Fixed-bucket histogram; observations cost one bisect and a lock."""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labelvalues -> [per-bucket counts (+Inf last), sum, count]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labelvalues):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = [[0] * (len(self.buckets) + 1), 0.0, 0]
+                self._series[labelvalues] = series
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, *labelvalues):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labelvalues)
+
+    def count(self, *labelvalues):
+        series = self._series.get(labelvalues)
+        return series[2] if series else 0
+
+    def samples(self):
+        with self._lock:
+            items = sorted((key, (list(s[0]), s[1], s[2])) for key, s in self._series.items())
+        bucket_labels = self.labelnames + ("le",)
+        for labelvalues, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                labels = _format_labels(bucket_labels, labelvalues + (_format_value(bound),))
+                yield f"{self.name}_bucket", labels, cumulative
+            labels = _format_labels(self.labelnames, labelvalues)
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, count
+
+
+class Registry:
+    """Collection of metrics rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector):
+        """Register a callable run just before rendering (for derived gauges)."""
+        self._collectors.append(collector)
+
+    def render(self):
+        for collector in self._collectors:
+            collector()
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests_total = registry.register(Counter(
+    "transcript_http_requests_total",
+    "HTTP requests handled, by route, method and status code.",
+    ("route", "method", "status"),
+))
+http_request_duration_seconds = registry.register(Histogram(
+    "transcript_http_request_duration_seconds",
+    "HTTP request latency in seconds, by route and method.",
+    ("route", "method"),
+))
+http_requests_in_flight = registry.register(Gauge(
+    "transcript_http_requests_in_flight",
+    "HTTP requests currently being processed.",
+))
+http_requests_in_flight.set(value=0)
+upstream_request_duration_seconds = registry.register(Histogram(
+    "transcript_upstream_request_duration_seconds",
+    "Latency of calls to YouTube, by call (get_transcript, list_transcripts, fetch).",
+    ("call",),
+))
+upstream_errors_total = registry.register(Counter(
+    "transcript_upstream_errors_total",
+    "Calls to YouTube that raised, by call and exception type.",
+    ("call", "error"),
+))
+cache_requests_total = registry.register(Counter(
+    "transcript_cache_requests_total",
+    "Transcript cache lookups, by result (hit or miss).",
+    ("result",),
+))
+cache_hit_ratio = registry.register(Gauge(
+    "transcript_cache_hit_ratio",
+    "Fraction of transcript cache lookups that were hits.",
+))
+cache_bytes = registry.register(Gauge(
+    "transcript_cache_bytes",
+    "Bytes held by cached transcripts (packed segments and kept response bodies).",
+))
+cache_bytes.set(value=0)
+rate_limited_total = registry.register(Counter(
+    "transcript_rate_limited_total",
+    "Requests rejected by the rate limiter, by route.",
+    ("route",),
+))
+job_items_total = registry.register(Counter(
+    "transcript_job_items_total",
+    "Background job items processed, by result (done or failed).",
+    ("result",),
+))
+log_records_dropped_total = registry.register(Counter(
+    "transcript_log_records_dropped_total",
+    "Log records dropped because the logging queue was full.",
+))
+process_start_time_seconds = registry.register(Gauge(
+    "process_start_time_seconds",
+    "Start time of the process since unix epoch in seconds.",
+))
+process_start_time_seconds.set(value=time.time())
+
+
+def _update_cache_hit_ratio():
+    hits = cache_requests_total.value("hit")
+    lookups = hits + cache_requests_total.value("miss")
+    cache_hit_ratio.set(value=(hits / lookups) if lookups else 0.0)
+
+
+registry.add_collector(_update_cache_hit_ratio)
+
+
+def route_label(path):
+    """Map a request path to a bounded route label."""
+    path = path.rstrip('/') or '/'
+    if path in KNOWN_ROUTES:
+        return path
+    if path.startswith("/api/jobs/"):
+        return "/api/jobs/{id}"
+    if path.startswith("/api"):
+        return "other"
+    return "static"
+
+
+def record_request(route, method, status, duration):
+    http_requests_total.inc(route, method, str(status))
+    http_request_duration_seconds.observe(duration, route, method)
+
+
+def record_cache_lookup(hit):
+    cache_requests_total.inc("hit" if hit else "miss")
+
+
+def record_cache_bytes(nbytes):
+    cache_bytes.set(value=nbytes)
+
+
+def record_job_item(result):
+    job_items_total.inc(result)
+
+
+def record_rate_limited(route):
+    rate_limited_total.inc(route)
+
+
+@contextmanager
+def track_upstream(call):
+    """
+    Time a call to YouTube and record its latency and any error
+
+    Args:
+        call (str): Name of the upstream call, e.g. "get_transcript"
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        upstream_errors_total.inc(call, type(e).__name__)
+        raise
+    finally:
+        upstream_request_duration_seconds.observe(time.perf_counter() - start, call)
+
+
+def render_metrics():
+    """Render all registered metrics in the Prometheus text exposition format."""
+    return registry.render()
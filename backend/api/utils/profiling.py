@@ -0,0 +1,191 @@
+import collections
+import io
+import sys
+import threading
+import time
+import uuid
+
+# Hard cap on how long a profiling session may run
+MAX_SESSION_SECONDS = 60
+# How many per-request (X-Profile) results are kept for retrieval
+MAX_STORED_PROFILES = 20
+# Interval between stack samples in "sample" mode
+SAMPLE_INTERVAL = 0.005
+
+PROFILE_MODES = ("cprofile", "sample")
+
+
+class ProfilerBusy(Exception):
+    """Raised when a profiling session is already running."""
+
+
+class RequestProfile:
+    """cProfile run covering a single request on the current thread."""
+
+    def __init__(self, store=False):
+        import cProfile
+
+        self.profile_id = uuid.uuid4().hex[:16]
+        # Whether the result is kept for retrieval by ID (X-Profile requests)
+        self.store = store
+        self.profiler = cProfile.Profile()
+        self.profiler.enable()
+
+    def stop(self):
+        self.profiler.disable()
+        return self.profiler
+
+
+class StackSampler(threading.Thread):
+    """Samples the stacks of all other threads and counts collapsed stacks."""
+
+    def __init__(self, interval=SAMPLE_INTERVAL, ignore_threads=()):
+        super().__init__(name="profile-sampler", daemon=True)
+        self.interval = interval
+        self.ignore = set(ignore_threads)
+        self.stacks = collections.Counter()
+        self.samples = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        own_id = threading.get_ident()
+        while not self._stop_event.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id or thread_id in self.ignore:
+                    continue
+                self.stacks[_collapse(frame)] += 1
+            self.samples += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def collapsed(self):
+        """Stacks in the collapsed format used by flamegraph tools."""
+        lines = [f"{stack} {count}" for stack, count in self.stacks.most_common()]
+        return "\n".join(lines) + "\n"
+
+
+def _collapse(frame):
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class Profiler:
+    """
+    Runtime profiling for the local server.
+
+    A session profiles every request handled while it runs: in "cprofile"
+    mode each request thread gets its own cProfile run whose stats are merged
+    into the session, in "sample" mode a background thread samples the stacks
+    of all request threads. Single requests can also be profiled on demand
+    and their results fetched later by ID.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._session_lock = threading.Lock()
+        self._session_mode = None
+        self._session_stats = None
+        self._stored = collections.OrderedDict()
+
+    @property
+    def session_active(self):
+        return self._session_mode == "cprofile"
+
+    def start_request(self, on_demand=False):
+        """
+        Start profiling the current request if a session is running or the
+        request asked for it; returns None when there is nothing to do.
+        """
+        if not on_demand and not self.session_active:
+            return None
+        return RequestProfile(store=on_demand)
+
+    def finish_request(self, request_profile):
+        """Stop a request's profile and merge or store the result."""
+        profiler = request_profile.stop()
+        with self._lock:
+            if self.session_active:
+                if self._session_stats is None:
+                    import pstats
+                    self._session_stats = pstats.Stats(profiler)
+                else:
+                    self._session_stats.add(profiler)
+            if request_profile.store:
+                self._stored[request_profile.profile_id] = _format_stats(profiler)
+                while len(self._stored) > MAX_STORED_PROFILES:
+                    self._stored.popitem(last=False)
+
+    def stored_profile(self, profile_id):
+        with self._lock:
+            return self._stored.get(profile_id)
+
+    def run_session(self, seconds, mode="cprofile", sort="cumulative", limit=50):
+        """
+        Profile live requests for a number of seconds
+
+        Args:
+            seconds (float): Session length, capped at MAX_SESSION_SECONDS
+            mode (str): "cprofile" for a pstats dump, "sample" for collapsed stacks
+            sort (str): pstats sort key (cprofile mode only)
+            limit (int): Number of functions printed (cprofile mode only)
+
+        Returns:
+            str: The profile dump
+
+        Raises:
+            ProfilerBusy: If another session is running
+            ValueError: If the mode or sort key is unknown
+        """
+        import pstats
+
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode: {mode}")
+        # Checked before the session, not after sleeping through it
+        if sort not in {key.value for key in pstats.SortKey}:
+            raise ValueError(f"Unknown profile sort key: {sort}")
+        seconds = max(0.0, min(float(seconds), MAX_SESSION_SECONDS))
+        if not self._session_lock.acquire(blocking=False):
+            raise ProfilerBusy("A profiling session is already running")
+        try:
+            if mode == "sample":
+                sampler = StackSampler(ignore_threads=[threading.get_ident()])
+                sampler.start()
+                time.sleep(seconds)
+                sampler.stop()
+                header = f"# {sampler.samples} samples over {seconds:g}s\n"
+                return header + sampler.collapsed()
+
+            with self._lock:
+                self._session_stats = None
+                self._session_mode = mode
+            time.sleep(seconds)
+            with self._lock:
+                self._session_mode = None
+                stats, self._session_stats = self._session_stats, None
+            if stats is None:
+                return f"# No requests were handled during the {seconds:g}s session\n"
+            return _format_stats(stats, sort, limit)
+        finally:
+            self._session_lock.release()
+
+
+def _format_stats(profile_or_stats, sort="cumulative", limit=50):
+    import pstats
+
+    stream = io.StringIO()
+    if isinstance(profile_or_stats, pstats.Stats):
+        stats = profile_or_stats
+        stats.stream = stream
+    else:
+        stats = pstats.Stats(profile_or_stats, stream=stream)
+    stats.sort_stats(sort).print_stats(limit)
+    return stream.getvalue()
+
+
+profiler = Profiler()
@@ -0,0 +1,52 @@
+from functools import lru_cache
+
+# Distinct referrer hosts whose verdict is remembered per matcher
+HOST_CACHE_SIZE = 4096
+
+
+def referrer_host(referrer):
+    """The host[:port] part of a Referer header, or the header itself if it has no scheme."""
+    if '://' not in referrer:
+        return referrer
+    return referrer.split('/', 3)[2]
+
+
+class ReferrerMatcher:
+    """
+    ALLOWED_REFERRERS compiled once into an exact-host set and a suffix set
+
+    "example.com" allows exactly that host; "*.example.com" allows any
+    subdomain of it (but not example.com itself); "*" on its own, or an
+    empty list, allows everything. A host is checked with one set lookup
+    per dot in it, however long the allow-list is, and the verdict is
+    memoized per host.
+    """
+
+    def __init__(self, allowed_referrers):
+        allowed_referrers = [entry.strip().lower() for entry in allowed_referrers or () if entry.strip()]
+        self.allow_all = not allowed_referrers or "*" in allowed_referrers
+        self.exact = frozenset(entry for entry in allowed_referrers if not entry.startswith('*.'))
+        # "*.example.com" is stored as ".example.com"
+        self.suffixes = frozenset(entry[1:] for entry in allowed_referrers if entry.startswith('*.'))
+        self._host_allowed = lru_cache(maxsize=HOST_CACHE_SIZE)(self._match_host)
+
+    def _match_host(self, host):
+        host = host.lower()
+        if host in self.exact:
+            return True
+        suffixes = self.suffixes
+        if suffixes:
+            dot = host.find('.', 1)
+            while dot != -1:
+                if host[dot:] in suffixes:
+                    return True
+                dot = host.find('.', dot + 1)
+        return False
+
+    def allows(self, referrer):
+        """Whether a Referer header value comes from an allowed host."""
+        if self.allow_all:
+            return True
+        if not referrer:
+            return False
+        return self._host_allowed(referrer_host(referrer))
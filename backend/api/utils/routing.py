@@ -0,0 +1,248 @@
+import hmac
+import logging
+from functools import partial
+from urllib.parse import parse_qs
+
+from api.utils.body import BODY_READ_TIMEOUT, MAX_BODY_BYTES, BodyError, read_json
+from api.utils.referrers import ReferrerMatcher
+from api.utils.timing import NULL_TIMER
+
+logger = logging.getLogger(__name__)
+
+# Registering a route under this path makes it the fallback for its method,
+# e.g. a Vercel function that serves one endpoint whatever the URL
+ANY_PATH = "*"
+# A path ending in this matches everything below it, e.g. "/api/jobs/*"
+SUBPATHS = "/*"
+
+
+def normalize_path(path):
+    """Strip the trailing slash so "/api/ping/" and "/api/ping" match."""
+    return path.rstrip('/') or '/'
+
+
+class Request:
+    """The parts of an HTTP request a route needs, with the query parsed lazily."""
+    __slots__ = ("method", "path", "query_string", "json", "_query")
+
+    def __init__(self, method, path, query_string=""):
+        self.method = method
+        self.path = path
+        self.query_string = query_string
+        # Set by the json_body middleware
+        self.json = None
+        self._query = None
+
+    @property
+    def query(self):
+        if self._query is None:
+            self._query = parse_qs(self.query_string)
+        return self._query
+
+    def param(self, name, default=''):
+        """First value of a query parameter."""
+        return self.query.get(name, [default])[0]
+
+
+class Router:
+    """
+    Table-driven dispatch from (method, path) to a view
+
+    Views are called as view(handler, request). Middleware is called as
+    middleware(handler, request, call_next) and either calls call_next to
+    continue or answers the request itself, typically via handler.reject().
+    Each route's middleware chain is composed once, when it is added, so
+    dispatch is a single dict lookup. Paths ending in "/*" match any path
+    below them (the view finds the rest in request.path); they are only
+    tried when no exact path matches, longest prefix first.
+    """
+
+    def __init__(self):
+        self._routes = {}
+        # [(prefix, {method: chain})], longest prefix first
+        self._prefixes = []
+
+    def add(self, methods, paths, view, middleware=()):
+        """
+        Register a view for every combination of methods and paths
+
+        Args:
+            methods (str or tuple): HTTP method(s), e.g. "GET" or ("GET", "POST")
+            paths (str or tuple): Path(s), "/prefix/*" for everything below a
+                prefix, or ANY_PATH for a per-method fallback
+            view (callable): Called as view(handler, request)
+            middleware (tuple): Applied outermost first; None entries are skipped
+        """
+        chain = view
+        for layer in reversed([layer for layer in middleware if layer is not None]):
+            chain = partial(layer, call_next=chain)
+        for method in ((methods,) if isinstance(methods, str) else methods):
+            for path in ((paths,) if isinstance(paths, str) else paths):
+                if path.endswith(SUBPATHS):
+                    self._add_prefix(path[:-1], method, chain)
+                    continue
+                key = path if path == ANY_PATH else normalize_path(path)
+                self._routes[(method, key)] = chain
+
+    def _add_prefix(self, prefix, method, chain):
+        for existing, chains in self._prefixes:
+            if existing == prefix:
+                chains[method] = chain
+                return
+        self._prefixes.append((prefix, {method: chain}))
+        self._prefixes.sort(key=lambda entry: len(entry[0]), reverse=True)
+
+    def route(self, methods, paths, middleware=()):
+        """Decorator form of add()."""
+        def register(view):
+            self.add(methods, paths, view, middleware)
+            return view
+        return register
+
+    def resolve(self, method, path):
+        """The composed view for a request, or None if nothing matches."""
+        routes = self._routes
+        view = routes.get((method, path))
+        if view is None:
+            for prefix, chains in self._prefixes:
+                if path.startswith(prefix) and method in chains:
+                    return chains[method]
+            view = routes.get((method, ANY_PATH))
+        return view
+
+    def paths(self):
+        """Every registered path, for endpoint listings."""
+        paths = {path for _, path in self._routes if path != ANY_PATH}
+        paths.update(prefix + '*' for prefix, _ in self._prefixes)
+        return sorted(paths)
+
+
+class RoutedHandlerMixin:
+    """
+    Dispatch http.server requests through a Router
+
+    Subclasses set ``router`` and provide write_json(status, data).
+    Middleware answers errors through reject(status, message), which sends
+    {"detail": message} by default; handlers with their own error format
+    override it.
+    """
+    router = None
+
+    def dispatch(self):
+        """Run the matching route; returns False if no route matches."""
+        path, _, query_string = self.path.partition('?')
+        path = normalize_path(path)
+        view = self.router.resolve(self.command, path)
+        if view is None:
+            return False
+        view(self, Request(self.command, path, query_string))
+        return True
+
+    def reject(self, status_code, message):
+        self.write_json(status_code, {"detail": message})
+
+
+def rate_limit(limiter, on_limited=None):
+    """
+    Middleware answering 429 when limiter.is_rate_limited(client_ip) is true
+
+    Args:
+        limiter: Object with an is_rate_limited(client_ip) method
+        on_limited (callable, optional): Called with the request when limited
+    """
+    def middleware(handler, request, call_next):
+        if limiter.is_rate_limited(handler.client_address[0]):
+            if on_limited is not None:
+                on_limited(request)
+            handler.reject(429, "Too many requests. Please try again later.")
+            return
+        return call_next(handler, request)
+    return middleware
+
+
+def check_referrer(allowed_referrers):
+    """
+    Middleware answering 403 unless the Referer host is allowed
+
+    The allow-list is compiled into a ReferrerMatcher here, once. Returns
+    None (no middleware) when every referrer is allowed, i.e. the list is
+    empty or contains "*". For an allow-list that can change at runtime,
+    pass a function returning the current ReferrerMatcher instead; the
+    middleware is then always installed.
+    """
+    if callable(allowed_referrers):
+        current_matcher = allowed_referrers
+    else:
+        matcher = ReferrerMatcher(allowed_referrers)
+        if matcher.allow_all:
+            return None
+        current_matcher = lambda: matcher
+
+    def middleware(handler, request, call_next):
+        referrer = handler.headers.get('Referer', '')
+        if not current_matcher().allows(referrer):
+            logger.warning("Invalid referrer: %s from IP: %s", referrer, handler.client_address[0])
+            handler.reject(403, "Forbidden - Invalid referrer")
+            return
+        return call_next(handler, request)
+    return middleware
+
+
+def _has_api_key(headers, valid_keys):
+    candidates = [headers.get('X-API-Key', '')]
+    authorization = headers.get('Authorization', '')
+    if authorization.startswith('Bearer '):
+        candidates.append(authorization[7:])
+    return any(
+        candidate and hmac.compare_digest(candidate.encode(), key.encode())
+        for candidate in candidates for key in valid_keys
+    )
+
+
+def require_api_key(valid_keys, message="Unauthorized - Invalid or missing API key"):
+    """Middleware answering 401 unless X-API-Key or a Bearer token is a valid key."""
+    valid_keys = tuple(key for key in valid_keys if key)
+
+    def middleware(handler, request, call_next):
+        if not _has_api_key(handler.headers, valid_keys):
+            logger.warning("Unauthorized request to %s from IP: %s", request.path, handler.client_address[0])
+            handler.reject(401, message)
+            return
+        return call_next(handler, request)
+    return middleware
+
+
+def _read_json_object(handler, required, max_bytes, timeout, lines):
+    """Returns (data, (status, error message)); data is set when there is no error."""
+    try:
+        data = read_json(handler, max_bytes, timeout, lines=lines)
+    except BodyError as e:
+        return None, (e.status_code, e.message)
+    if data is None:
+        return (None, (400, "No data provided")) if required else ({}, None)
+    if not isinstance(data, dict) and not (lines and isinstance(data, list)):
+        return None, (400, "Invalid JSON")
+    return data, None
+
+
+def json_body(required=True, max_bytes=MAX_BODY_BYTES, timeout=BODY_READ_TIMEOUT, lines=False):
+    """
+    Middleware parsing a JSON object body into request.json
+
+    Times the read as the "parse" phase when the handler has a timer. An
+    empty body becomes {} unless required; a missing required body, or one
+    that isn't a JSON object, is answered with a 400. Bodies over max_bytes
+    get a 413 before any of it is read, and a client that stalls for longer
+    than timeout gets a 408. With lines=True a newline-delimited JSON body
+    is also accepted, decoded as it is read into a list.
+    """
+    def middleware(handler, request, call_next):
+        timer = getattr(handler, 'timer', None) or NULL_TIMER
+        with timer.phase("parse"):
+            data, error = _read_json_object(handler, required, max_bytes, timeout, lines)
+        if error:
+            handler.reject(*error)
+            return
+        request.json = data
+        return call_next(handler, request)
+    return middleware
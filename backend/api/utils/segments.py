@@ -0,0 +1,463 @@
+import gzip
+import re
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+
+from api.utils.compact import CompactSegments
+from api.utils.formatting import CHUNK_UNITS, chunk_segments, dedupe_segments, format_transcript, group_segments
+from api.utils.metrics import record_cache_bytes, record_cache_lookup
+from api.utils.serialization import dumps
+
+# Transcripts kept per process, and for how long (seconds)
+CACHE_SIZE = 256
+CACHE_TTL = 60 * 60
+# Bytes of transcripts kept per process (0: no limit beyond CACHE_SIZE)
+CACHE_MAX_BYTES = 0
+
+# Query parameters selecting part of a transcript
+WINDOW_PARAMS = ("start", "end", "offset", "limit")
+
+# Most target languages one request may ask for with translate_to=, and
+# tracks with languages=
+MAX_TRANSLATIONS = 5
+MAX_LANGUAGES = 10
+_LANGUAGE_CODE = re.compile(r'^[A-Za-z]{2,3}(-[A-Za-z0-9]{2,8})*$')
+
+# Chunk size and overlap for /api/transcript/chunks when not given (the
+# overlap is at most an eighth of the size), and the largest size allowed
+DEFAULT_CHUNK_SIZE = 512
+DEFAULT_CHUNK_OVERLAP = 64
+MAX_CHUNK_SIZE = 100000
+# Chunkings kept per cached transcript (the oldest parameter set is dropped)
+MAX_CHUNKINGS = 8
+
+
+def _text_nbytes(items):
+    """Characters of text in a list of blocks or chunks, as an estimate of their size."""
+    return sum(len(item['text']) for item in items)
+
+
+class Transcript:
+    """
+    A transcript's segments, with their start times indexed for range queries
+
+    Segments are in start order: CompactSegments for a fetched track, or
+    for its groupings a list of dicts ('text', 'start', 'duration',
+    'speaker'). The sentence and paragraph groupings, the chunkings and the
+    gzipped response bodies are built on first use and kept with the
+    segments in the cache; so is the formatted text, unless the segments
+    are compressed.
+    """
+    __slots__ = ("video_id", "language", "translation", "segments", "starts", "grouping",
+                 "_text", "_groups", "_chunks", "_kept_bytes", "_bodies")
+
+    def __init__(self, video_id, language, segments, grouping=None, translation=None):
+        self.video_id = video_id
+        self.language = language
+        # Language code the track was machine-translated into, if it was
+        self.translation = translation
+        self.segments = segments
+        starts = getattr(segments, 'starts', None)
+        self.starts = starts if starts is not None else array('d', [segment['start'] for segment in segments])
+        # "sentences" or "paragraphs" when the segments are grouped captions
+        self.grouping = grouping
+        self._text = None
+        self._groups = {}
+        self._chunks = {}
+        # Text bytes of the kept groupings and chunkings
+        self._kept_bytes = 0
+        # (grouping, format) -> gzipped full-transcript response body
+        self._bodies = {}
+
+    @property
+    def compressed(self):
+        return getattr(self.segments, 'codec', None) is not None
+
+    @property
+    def text(self):
+        if self._text is not None:
+            return self._text
+        text = format_transcript(self.segments)
+        if not self.compressed:
+            self._text = text
+        return text
+
+    @property
+    def nbytes(self):
+        """
+        Bytes held by the packed segments, the formatted text, the gzipped
+        bodies, and the groupings and chunkings kept with them
+
+        A grouping's blocks and the chunks count by their text; the dicts
+        holding them aren't counted.
+        """
+        size = getattr(self.segments, 'nbytes', 0) + self._kept_bytes
+        size += sum(len(body) for body in self._bodies.values())
+        size += sum(group.nbytes for group in self._groups.values())
+        if self._text is not None:
+            size += len(self._text)
+        return size
+
+    def grouped(self, grouping):
+        """
+        The captions merged into sentences or paragraphs, as a Transcript
+
+        Raises:
+            ValueError: If grouping isn't one of formatting.GROUPINGS
+        """
+        transcript = self._groups.get(grouping)
+        if transcript is None:
+            blocks = group_segments(self.segments, grouping)
+            transcript = Transcript(self.video_id, self.language, blocks, grouping, self.translation)
+            # Concurrent first requests may both group; either result is kept
+            kept = self._groups.setdefault(grouping, transcript)
+            if kept is transcript:
+                self._kept_bytes += _text_nbytes(blocks)
+            transcript = kept
+        return transcript
+
+    def chunks(self, size, overlap, unit):
+        """The segments split by formatting.chunk_segments, kept per parameter set."""
+        key = (size, overlap, unit)
+        chunks = self._chunks.get(key)
+        if chunks is None:
+            chunks = chunk_segments(self.segments, size, overlap, unit)
+            if len(self._chunks) >= MAX_CHUNKINGS:
+                dropped = self._chunks.pop(next(iter(self._chunks)), None)
+                if dropped is not None:
+                    self._kept_bytes -= _text_nbytes(dropped)
+            if self._chunks.setdefault(key, chunks) is chunks:
+                self._kept_bytes += _text_nbytes(chunks)
+        return chunks
+
+    def gzipped_body(self, grouping=None, response_format='json'):
+        """
+        The whole transcript's response body, gzipped once and kept
+
+        Args:
+            grouping (str, optional): "sentences" or "paragraphs"
+            response_format (str): "json" for {"transcript": text}, "text"
+                for the text itself
+
+        Returns:
+            bytes: The gzip-encoded body
+        """
+        key = (grouping, response_format)
+        body = self._bodies.get(key)
+        if body is None:
+            text = (self.grouped(grouping) if grouping else self).text
+            raw = text.encode('utf-8') if response_format == 'text' else dumps({"transcript": text})
+            body = self._bodies.setdefault(key, gzip.compress(raw, compresslevel=6, mtime=0))
+        return body
+
+    def _duration(self, index):
+        durations = getattr(self.segments, 'durations', None)
+        if durations is not None:
+            return durations[index]
+        return self.segments[index].get('duration', 0)
+
+    def window(self, start=None, end=None, offset=0, limit=None):
+        """
+        Segments overlapping [start, end) seconds, then offset/limit within them
+
+        Both ends are found by binary search on the start times, so the cost
+        is O(log n) plus the size of the page.
+
+        Returns:
+            tuple: (segments, total) - the page, and how many segments the
+                time range holds before paging. For a cached track the page
+                is a CompactSegments slice; its dicts are built only when it
+                is iterated or serialized.
+        """
+        starts = self.starts
+        first = 0
+        if start is not None:
+            first = bisect_right(starts, start)
+            # The segment before may still be on screen at `start`
+            if first and starts[first - 1] + self._duration(first - 1) > start:
+                first -= 1
+        last = len(starts) if end is None else bisect_left(starts, end, first)
+        total = max(last - first, 0)
+        page_start = first + offset
+        page_end = last if limit is None else min(last, page_start + limit)
+        return self.segments[page_start:page_end], total
+
+
+def check_string_params(get, names):
+    """
+    Reject parameters given as something other than a string
+
+    A query string only holds strings, but a JSON body can hold any type.
+
+    Args:
+        get (callable): Returns a parameter's value, or None when it wasn't given
+        names (iterable): The parameters to check
+
+    Raises:
+        ValueError: Naming the first parameter that isn't a string
+    """
+    for name in names:
+        value = get(name)
+        if value is not None and not isinstance(value, str):
+            raise ValueError(f"{name} must be a string")
+
+
+def parse_window(get):
+    """
+    Read start=/end= (seconds) and offset=/limit= (segments)
+
+    Args:
+        get (callable): Returns a parameter's value (str or number), or None
+            when it wasn't given
+
+    Returns:
+        dict: The window, or None if no window parameter was given
+
+    Raises:
+        ValueError: If a value isn't a number or is out of range
+    """
+    values = {name: get(name) for name in WINDOW_PARAMS}
+    if all(value in (None, '') for value in values.values()):
+        return None
+    window = {"start": None, "end": None, "offset": 0, "limit": None}
+    for name, convert in (("start", float), ("end", float), ("offset", int), ("limit", int)):
+        value = values[name]
+        if value in (None, ''):
+            continue
+        try:
+            window[name] = convert(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"{name} must be a number")
+        if window[name] < 0:
+            raise ValueError(f"{name} must not be negative")
+    if window["start"] is not None and window["end"] is not None and window["end"] <= window["start"]:
+        raise ValueError("end must be after start")
+    if window["limit"] == 0:
+        raise ValueError("limit must be at least 1")
+    return window
+
+
+def parse_language_codes(value, name, limit):
+    """
+    Language codes from a parameter: "fr" or "fr,de", or a JSON list
+
+    Returns:
+        list: The codes in the order given, without repeats, or None when
+            the parameter wasn't given
+
+    Raises:
+        ValueError: If a code is malformed or there are more than limit
+    """
+    if value in (None, '', []):
+        return None
+    codes = value.split(',') if isinstance(value, str) else value
+    if not isinstance(codes, list):
+        raise ValueError(f"{name} must be a language code or a list of them")
+    result = []
+    for code in codes:
+        code = code.strip() if isinstance(code, str) else code
+        if not isinstance(code, str) or not _LANGUAGE_CODE.match(code):
+            raise ValueError(f"Invalid language code in {name}: {code!r}")
+        if code not in result:
+            result.append(code)
+    if len(result) > limit:
+        raise ValueError(f"{name} takes at most {limit} languages")
+    return result
+
+
+def parse_translate_to(value):
+    """Target languages from translate_to=, or None (see parse_language_codes)."""
+    return parse_language_codes(value, "translate_to", MAX_TRANSLATIONS)
+
+
+def parse_languages(value):
+    """Languages from languages=, or None (see parse_language_codes)."""
+    return parse_language_codes(value, "languages", MAX_LANGUAGES)
+
+
+def parse_chunking(get):
+    """
+    Read size=, overlap= and unit= for /api/transcript/chunks
+
+    Args:
+        get (callable): Returns a parameter's value (str or number), or None
+            when it wasn't given
+
+    Returns:
+        dict: size, overlap and unit, with defaults for any not given
+
+    Raises:
+        ValueError: If a value isn't valid
+    """
+    unit = get("unit") or "tokens"
+    if unit not in CHUNK_UNITS:
+        raise ValueError(f"unit must be one of {', '.join(CHUNK_UNITS)}")
+    chunking = {"size": DEFAULT_CHUNK_SIZE, "overlap": None, "unit": unit}
+    for name in ("size", "overlap"):
+        value = get(name)
+        if value in (None, ''):
+            continue
+        try:
+            chunking[name] = int(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"{name} must be a whole number")
+    if chunking["overlap"] is None:
+        chunking["overlap"] = min(DEFAULT_CHUNK_OVERLAP, chunking["size"] // 8)
+    if not 0 < chunking["size"] <= MAX_CHUNK_SIZE:
+        raise ValueError(f"size must be between 1 and {MAX_CHUNK_SIZE}")
+    if not 0 <= chunking["overlap"] < chunking["size"]:
+        raise ValueError("overlap must be at least 0 and less than size")
+    return chunking
+
+
+def chunks_response(transcript, chunking):
+    """JSON body for a transcript split into chunks."""
+    chunks = transcript.chunks(**chunking)
+    response = {"video_id": transcript.video_id, **chunking, "total": len(chunks), "chunks": chunks}
+    if transcript.translation:
+        response["translation"] = transcript.translation
+    return response
+
+
+def transcript_body(transcript, window=None):
+    """JSON body for one of several transcripts in a response: a window of it, or its text."""
+    if window is not None:
+        return window_response(transcript, window)
+    return {"transcript": transcript.text}
+
+
+def window_response(transcript, window):
+    """JSON body for a window of a transcript, with what to ask for next."""
+    segments, total = transcript.window(**window)
+    offset = window["offset"]
+    next_offset = offset + len(segments)
+    response = {
+        "video_id": transcript.video_id,
+        "segments": segments,
+        "total": total,
+        "offset": offset,
+        "next_offset": next_offset if next_offset < total else None,
+    }
+    if transcript.grouping:
+        response["grouping"] = transcript.grouping
+    if transcript.translation:
+        response["translation"] = transcript.translation
+    return response
+
+
+class TranscriptCache:
+    """
+    Least-recently-used cache of Transcripts by (video_id, language, translation)
+
+    Entries expire ttl seconds after they were fetched. Every lookup is
+    counted in the transcript_cache_requests_total metric. With dedupe,
+    text repeated between rolling captions is removed from auto-generated
+    tracks as they are added; manual tracks are kept as captioned.
+    With a codec (see compression.get_codec) segment text is stored
+    compressed. Besides max_entries, the oldest entries are evicted while
+    the cached transcripts hold more than max_bytes (0: no limit); an
+    entry's size is taken when it is added and again on every hit, since
+    response bodies are added to it as it is used.
+    """
+
+    def __init__(self, max_entries=CACHE_SIZE, ttl=CACHE_TTL, dedupe=False, codec=None, max_bytes=CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.dedupe = dedupe
+        self.codec = codec
+        self.max_bytes = max_bytes
+        # key -> (fetched_at, transcript, nbytes)
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def configure(self, max_entries, ttl, dedupe=False, codec=None, max_bytes=CACHE_MAX_BYTES):
+        """Change the limits, evicting whatever no longer fits."""
+        with self._lock:
+            self.max_entries = max_entries
+            self.ttl = ttl
+            self.max_bytes = max_bytes
+            # Entries already cached keep the codec they were stored with
+            self.codec = codec
+            if dedupe != self.dedupe:
+                # Cached tracks were normalized the other way
+                self.dedupe = dedupe
+                self._entries.clear()
+                self._bytes = 0
+            self._evict()
+
+    def get(self, video_id, language=None, translation=None):
+        key = (video_id, language, translation)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] < self.ttl:
+                transcript = entry[1]
+                self._store(key, entry[0], transcript)
+            else:
+                if entry is not None:
+                    self._remove(key)
+                    self._evict()
+                transcript = None
+        record_cache_lookup(transcript is not None)
+        return transcript
+
+    def add(self, video_id, language, segments, translation=None, generated=False):
+        """
+        Build the Transcript for freshly fetched segments, cache it and return it
+
+        Args:
+            generated (bool): Whether the track is auto-generated, so its
+                rolling captions may be de-duplicated
+        """
+        if self.dedupe and generated:
+            segments = dedupe_segments(segments)
+        # Kept packed: a fraction of the memory of the library's list of dicts
+        segments = CompactSegments.from_dicts(segments, self.codec)
+        transcript = Transcript(video_id, language, segments, translation=translation)
+        self.put(transcript)
+        return transcript
+
+    def put(self, transcript):
+        with self._lock:
+            key = (transcript.video_id, transcript.language, transcript.translation)
+            self._store(key, time.monotonic(), transcript)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            record_cache_bytes(0)
+
+    @property
+    def nbytes(self):
+        """Bytes held by the cached transcripts, as last measured."""
+        return self._bytes
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _store(self, key, fetched_at, transcript):
+        """Make an entry the most recently used, at its current size, then evict to fit."""
+        previous = self._entries.get(key)
+        if previous is not None:
+            self._bytes -= previous[2]
+        nbytes = transcript.nbytes
+        self._entries[key] = (fetched_at, transcript, nbytes)
+        self._entries.move_to_end(key)
+        self._bytes += nbytes
+        self._evict()
+
+    def _remove(self, key):
+        self._bytes -= self._entries.pop(key)[2]
+
+    def _evict(self):
+        while len(self._entries) > self.max_entries or (self.max_bytes and self._bytes > self.max_bytes):
+            self._bytes -= self._entries.popitem(last=False)[1][2]
+        record_cache_bytes(self._bytes)
+
+
+# Shared by every handler in the process
+transcript_cache = TranscriptCache()
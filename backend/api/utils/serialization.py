@@ -0,0 +1,114 @@
+import json
+import logging
+import os
+from collections.abc import Sequence
+
+logger = logging.getLogger(__name__)
+
+# Encoders in the order "auto" tries them; "json" (stdlib) is always available
+SERIALIZERS = ("orjson", "ujson", "json")
+
+
+def _encode_other(value):
+    """Sequences other than lists and tuples, e.g. a window of cached segments, are encoded as lists."""
+    if isinstance(value, Sequence):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+# Reused so json.dumps doesn't build an encoder per call. ensure_ascii=False
+# is about twice as slow in CPython's encoder, and the escaped output is pure
+# ASCII (lone surrogates included).
+_compact_encoder = json.JSONEncoder(separators=(',', ':'), default=_encode_other)
+_pretty_encoder = json.JSONEncoder(indent=2, default=_encode_other)
+
+
+def _stdlib_dumps(data, pretty=False):
+    encoder = _pretty_encoder if pretty else _compact_encoder
+    return encoder.encode(data).encode('ascii')
+
+
+def _load_orjson():
+    import orjson
+
+    def dumps(data, pretty=False):
+        return orjson.dumps(data, default=_encode_other, option=orjson.OPT_INDENT_2 if pretty else 0)
+    return dumps
+
+
+def _load_ujson():
+    import ujson
+
+    def dumps(data, pretty=False):
+        return ujson.dumps(data, ensure_ascii=False, escape_forward_slashes=False,
+                           indent=2 if pretty else 0, default=_encode_other).encode('utf-8')
+    return dumps
+
+
+_LOADERS = {
+    "orjson": _load_orjson,
+    "ujson": _load_ujson,
+    "json": lambda: _stdlib_dumps,
+}
+
+_name = "json"
+_dumps = _stdlib_dumps
+
+
+def use(name="auto"):
+    """
+    Select the JSON encoder used by dumps()
+
+    Args:
+        name (str): "orjson", "ujson", "json", or "auto" for the fastest installed
+
+    Returns:
+        str: Name of the encoder now in use
+    """
+    global _name, _dumps
+    if name not in SERIALIZERS and name != "auto":
+        raise ValueError(f"Unknown JSON serializer: {name}")
+
+    for candidate in (SERIALIZERS if name == "auto" else (name,)):
+        try:
+            encoder = _LOADERS[candidate]()
+        except ImportError:
+            if name != "auto":
+                logger.warning("JSON serializer %s is not installed, using stdlib json", name)
+            continue
+        _name, _dumps = candidate, encoder
+        return _name
+
+    _name, _dumps = "json", _stdlib_dumps
+    return _name
+
+
+def current():
+    """Name of the JSON encoder in use."""
+    return _name
+
+
+def dumps(data, pretty=False):
+    """
+    Serialize data straight to UTF-8 JSON bytes for a response body
+
+    The accelerated encoders return (or are encoded to) bytes without an
+    intermediate str copy. Data they reject, such as non-string keys or
+    integers wider than 64 bits, falls back to the stdlib encoder.
+
+    Args:
+        data: JSON-serializable value
+        pretty (bool): Indent with two spaces
+
+    Returns:
+        bytes: The encoded body
+    """
+    try:
+        return _dumps(data, pretty)
+    except (TypeError, ValueError, OverflowError):
+        if _dumps is _stdlib_dumps:
+            raise
+        return _stdlib_dumps(data, pretty)
+
+
+use(os.environ.get("JSON_SERIALIZER", "auto"))
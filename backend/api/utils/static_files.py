@@ -0,0 +1,220 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import posixpath
+import re
+import stat
+import threading
+import time
+from email.utils import formatdate
+from urllib.parse import unquote
+
+# Loaded when the server starts rather than on their first request
+PRELOAD = ("index.html", "script.js", "styles.css", "config.js")
+# Files at least this big aren't kept in memory; they go out with sendfile
+SENDFILE_MIN_BYTES = 64 * 1024
+# Seconds between checks of a cached file's mtime and size
+CHECK_INTERVAL = 1.0
+
+# Names like "script.3f9a1c2e.js" change whenever their content does, so
+# they can be cached for good; anything else is revalidated with its ETag
+HASHED_NAME = re.compile(r'\.[0-9a-f]{8,}\.[^./]+$')
+HASHED_CACHE_CONTROL = "public, max-age=31536000, immutable"
+DEFAULT_CACHE_CONTROL = "no-cache"
+
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml")
+# Skip compressing files this small; the gzip header eats the saving
+GZIP_MIN_BYTES = 256
+
+
+def accepts_gzip(accept_encoding):
+    """
+    Whether an Accept-Encoding header allows a gzip response
+
+    gzip (or x-gzip) is allowed when listed, or covered by "*", with a
+    q-value above 0; "gzip;q=0" refuses it.
+    """
+    qualities = {}
+    for entry in accept_encoding.split(','):
+        coding, _, params = entry.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding] = quality
+    for coding in ('gzip', 'x-gzip', '*'):
+        if coding in qualities:
+            return qualities[coding] > 0
+    return False
+
+
+class Variant:
+    """One encoding of an asset: either in memory (body) or on disk (path)."""
+    __slots__ = ("etag", "encoding", "length", "body", "path")
+
+    def __init__(self, etag, encoding, length, body=None, path=None):
+        self.etag = etag
+        self.encoding = encoding
+        self.length = length
+        self.body = body
+        self.path = path
+
+
+class StaticAsset:
+    """A file's headers and content, computed once per change of the file."""
+    __slots__ = ("size", "mtime_ns", "content_type", "last_modified", "cache_control",
+                 "sendfile_min_bytes", "identity", "gzipped", "checked_at")
+
+    def __init__(self, name, path, st, sendfile_min_bytes):
+        self.size = st.st_size
+        self.mtime_ns = st.st_mtime_ns
+        self.content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        self.last_modified = formatdate(st.st_mtime, usegmt=True)
+        self.cache_control = HASHED_CACHE_CONTROL if HASHED_NAME.search(name) else DEFAULT_CACHE_CONTROL
+        self.checked_at = time.monotonic()
+        # Files (or their .gz) of this size or more are sent from disk
+        self.sendfile_min_bytes = sendfile_min_bytes
+
+        in_memory = st.st_size < sendfile_min_bytes
+        if in_memory:
+            with open(path, 'rb') as f:
+                body = f.read()
+            digest = _digest(body)
+            self.identity = Variant(f'"{digest}"', None, len(body), body=body)
+        else:
+            self.identity = Variant(f'"{_file_digest(path)}"', None, st.st_size, path=path)
+        self.gzipped = self._load_gzipped(path, in_memory)
+
+    def _load_gzipped(self, path, in_memory):
+        """A precompressed "<file>.gz" if there is one, else gzip small text files."""
+        gz_path = path + '.gz'
+        try:
+            gz_size = os.stat(gz_path).st_size
+        except OSError:
+            gz_size = None
+        etag = self.identity.etag[:-1] + '-gzip"'
+        if gz_size is not None:
+            if gz_size < self.sendfile_min_bytes:
+                with open(gz_path, 'rb') as f:
+                    return Variant(etag, 'gzip', gz_size, body=f.read())
+            return Variant(etag, 'gzip', gz_size, path=gz_path)
+        body = self.identity.body
+        if not in_memory or len(body) < GZIP_MIN_BYTES or not self.content_type.startswith(COMPRESSIBLE_TYPES):
+            return None
+        # mtime=0 so the same content always compresses to the same bytes
+        compressed = gzip.compress(body, compresslevel=9, mtime=0)
+        if len(compressed) >= len(body):
+            return None
+        return Variant(etag, 'gzip', len(compressed), body=compressed)
+
+    def variant(self, accept_encoding):
+        """The representation to send for a request's Accept-Encoding header."""
+        if self.gzipped is not None and accepts_gzip(accept_encoding):
+            return self.gzipped
+        return self.identity
+
+
+def _digest(data):
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _file_digest(path):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(SENDFILE_MIN_BYTES), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def etag_matches(if_none_match, etag):
+    """Whether an If-None-Match header value matches a strong ETag."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    return any(tag.strip().removeprefix('W/') == etag for tag in if_none_match.split(','))
+
+
+class StaticFiles:
+    """
+    Files under a directory, served from memory with precomputed headers
+
+    Each file is read, hashed (for a strong ETag) and gzipped once; after
+    that a request costs a dict lookup, plus an os.stat at most every
+    check_interval seconds to pick up edits. Files of sendfile_min_bytes or
+    more are hashed but not kept in memory, and are sent with
+    socket.sendfile (os.sendfile where the platform has it).
+    """
+
+    def __init__(self, root, preload=PRELOAD, sendfile_min_bytes=SENDFILE_MIN_BYTES,
+                 check_interval=CHECK_INTERVAL):
+        self.root = os.path.abspath(root)
+        self.sendfile_min_bytes = sendfile_min_bytes
+        self.check_interval = check_interval
+        self._assets = {}
+        self._lock = threading.Lock()
+        for name in preload:
+            self.get(name)
+
+    @staticmethod
+    def _name(url_path):
+        """The file a URL path refers to, relative to the root, or None if it escapes it."""
+        path = unquote(url_path)
+        if '\x00' in path:
+            return None
+        if path.endswith('/') or not path:
+            path += 'index.html'
+        name = posixpath.normpath(path).lstrip('/')
+        if name == '.' or name.startswith('..') or '\\' in name:
+            return None
+        return name
+
+    def get(self, url_path):
+        """The asset for a URL path, or None if it isn't a regular file under the root."""
+        name = self._name(url_path)
+        if name is None:
+            return None
+        asset = self._assets.get(name)
+        if asset is not None and time.monotonic() - asset.checked_at < self.check_interval:
+            return asset
+        return self._refresh(name, asset)
+
+    def _refresh(self, name, asset):
+        path = os.path.join(self.root, name)
+        try:
+            st = os.stat(path)
+        except OSError:
+            st = None
+        if st is None or not stat.S_ISREG(st.st_mode):
+            if asset is not None:
+                with self._lock:
+                    self._assets.pop(name, None)
+            return None
+        if asset is not None and asset.mtime_ns == st.st_mtime_ns and asset.size == st.st_size:
+            asset.checked_at = time.monotonic()
+            return asset
+        try:
+            asset = StaticAsset(name, path, st, self.sendfile_min_bytes)
+        except OSError:
+            return None
+        with self._lock:
+            self._assets[name] = asset
+        return asset
+
+
+def send_variant(handler, variant):
+    """Write a variant's body to the client, from memory or with sendfile."""
+    if variant.body is not None:
+        handler.wfile.write(variant.body)
+        return
+    handler.wfile.flush()
+    with open(variant.path, 'rb') as f:
+        handler.connection.sendfile(f, 0, variant.length)
@@ -0,0 +1,81 @@
+import json
+import re
+import time
+import uuid
+from contextlib import contextmanager, nullcontext
+
+# Incoming X-Request-ID values are only reused when they look like an ID
+_REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+
+def new_request_id(incoming=None):
+    """
+    Return the request ID to use for a request
+
+    Args:
+        incoming (str, optional): Value of the client's X-Request-ID header
+
+    Returns:
+        str: The incoming ID if it is well formed, otherwise a fresh one
+    """
+    if incoming and _REQUEST_ID_PATTERN.match(incoming):
+        return incoming
+    return uuid.uuid4().hex[:16]
+
+
+class RequestTimer:
+    """Records how long each phase of a request took."""
+
+    def __init__(self, request_id=None):
+        self.request_id = request_id or new_request_id()
+        self.started = time.perf_counter()
+        # Phase name -> accumulated seconds, in first-seen order
+        self.phases = {}
+        self.fields = {}
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    def annotate(self, **fields):
+        """Attach extra fields to the request's log line."""
+        self.fields.update(fields)
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def server_timing(self):
+        """Format the phases as a Server-Timing header value (milliseconds)."""
+        entries = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.phases.items()]
+        entries.append(f"total;dur={self.elapsed() * 1000:.2f}")
+        return ", ".join(entries)
+
+    def log_line(self, **fields):
+        """Build the single structured JSON log line for this request."""
+        record = {
+            "request_id": self.request_id,
+            "duration_ms": round(self.elapsed() * 1000, 2),
+            "phases_ms": {name: round(seconds * 1000, 2) for name, seconds in self.phases.items()},
+        }
+        record.update(self.fields)
+        record.update(fields)
+        return json.dumps(record, default=str)
+
+
+class NullTimer:
+    """Stand-in used when the caller is not timing the request."""
+
+    request_id = None
+
+    def phase(self, name):
+        return nullcontext()
+
+    def annotate(self, **fields):
+        pass
+
+
+NULL_TIMER = NullTimer()
@@ -1,38 +1,33 @@
-import re
 import logging
-from youtube_transcript_api import YouTubeTranscriptApi
-from youtube_transcript_api._errors import (
-    TranscriptsDisabled, 
-    NoTranscriptFound,
-    VideoUnavailable
-)
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from api.utils.video_id import parse_video_id
+from api.utils.metrics import track_upstream
+from api.utils.segments import transcript_cache
+from api.utils.timing import NULL_TIMER
+from api.utils.youtube_client import get_client
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def get_video_id(url):
-    # Check if it's a YouTube Short
-    if "/shorts/" in url:
-        match = re.search(r"\/shorts\/([0-9A-Za-z_-]{11})", url)
-        return match.group(1) if match else None
-    # Regular YouTube video
-    match = re.search(r"(?:v=|\/)([0-9A-Za-z_-]{11})", url)
-    return match.group(1) if match else None
-
-def format_transcript(transcript_list):
-    formatted_lines = []
-    for item in transcript_list:
-        # Format time in minutes:seconds
-        time_in_seconds = item['start']
-        minutes = int(time_in_seconds // 60)
-        seconds = int(time_in_seconds % 60)
-        timestamp = f"[{minutes}:{seconds:02d}]"
-        
-        # Add timestamp to text
-        formatted_lines.append(f"{timestamp} {item['text']}")
-    
-    return '\n'.join(formatted_lines)
+# Kept under its old name for existing callers
+get_video_id = parse_video_id
+
+# Upstream fetches run at once for requests that need several tracks of a video
+FANOUT_WORKERS = 8
+_pool = None
+_pool_lock = threading.Lock()
+# Cache key (video_id, language, translation) -> Future of the track being fetched
+_in_flight = {}
+_in_flight_lock = threading.Lock()
+
+@contextmanager
+def _upstream_call(call, timer):
+    """Record an upstream call both in the metrics and as a request phase."""
+    with timer.phase(call), track_upstream(call):
+        yield
 
 def get_available_languages(youtube_url):
     """
@@ -51,9 +46,11 @@ def get_available_languages(youtube_url):
     if not video_id:
         raise ValueError("Invalid YouTube URL")
     
-    logger.info(f"Fetching available languages for video ID: {video_id}")
+    logger.info("Fetching available languages for video ID: %s", video_id)
+    client = get_client()
     try:
-        transcript_list = YouTubeTranscriptApi.list_transcripts(video_id)
+        with track_upstream("list_transcripts"):
+            transcript_list = client.list_transcripts(video_id)
         languages = []
         
         # Collect manual transcripts
@@ -90,29 +87,53 @@ def get_available_languages(youtube_url):
                     "type": "auto-detected"
                 })
             
-        logger.info(f"Found {len(languages)} available transcript languages for video {video_id}")
+        logger.info("Found %s available transcript languages for video %s", len(languages), video_id)
         return languages
-    except (TranscriptsDisabled, NoTranscriptFound) as e:
-        logger.error(f"No transcripts available for video {video_id}: {str(e)}")
+    except (client.TranscriptsDisabled, client.NoTranscriptFound) as e:
+        logger.error("No transcripts available for video %s: %s", video_id, e)
         raise ValueError(f"No transcripts available for this video. This may be due to: {str(e)}")
-    except VideoUnavailable as e:
-        logger.error(f"Video {video_id} is unavailable: {str(e)}")
+    except client.VideoUnavailable as e:
+        logger.error("Video %s is unavailable: %s", video_id, e)
         raise ValueError("This video is unavailable or does not exist")
     except Exception as e:
-        logger.error(f"Unexpected error fetching languages for {video_id}: {str(e)}", exc_info=True)
+        logger.error("Unexpected error fetching languages for %s: %s", video_id, e, exc_info=True)
         raise ValueError(f"Unable to fetch transcript languages. Error: {str(e)}")
 
-def get_transcript_text(youtube_url, language_code=None):
+def get_transcript_text(youtube_url, language_code=None, timer=NULL_TIMER, grouping=None):
     """
     Get transcript text for a YouTube video with multiple fallback strategies
     
     Args:
         youtube_url (str): YouTube video URL or ID
         language_code (str, optional): Language code for transcript. Defaults to None (auto-select).
+        timer (RequestTimer, optional): Receives the upstream and formatting phase timings.
+        grouping (str, optional): "sentences" or "paragraphs" for one line per
+            sentence or paragraph instead of one per caption.
         
     Returns:
         str: Formatted transcript text
         
+    Raises:
+        ValueError: If URL is invalid, grouping is unknown or transcript is not available
+    """
+    transcript = fetch_transcript(youtube_url, language_code, timer)
+    with timer.phase("format"):
+        if grouping:
+            transcript = transcript.grouped(grouping)
+        return transcript.text
+
+def fetch_transcript(youtube_url, language_code=None, timer=NULL_TIMER):
+    """
+    Get a YouTube video's transcript segments, from the transcript cache if possible
+    
+    Args:
+        youtube_url (str): YouTube video URL or ID
+        language_code (str, optional): Language code for transcript. Defaults to None (auto-select).
+        timer (RequestTimer, optional): Receives the upstream phase timings.
+        
+    Returns:
+        Transcript: The segments, indexed for time-range queries
+        
     Raises:
         ValueError: If URL is invalid or transcript is not available
     """
@@ -120,76 +141,254 @@ def get_transcript_text(youtube_url, language_code=None):
     if not video_id:
         raise ValueError("Invalid YouTube URL")
     
-    logger.info(f"Attempting to fetch transcript for video ID: {video_id}, language: {language_code or 'auto'}")
+    timer.annotate(video_id=video_id, language=language_code or 'auto')
+    transcript = transcript_cache.get(video_id, language_code)
+    if transcript is not None:
+        timer.annotate(strategy="cache", segments=len(transcript.segments))
+        return transcript
+    segments, generated = _fetch_segments(video_id, language_code, timer)
+    with timer.phase("normalize"):
+        return transcript_cache.add(video_id, language_code, segments, generated=generated)
+
+def fetch_translations(youtube_url, targets, language_code=None, timer=NULL_TIMER):
+    """
+    Get a YouTube video's transcript machine-translated into each target language
     
-    # Strategy 1: Try direct transcript fetch
-    try:
-        if language_code:
-            # Get transcript in specified language
-            transcript_list = YouTubeTranscriptApi.get_transcript(video_id, languages=[language_code])
-        else:
-            # Auto-select transcript
-            transcript_list = YouTubeTranscriptApi.get_transcript(video_id)
-            
-        logger.info(f"Successfully retrieved transcript via direct method, {len(transcript_list)} entries")
-        return format_transcript(transcript_list)
-    except (TranscriptsDisabled, NoTranscriptFound) as e:
-        logger.warning(f"Direct transcript fetch failed for {video_id}: {str(e)}")
-        # Continue to try alternative strategies
-    except VideoUnavailable as e:
-        logger.error(f"Video {video_id} is unavailable: {str(e)}")
-        raise ValueError("This video is unavailable or does not exist")
-    except Exception as e:
-        logger.warning(f"Direct transcript fetch failed with unexpected error for {video_id}: {str(e)}")
-        # Continue to try alternative strategies
+    Translated tracks are cached separately from the original. Those not in
+    the cache are fetched concurrently, from a single listing of the
+    video's tracks; a translation another request is already fetching is
+    waited for rather than fetched again.
     
-    # Strategy 2: Try listing transcripts first, then fetch
-    try:
-        logger.info(f"Trying alternative approach: listing transcripts first for {video_id}")
-        transcript_list_obj = YouTubeTranscriptApi.list_transcripts(video_id)
+    Args:
+        youtube_url (str): YouTube video URL or ID
+        targets (list): Language codes to translate into
+        language_code (str, optional): Track to translate from. Defaults to None (auto-select).
+        timer (RequestTimer, optional): Receives the upstream phase timings.
         
-        # Try to find the best transcript
-        target_transcript = None
+    Returns:
+        dict: Target language code -> Transcript, in the order of targets
         
-        if language_code:
-            # Look for specific language
-            try:
-                target_transcript = transcript_list_obj.find_transcript([language_code])
-            except NoTranscriptFound:
-                logger.warning(f"Specific language {language_code} not found, trying auto-generated")
-                # Fallback to auto-generated in that language
-                try:
-                    target_transcript = transcript_list_obj.find_generated_transcript([language_code])
-                except NoTranscriptFound:
-                    pass
+    Raises:
+        ValueError: If URL is invalid, there is no track, or it can't be
+            translated into one of the targets
+    """
+    video_id = get_video_id(youtube_url)
+    if not video_id:
+        raise ValueError("Invalid YouTube URL")
+    
+    timer.annotate(video_id=video_id, language=language_code or 'auto', translate_to=targets)
+    translations = {target: transcript_cache.get(video_id, language_code, target) for target in targets}
+    missing = [target for target, transcript in translations.items() if transcript is None]
+    if not missing:
+        timer.annotate(strategy="cache")
+        return translations
+    
+    client = get_client()
+    with _upstream_call("list_transcripts", timer):
+        transcript_list_obj = client.list_transcripts(video_id)
+    source = _find_track(transcript_list_obj, language_code, client)
+    if source is None:
+        raise ValueError("Transcript not available for this video.")
+    available = {entry['language_code'] for entry in source.translation_languages} if source.is_translatable else set()
+    for target in missing:
+        if target != source.language_code and target not in available:
+            raise ValueError(f"The {source.language_code} transcript can't be translated into {target}")
+    
+    with timer.phase("translate"):
+        futures = {
+            target: _fetch_once((video_id, language_code, target), _fetch_translation, source, video_id, language_code, target)
+            for target in missing
+        }
+        for target, future in futures.items():
+            translations[target] = future.result()
+    timer.annotate(strategy="translate", translated=missing)
+    return translations
+
+def fetch_languages(youtube_url, language_codes, timer=NULL_TIMER):
+    """
+    Get a YouTube video's transcript in each of several languages
+    
+    The video's tracks are listed once and the tracks not in the cache are
+    fetched concurrently. A language that fails doesn't fail the others.
+    
+    Args:
+        youtube_url (str): YouTube video URL or ID
+        language_codes (list): Languages to fetch
+        timer (RequestTimer, optional): Receives the upstream phase timings.
+        
+    Returns:
+        tuple: (transcripts, errors) - language code -> Transcript for the
+            languages fetched, and language code -> message for the rest
         
-        if not target_transcript:
-            # Try English first, then auto-generated English, then any available
+    Raises:
+        ValueError: If URL is invalid
+    """
+    video_id = get_video_id(youtube_url)
+    if not video_id:
+        raise ValueError("Invalid YouTube URL")
+    
+    timer.annotate(video_id=video_id, languages=language_codes)
+    transcripts = {code: transcript_cache.get(video_id, code) for code in language_codes}
+    missing = [code for code, transcript in transcripts.items() if transcript is None]
+    futures = {}
+    errors = {}
+    if missing:
+        client = get_client()
+        with _upstream_call("list_transcripts", timer):
+            transcript_list_obj = client.list_transcripts(video_id)
+        for code in missing:
             try:
-                target_transcript = transcript_list_obj.find_transcript(['en', 'en-US', 'en-GB'])
-            except NoTranscriptFound:
+                track = transcript_list_obj.find_transcript([code])
+            except client.NoTranscriptFound:
+                errors[code] = f"No transcript in {code} for this video"
+                continue
+            futures[code] = _fetch_once((video_id, code, None), _fetch_track, track, video_id, code)
+        with timer.phase("fetch"):
+            for code, future in futures.items():
                 try:
-                    target_transcript = transcript_list_obj.find_generated_transcript(['en', 'en-US', 'en-GB'])
-                except NoTranscriptFound:
-                    # Get any available transcript
-                    all_transcripts = list(transcript_list_obj)
-                    if all_transcripts:
-                        target_transcript = all_transcripts[0]
+                    transcripts[code] = future.result()
+                except Exception as e:
+                    logger.warning("Fetching the %s transcript of %s failed: %s", code, video_id, e)
+                    errors[code] = f"Unable to fetch the {code} transcript: {str(e)}"
+    
+    transcripts = {code: transcript for code, transcript in transcripts.items() if transcript is not None}
+    timer.annotate(strategy="languages", fetched=len(futures), failed=sorted(errors))
+    return transcripts, errors
+
+def _fetch_once(key, fetch, *args):
+    """
+    Future for fetch(*args) on the shared pool, or for the identical fetch
+    (same cache key) another request already started
+    """
+    pool = _fanout_pool()
+    with _in_flight_lock:
+        future = _in_flight.get(key)
+        if future is not None:
+            return future
+        future = pool.submit(fetch, *args)
+        _in_flight[key] = future
+    future.add_done_callback(lambda done: _forget_fetch(key, done))
+    return future
+
+def _forget_fetch(key, future):
+    with _in_flight_lock:
+        if _in_flight.get(key) is future:
+            del _in_flight[key]
+
+def _fetch_track(track, video_id, language_code):
+    with track_upstream("fetch"):
+        segments = track.fetch()
+    return transcript_cache.add(video_id, language_code, segments, generated=track.is_generated)
+
+def _fetch_translation(source, video_id, language_code, target):
+    # The source track itself when it is already in the target language
+    track = source if target == source.language_code else source.translate(target)
+    with track_upstream("translate"):
+        segments = track.fetch()
+    return transcript_cache.add(video_id, language_code, segments, translation=target, generated=track.is_generated)
+
+def _fanout_pool():
+    """The shared pool for fetching several tracks of one video at once, started on first use."""
+    global _pool
+    pool = _pool
+    if pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=FANOUT_WORKERS, thread_name_prefix="transcript-fanout")
+            pool = _pool
+    return pool
+
+def _fetch_segments(video_id, language_code, timer):
+    """
+    Fetch a transcript's segments from YouTube, trying a direct fetch and then listing
+    
+    Returns:
+        tuple: (segments, whether the track is auto-generated)
+    """
+    client = get_client()
+    
+    # Strategy 1: Try direct transcript fetch. It doesn't say whether the track is
+    # auto-generated, so it is skipped when those are de-duplicated
+    if not transcript_cache.dedupe:
+        try:
+            with _upstream_call("get_transcript", timer):
+                # Specified language, or auto-select when none is given
+                transcript_list = client.get_transcript(video_id, [language_code] if language_code else None)
+            
+            timer.annotate(strategy="direct", segments=len(transcript_list))
+            return transcript_list, False
+        except (client.TranscriptsDisabled, client.NoTranscriptFound) as e:
+            logger.warning("Direct transcript fetch failed for %s: %s", video_id, e)
+            # Continue to try alternative strategies
+        except client.VideoUnavailable as e:
+            logger.error("Video %s is unavailable: %s", video_id, e)
+            raise ValueError("This video is unavailable or does not exist")
+        except Exception as e:
+            logger.warning("Direct transcript fetch failed with unexpected error for %s: %s", video_id, e)
+            # Continue to try alternative strategies
+    
+    # Strategy 2: Try listing transcripts first, then fetch
+    try:
+        logger.debug("Trying alternative approach: listing transcripts first for %s", video_id)
+        with _upstream_call("list_transcripts", timer):
+            transcript_list_obj = client.list_transcripts(video_id)
+        
+        target_transcript = _find_track(transcript_list_obj, language_code, client)
         
         if target_transcript:
-            transcript_data = target_transcript.fetch()
-            logger.info(f"Successfully retrieved transcript via listing method, {len(transcript_data)} entries")
-            return format_transcript(transcript_data)
+            with _upstream_call("fetch", timer):
+                transcript_data = target_transcript.fetch()
+            timer.annotate(strategy="listing", segments=len(transcript_data))
+            return transcript_data, target_transcript.is_generated
         else:
-            raise NoTranscriptFound("No transcripts found via listing method")
+            raise client.NoTranscriptFound("No transcripts found via listing method")
             
-    except (TranscriptsDisabled, NoTranscriptFound) as e:
-        logger.error(f"Alternative transcript fetch also failed for {video_id}: {str(e)}")
+    except (client.TranscriptsDisabled, client.NoTranscriptFound) as e:
+        logger.error("Alternative transcript fetch also failed for %s: %s", video_id, e)
+    except client.VideoUnavailable as e:
+        logger.error("Video %s is unavailable: %s", video_id, e)
+        raise ValueError("This video is unavailable or does not exist")
     except Exception as e:
-        logger.error(f"Alternative transcript fetch failed with unexpected error for {video_id}: {str(e)}", exc_info=True)
+        logger.error("Alternative transcript fetch failed with unexpected error for %s: %s", video_id, e, exc_info=True)
     
     # If all strategies failed, raise the final error
     if language_code:
         raise ValueError(f"Transcript not available in the selected language ({language_code}). The video may have transcripts disabled or may not be accessible from this server environment.")
     else:
         raise ValueError("Transcript not available for this video. The video may have transcripts disabled or may not be accessible from this server environment.")
+
+def _find_track(transcript_list_obj, language_code, client):
+    """
+    The track to use from a video's transcript list, or None if it has none
+    
+    The requested language (manual, then auto-generated), otherwise English,
+    otherwise whatever is listed first.
+    """
+    target_transcript = None
+    
+    if language_code:
+        # Look for specific language
+        try:
+            target_transcript = transcript_list_obj.find_transcript([language_code])
+        except client.NoTranscriptFound:
+            logger.warning("Specific language %s not found, trying auto-generated", language_code)
+            # Fallback to auto-generated in that language
+            try:
+                target_transcript = transcript_list_obj.find_generated_transcript([language_code])
+            except client.NoTranscriptFound:
+                pass
+    
+    if not target_transcript:
+        # Try English first, then auto-generated English, then any available
+        try:
+            target_transcript = transcript_list_obj.find_transcript(['en', 'en-US', 'en-GB'])
+        except client.NoTranscriptFound:
+            try:
+                target_transcript = transcript_list_obj.find_generated_transcript(['en', 'en-US', 'en-GB'])
+            except client.NoTranscriptFound:
+                # Get any available transcript
+                all_transcripts = list(transcript_list_obj)
+                if all_transcripts:
+                    target_transcript = all_transcripts[0]
+    
+    return target_transcript
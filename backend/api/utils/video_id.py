@@ -0,0 +1,49 @@
+import re
+from functools import lru_cache
+
+# Inputs longer than this are rejected rather than scanned (and cached)
+MAX_URL_LENGTH = 2048
+
+VIDEO_ID_PATTERN = re.compile(r"[0-9A-Za-z_-]{11}")
+
+# Every URL shape we accept, in one precompiled pattern. The host must be
+# youtu.be or youtube.com (any subdomain, incl. m. and music., and
+# youtube-nocookie.com), optionally after a scheme and before a port:
+#   youtu.be/ID, youtube.com/{embed,v,e,shorts,live}/ID, ?v=ID / &v=ID
+#   anywhere in the query, and legacy youtube.com/<section>/<...>/ID paths.
+_URL_PATTERN = re.compile(
+    r"^(?:https?://)?(?:[0-9A-Za-z-]+\.)*(?:"
+    r"youtu\.be(?::\d+)?/"
+    r"|youtube(?:-nocookie)?\.com(?::\d+)?(?:"
+    r"/(?:embed|v|e|shorts|live)/"
+    r"|/[^/\s]+/\S+/"
+    r"|(?:/\S*?)?[?&#]v="
+    r"))"
+    r"([0-9A-Za-z_-]{11})(?![0-9A-Za-z_-])"
+)
+
+
+@lru_cache(maxsize=4096)
+def _parse(url):
+    if VIDEO_ID_PATTERN.fullmatch(url):
+        return url
+    match = _URL_PATTERN.match(url)
+    return match.group(1) if match else None
+
+
+def parse_video_id(url):
+    """
+    Extract the 11-character video ID from a YouTube URL or bare ID
+
+    Bare IDs take a fast path; other inputs are matched against one
+    precompiled pattern and memoized, so repeated URLs cost a dict lookup.
+
+    Args:
+        url (str): YouTube URL in any supported shape, or a bare video ID
+
+    Returns:
+        str: The video ID, or None if the input is not a YouTube video
+    """
+    if not url or len(url) > MAX_URL_LENGTH:
+        return None
+    return _parse(url.strip())
@@ -0,0 +1,48 @@
+import threading
+
+_client = None
+_client_lock = threading.Lock()
+
+
+class TranscriptClient:
+    """
+    youtube_transcript_api's entry point and error types, imported together
+
+    Importing the library pulls in requests and urllib3 (roughly 80ms), and
+    even importing only its error types loads the whole package, so handlers
+    reach it through get_client() instead of importing it at module level.
+    """
+
+    def __init__(self):
+        from youtube_transcript_api import YouTubeTranscriptApi
+        from youtube_transcript_api import _errors
+
+        self.api = YouTubeTranscriptApi
+        self.TranscriptsDisabled = _errors.TranscriptsDisabled
+        self.NoTranscriptFound = _errors.NoTranscriptFound
+        self.VideoUnavailable = _errors.VideoUnavailable
+
+    def get_transcript(self, video_id, languages=None):
+        if languages:
+            return self.api.get_transcript(video_id, languages=languages)
+        return self.api.get_transcript(video_id)
+
+    def list_transcripts(self, video_id):
+        return self.api.list_transcripts(video_id)
+
+
+def get_client():
+    """Return the shared TranscriptClient, importing the library on first use."""
+    global _client
+    client = _client
+    if client is None:
+        with _client_lock:
+            if _client is None:
+                _client = TranscriptClient()
+            client = _client
+    return client
+
+
+def warm():
+    """Import the library now, e.g. at server start, so no request pays for it."""
+    get_client()
@@ -1,6 +1,9 @@
 import os
 import importlib.util
 import logging
+import signal
+import threading
+from collections.abc import Mapping
 
 # Initialize logger
 logging.basicConfig(level=logging.INFO)
@@ -19,51 +22,329 @@ DEFAULT_CONFIG = {
     "LOG_LEVEL": "INFO",
     "RATE_LIMIT": 60,
     "DETAILED_ERRORS": False,
+    "METRICS_ENABLED": True,
+    # JSON encoder for responses: "auto" (orjson, then ujson, then stdlib), or one of them
+    "JSON_SERIALIZER": "auto",
+    # Largest accepted request body (larger ones get a 413 without being read),
+    # and how long each read of it may wait on a stalled client
+    "MAX_BODY_BYTES": 1024 * 1024,
+    "BODY_READ_TIMEOUT": 10.0,
+    # Static files of at least this many bytes are sent with sendfile instead of
+    # being cached in memory; cached files are re-checked for edits this often
+    "STATIC_SENDFILE_MIN_BYTES": 64 * 1024,
+    "STATIC_CHECK_INTERVAL": 1.0,
+    # Admin-only /api/debug/profile and X-Profile request header
+    "PROFILING_ENABLED": False,
+    # Write log records from a background thread instead of the request thread
+    "LOG_ASYNC": True,
+    "LOG_QUEUE_SIZE": 10000,
+    # Transcripts kept in memory for repeat and windowed (start=/end=) requests,
+    # and how many seconds each is kept
+    "TRANSCRIPT_CACHE_SIZE": 256,
+    "TRANSCRIPT_CACHE_TTL": 3600.0,
+    # Evict the oldest transcripts while the cache holds more than this many
+    # bytes (0: only TRANSCRIPT_CACHE_SIZE applies)
+    "TRANSCRIPT_CACHE_MAX_BYTES": 0,
+    # Store cached caption text compressed: "none", "zlib" or "zstd" (needs the
+    # zstandard package), optionally with a shared dictionary file (relative
+    # to backend/) trained on caption text
+    "TRANSCRIPT_CACHE_COMPRESSION": "none",
+    "TRANSCRIPT_CACHE_DICTIONARY": "",
+    # Drop text that rolling captions repeat from the previous caption, once per
+    # auto-generated track as it is cached (manual tracks are left as they are)
+    "DEDUPE_CAPTIONS": False,
+    # Background jobs (POST /api/jobs): SQLite queue (relative to backend/),
+    # worker threads, videos fetched per second across them (0: no limit), and
+    # the most videos one job may contain
+    "JOBS_DB": "jobs.sqlite3",
+    "JOBS_WORKERS": 4,
+    "JOBS_RATE": 2.0,
+    "JOBS_MAX_ITEMS": 10000,
+    # Seconds between checks of the config file for changes (0 turns the watch
+    # off; SIGHUP still reloads it)
+    "CONFIG_RELOAD_INTERVAL": 2.0,
+    # Fraction of INFO records kept per route ("OPTIONS" covers CORS preflights)
+    "LOG_SAMPLE_RATES": {
+        "OPTIONS": 0.1,
+        "/api/ping": 0.1,
+        "/api/metrics": 0.1,
+        "static": 0.1,
+    },
 }
 
-def load_config():
+# Keys read once at startup; a reload that changes them keeps the old value
+RESTART_KEYS = frozenset({
+    "API_PORT", "LOG_ASYNC", "LOG_QUEUE_SIZE", "LOG_SAMPLE_RATES", "CONFIG_RELOAD_INTERVAL",
+    "MAX_BODY_BYTES", "BODY_READ_TIMEOUT", "STATIC_SENDFILE_MIN_BYTES", "STATIC_CHECK_INTERVAL",
+    "JOBS_DB", "JOBS_WORKERS",
+})
+
+LOG_LEVELS = ("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL")
+JSON_SERIALIZERS = ("auto", "orjson", "ujson", "json")
+CACHE_COMPRESSIONS = ("none", "zlib", "zstd")
+
+# Checks on top of "same type as the default": key -> (check, what is expected)
+CONSTRAINTS = {
+    "API_PORT": (lambda value: 0 <= value <= 65535, "a port number"),
+    "ALLOWED_REFERRERS": (lambda value: all(isinstance(entry, str) for entry in value), "a list of host names"),
+    "LOG_LEVEL": (lambda value: value in LOG_LEVELS, "one of " + ", ".join(LOG_LEVELS)),
+    "RATE_LIMIT": (lambda value: value >= 0, "0 (no limit) or more"),
+    "JSON_SERIALIZER": (lambda value: value in JSON_SERIALIZERS, "one of " + ", ".join(JSON_SERIALIZERS)),
+    "MAX_BODY_BYTES": (lambda value: value > 0, "more than 0"),
+    "BODY_READ_TIMEOUT": (lambda value: value > 0, "more than 0"),
+    "STATIC_SENDFILE_MIN_BYTES": (lambda value: value >= 0, "0 or more"),
+    "STATIC_CHECK_INTERVAL": (lambda value: value >= 0, "0 or more"),
+    "LOG_QUEUE_SIZE": (lambda value: value > 0, "more than 0"),
+    "LOG_SAMPLE_RATES": (
+        lambda value: all(isinstance(rate, (int, float)) and 0 <= rate <= 1 for rate in value.values()),
+        "route -> fraction between 0 and 1",
+    ),
+    "CONFIG_RELOAD_INTERVAL": (lambda value: value >= 0, "0 (off) or more"),
+    "TRANSCRIPT_CACHE_SIZE": (lambda value: value >= 0, "0 (no cache) or more"),
+    "TRANSCRIPT_CACHE_TTL": (lambda value: value >= 0, "0 or more"),
+    "TRANSCRIPT_CACHE_MAX_BYTES": (lambda value: value >= 0, "0 (no limit) or more"),
+    "TRANSCRIPT_CACHE_COMPRESSION": (lambda value: value in CACHE_COMPRESSIONS, "one of " + ", ".join(CACHE_COMPRESSIONS)),
+    "JOBS_WORKERS": (lambda value: value > 0, "more than 0"),
+    "JOBS_RATE": (lambda value: value >= 0, "0 (no limit) or more"),
+    "JOBS_MAX_ITEMS": (lambda value: value > 0, "more than 0"),
+}
+
+
+class ConfigError(ValueError):
+    """A config file that can't be loaded, or a value of the wrong type or range."""
+
+
+def check_value(key, value):
     """
-    Load configuration based on the environment.
-    If VERCEL_ENV is set, use production config.
-    Otherwise, use local config or default if not found.
+    Validate one value against its default's type and the key's constraints
+
+    Ints are accepted for float keys and tuples for list keys, and are
+    converted. Returns the (possibly converted) value.
+
+    Raises:
+        ConfigError: If the value is the wrong type or out of range
+    """
+    default = DEFAULT_CONFIG[key]
+    expected = type(default)
+    if expected is float and isinstance(value, int) and not isinstance(value, bool):
+        value = float(value)
+    elif expected is list and isinstance(value, tuple):
+        value = list(value)
+    if type(value) is not expected:
+        raise ConfigError(f"{key} must be of type {expected.__name__}, got {type(value).__name__} {value!r}")
+    constraint = CONSTRAINTS.get(key)
+    if constraint is not None and not constraint[0](value):
+        raise ConfigError(f"{key} must be {constraint[1]}, got {value!r}")
+    return value
+
+
+def validate_config(values):
+    """
+    Check every key of a config
+
+    Returns:
+        tuple: (config, errors) - the config with invalid values replaced by
+            their defaults, and a message per invalid value
     """
-    # Determine which config file to load
+    config = {}
+    errors = []
+    for key, default in DEFAULT_CONFIG.items():
+        try:
+            config[key] = check_value(key, values.get(key, default))
+        except ConfigError as e:
+            errors.append(str(e))
+            config[key] = default
+    return config, errors
+
+
+def config_path():
+    """The config file for this environment (VERCEL_ENV, or "local")."""
     env = os.environ.get("VERCEL_ENV", "local")
-    config_path = os.path.join(os.path.dirname(__file__), f"{env}.py")
-    
-    # Initialize with default config
+    return os.path.join(os.path.dirname(__file__), f"{env}.py")
+
+
+def read_config(path):
+    """
+    Defaults, overridden by the config file and then the environment
+
+    Raises:
+        ConfigError: If the config file exists but can't be executed
+    """
     config = DEFAULT_CONFIG.copy()
-    
-    # Try to load environment-specific config
-    if os.path.exists(config_path):
+    if os.path.exists(path):
         try:
-            spec = importlib.util.spec_from_file_location("config", config_path)
+            spec = importlib.util.spec_from_file_location("config", path)
             module = importlib.util.module_from_spec(spec)
             spec.loader.exec_module(module)
-            
-            # Update config with environment-specific values
-            for key in DEFAULT_CONFIG:
-                if hasattr(module, key):
-                    config[key] = getattr(module, key)
-            
-            logger.info(f"Loaded configuration for environment: {env}")
         except Exception as e:
-            logger.error(f"Error loading config from {config_path}: {str(e)}")
-            logger.warning("Using default configuration")
+            raise ConfigError(f"Error loading config from {path}: {str(e)}")
+        # Update config with environment-specific values
+        for key in DEFAULT_CONFIG:
+            if hasattr(module, key):
+                config[key] = getattr(module, key)
     else:
-        logger.warning(f"Config file not found: {config_path}")
+        logger.warning(f"Config file not found: {path}")
         logger.warning("Using default configuration")
-    
+
     # Override with environment variables if they exist
     if os.environ.get("API_KEY"):
         config["API_KEY"] = os.environ.get("API_KEY")
+    return config
+
+
+def load_config():
+    """
+    Load configuration based on the environment.
+    If VERCEL_ENV is set, use production config.
+    Otherwise, use local config or default if not found.
+    Invalid values are logged and replaced by their defaults.
+    """
+    path = config_path()
+    try:
+        values = read_config(path)
+        if os.path.exists(path):
+            logger.info(f"Loaded configuration for environment: {os.path.basename(path)[:-3]}")
+    except ConfigError as e:
+        logger.error(str(e))
+        logger.warning("Using default configuration")
+        values = DEFAULT_CONFIG.copy()
+    if os.environ.get("API_KEY"):
         logger.info("Using API key from environment variable")
-    
-    # Set log level based on config
-    log_level = getattr(logging, config["LOG_LEVEL"], logging.INFO)
-    logging.getLogger().setLevel(log_level)
-    
+
+    config, errors = validate_config(values)
+    for error in errors:
+        logger.error(f"Invalid configuration, using the default instead: {error}")
     return config
 
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+class Config(Mapping):
+    """
+    The active configuration, as a read-only mapping
+
+    A reload builds and validates a complete new dict and swaps it in with
+    one assignment, so a request sees either the old config or the new one,
+    never a mix; code that needs several keys to agree can take snapshot()
+    once. Anything precomputed from the config (CORS headers, referrer
+    matchers, limiter settings) is rebuilt by listeners registered with
+    subscribe(), which run after every successful reload.
+    """
+
+    def __init__(self, values, path=None):
+        self._values = values
+        self.path = path
+        self.version = 1
+        self._mtime = _mtime(path) if path else None
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._watch_stop = None
+
+    def __getitem__(self, key):
+        return self._values[key]
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def __len__(self):
+        return len(self._values)
+
+    def __repr__(self):
+        return f"Config(version={self.version}, {self._values!r})"
+
+    def snapshot(self):
+        """The current values; a reload replaces this dict rather than changing it."""
+        return self._values
+
+    def subscribe(self, listener):
+        """Call listener(values) now and after every reload that changes something."""
+        self._listeners.append(listener)
+        listener(self._values)
+
+    def apply(self, changes):
+        """
+        Validate the current config with ``changes`` applied and swap it in
+
+        Nothing is swapped if any value is invalid. Changes to RESTART_KEYS
+        are logged and ignored.
+
+        Returns:
+            bool: Whether anything changed
+        """
+        with self._lock:
+            values, errors = validate_config({**self._values, **changes})
+            if errors:
+                for error in errors:
+                    logger.error(f"Configuration not reloaded: {error}")
+                return False
+            for key in RESTART_KEYS:
+                if values[key] != self._values[key]:
+                    logger.warning(f"{key} changed; restart the server to apply it")
+                    values[key] = self._values[key]
+            changed = sorted(key for key in values if values[key] != self._values[key])
+            if not changed:
+                return False
+            self._values = values
+            self.version += 1
+            listeners = list(self._listeners)
+
+        for listener in listeners:
+            try:
+                listener(values)
+            except Exception as e:
+                logger.error(f"Error applying reloaded configuration: {str(e)}", exc_info=True)
+        logger.info(f"Configuration reloaded (version {self.version}), changed: {', '.join(changed)}")
+        return True
+
+    def reload(self):
+        """Re-read the config file and apply it; returns whether anything changed."""
+        if self.path is None:
+            return False
+        self._mtime = _mtime(self.path)
+        try:
+            values = read_config(self.path)
+        except ConfigError as e:
+            logger.error(f"Configuration not reloaded: {str(e)}")
+            return False
+        return self.apply(values)
+
+    def watch(self, interval):
+        """Reload from a background thread whenever the file's mtime changes."""
+        if not interval or self.path is None or self._watch_stop is not None:
+            return
+        self._watch_stop = stop = threading.Event()
+
+        def run():
+            while not stop.wait(interval):
+                if _mtime(self.path) != self._mtime:
+                    self.reload()
+
+        threading.Thread(target=run, name="config-watch", daemon=True).start()
+
+    def stop_watching(self):
+        if self._watch_stop is not None:
+            self._watch_stop.set()
+            self._watch_stop = None
+
+    def reload_on_sighup(self):
+        """Reload on SIGHUP, where the platform has it; call from the main thread."""
+        if not hasattr(signal, "SIGHUP"):
+            return
+        # The handler runs on the main thread, possibly while it holds the
+        # lock in apply(), so the reload itself happens on another thread
+        signal.signal(signal.SIGHUP, lambda signum, frame: threading.Thread(
+            target=self.reload, name="config-reload", daemon=True).start())
+
+
+def _apply_log_level(values):
+    logging.getLogger().setLevel(getattr(logging, values["LOG_LEVEL"], logging.INFO))
+
+
 # Load and export config
-config = load_config()
+config = Config(load_config(), config_path())
+config.subscribe(_apply_log_level)
@@ -11,7 +11,7 @@ ALLOWED_REFERRERS = ["*"]  # Allow all referrers in development
 
 # CORS Settings
 CORS_ALLOW_ORIGINS = "*"  # Allow all origins in development
-CORS_ALLOW_METHODS = "GET, POST, OPTIONS"
+CORS_ALLOW_METHODS = "GET, POST, DELETE, OPTIONS"
 CORS_ALLOW_HEADERS = "Content-Type, X-API-Key, Origin, Referer"
 
 # Logging
@@ -22,3 +22,7 @@ RATE_LIMIT = 0  # No rate limiting in development
 
 # Security
 DETAILED_ERRORS = True  # Show detailed errors in development
+
+# Profiling (/api/debug/profile and X-Profile header, requires the API key);
+# set to True to opt in
+PROFILING_ENABLED = False
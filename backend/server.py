@@ -2,10 +2,11 @@ import http.server
 import socketserver
 import os
 import sys
-import json
+import hmac
+import threading
 import time
 from pathlib import Path
-from urllib.parse import urlparse, parse_qs
+from urllib.parse import urlparse
 from http import HTTPStatus
 import logging
 
@@ -17,9 +18,16 @@ sys.path.insert(0, script_dir)
 # Import configuration
 from config import config
 
-# Configure logging
-logging.basicConfig(level=getattr(logging, config["LOG_LEVEL"]))
+# Configure logging (queued to a background thread, with sampling for noisy routes)
+from api.utils.log_setup import configure_logging
+configure_logging(
+    level=config["LOG_LEVEL"],
+    async_logging=config["LOG_ASYNC"],
+    queue_size=config["LOG_QUEUE_SIZE"],
+    sample_rates=config["LOG_SAMPLE_RATES"],
+)
 logger = logging.getLogger(__name__)
+access_logger = logging.getLogger("access")
 
 # Set the port for the server
 PORT = config["API_PORT"]
@@ -28,8 +36,31 @@ PORT = config["API_PORT"]
 os.chdir(script_dir)
 
 # Import transcript utilities
-from api.utils.transcript_utils import get_transcript_text, get_available_languages
-from youtube_transcript_api._errors import TranscriptsDisabled, NoTranscriptFound, VideoUnavailable
+from api.utils.transcript_utils import (
+    fetch_languages, fetch_transcript, fetch_translations, get_transcript_text, get_available_languages
+)
+from api.utils.formatting import GROUPINGS, format_transcript
+from api.utils.segments import (
+    check_string_params, chunks_response, parse_chunking, parse_languages, parse_translate_to, parse_window, transcript_body,
+    transcript_cache, window_response
+)
+from api.utils.compression import get_codec
+from api.utils.video_id import parse_video_id
+from api.utils.metrics import (
+    http_requests_in_flight, http_requests_total, process_start_time_seconds,
+    record_rate_limited, record_request, render_metrics, route_label
+)
+from api.utils.timing import RequestTimer, new_request_id
+from api.utils.profiling import profiler, ProfilerBusy
+from api.utils import serialization
+from api.utils.serialization import dumps
+from api.utils.youtube_client import get_client, warm as warm_transcript_client
+from api.utils.static_files import StaticFiles, accepts_gzip, etag_matches, send_variant
+from api.utils.jobs import DEFAULT_PAGE_SIZE, JobManager, JobNotFound, Throttle
+from api.utils.referrers import ReferrerMatcher
+from api.utils.routing import (
+    Router, RoutedHandlerMixin, check_referrer, json_body, rate_limit
+)
 
 # For rate limiting
 class RateLimiter:
@@ -37,12 +68,17 @@ class RateLimiter:
         self.rate_limit = rate_limit
         self.request_counts = {}
         self.last_cleanup = time.time()
+        self.lock = threading.Lock()
     
     def is_rate_limited(self, client_ip):
         # No rate limiting if disabled
         if self.rate_limit <= 0:
             return False
-            
+        
+        with self.lock:
+            return self._record_request(client_ip)
+    
+    def _record_request(self, client_ip):
         current_time = time.time()
         
         # Clean up old entries every minute
@@ -75,270 +111,464 @@ class RateLimiter:
 # Initialize rate limiter
 rate_limiter = RateLimiter(config["RATE_LIMIT"])
 
-class LocalDevHandler(http.server.SimpleHTTPRequestHandler):
+# Background jobs: batches of videos fetched by worker threads, queued in SQLite
+job_manager = JobManager(
+    os.path.join(script_dir, config["JOBS_DB"]),
+    fetch=get_transcript_text,
+    workers=config["JOBS_WORKERS"],
+    rate=config["JOBS_RATE"],
+    max_items=config["JOBS_MAX_ITEMS"],
+)
+JOBS_PREFIX = "/api/jobs/"
+
+# Derived from the config by apply_config(), and rebuilt when it is reloaded
+cors_headers = ()
+referrer_matcher = None
+
+def load_cache_codec(values):
+    """The transcript cache's codec, with the dictionary file if one is set."""
+    dictionary = b""
+    if values["TRANSCRIPT_CACHE_DICTIONARY"]:
+        try:
+            dictionary = Path(script_dir, values["TRANSCRIPT_CACHE_DICTIONARY"]).read_bytes()
+        except OSError as e:
+            logger.error("Could not read TRANSCRIPT_CACHE_DICTIONARY, compressing without it: %s", e)
+    return get_codec(values["TRANSCRIPT_CACHE_COMPRESSION"], dictionary)
+
+def apply_config(values):
+    """Rebuild what is precomputed from the config; runs at startup and after every reload."""
+    global cors_headers, referrer_matcher
+    # The limiter keeps its per-IP history; only the limit changes
+    rate_limiter.rate_limit = values["RATE_LIMIT"]
+    cors_headers = (
+        ('Access-Control-Allow-Origin', values["CORS_ALLOW_ORIGINS"]),
+        ('Access-Control-Allow-Methods', values["CORS_ALLOW_METHODS"]),
+        ('Access-Control-Allow-Headers', values["CORS_ALLOW_HEADERS"]),
+    )
+    referrer_matcher = ReferrerMatcher(values["ALLOWED_REFERRERS"])
+    serialization.use(values["JSON_SERIALIZER"])
+    job_manager.throttle = Throttle(values["JOBS_RATE"])
+    job_manager.max_items = values["JOBS_MAX_ITEMS"]
+    transcript_cache.configure(
+        values["TRANSCRIPT_CACHE_SIZE"], values["TRANSCRIPT_CACHE_TTL"], values["DEDUPE_CAPTIONS"],
+        codec=load_cache_codec(values), max_bytes=values["TRANSCRIPT_CACHE_MAX_BYTES"],
+    )
+
+config.subscribe(apply_config)
+
+# Constant responses, serialized once at import
+HELLO_RESPONSE = dumps({"message": "Hello from YouTube Transcript API!", "status": "ok"})
+PING_RESPONSE = dumps({"message": "pong", "status": "ok"})
+INDEX_RESPONSE = dumps({
+    "message": "YouTube Transcript API",
+    "status": "ok",
+    "endpoints": [
+        "/api/transcript_v2",
+        "/api/transcript/chunks",
+        "/api/languages",
+        "/api/hello",
+        "/api/test",
+        "/api/ping",
+        "/api/diagnostic",
+        "/api/network_test",
+        "/api/transcript_test",
+        "/api/metrics",
+        "/api/jobs"
+    ]
+})
+
+# Frontend files, loaded once and reloaded when they change on disk
+static_files = StaticFiles(
+    Path(script_dir) / "public",
+    sendfile_min_bytes=config["STATIC_SENDFILE_MIN_BYTES"],
+    check_interval=config["STATIC_CHECK_INTERVAL"],
+)
+
+class LocalDevHandler(RoutedHandlerMixin, http.server.SimpleHTTPRequestHandler):
     """Custom request handler that serves static files and handles API requests."""
     
     def __init__(self, *args, **kwargs):
         self.public_dir = Path(script_dir) / "public"
         super().__init__(*args, directory=str(self.public_dir), **kwargs)
     
+    def handle_one_request(self):
+        """Handle a single request, recording its status and latency."""
+        self._status = None
+        self.timer = None
+        self._profile = None
+        self._start_time = start = time.perf_counter()
+        http_requests_in_flight.inc()
+        try:
+            super().handle_one_request()
+        finally:
+            http_requests_in_flight.dec()
+            if self._profile is not None:
+                profiler.finish_request(self._profile)
+            if self._status is not None:
+                route = route_label(self.path.split('?', 1)[0])
+                record_request(route, self.command, self._status, time.perf_counter() - start)
+    
+    def parse_request(self):
+        """Parse the request line and headers, then start profiling if requested."""
+        if not super().parse_request():
+            return False
+        if config["PROFILING_ENABLED"]:
+            on_demand = bool(self.headers.get('X-Profile')) and self.is_admin()
+            self._profile = profiler.start_request(on_demand=on_demand)
+        return True
+    
+    def end_headers(self):
+        """Finish the headers, pointing X-Profile requests at their result."""
+        if self._profile is not None and self._profile.store:
+            self.send_header('X-Profile-Id', self._profile.profile_id)
+        super().end_headers()
+    
+    def is_admin(self):
+        """Whether the request carries the configured API key."""
+        api_key = self.headers.get('X-API-Key', '')
+        return bool(api_key) and hmac.compare_digest(api_key, config["API_KEY"])
+    
+    def log_message(self, format, *args):
+        """Route the access log through logging so it is queued and sampled."""
+        if self.command == 'OPTIONS':
+            route = "OPTIONS"
+        else:
+            route = route_label(self.path.split('?', 1)[0]) if hasattr(self, 'path') else None
+        access_logger.info("%s - " + format, self.client_address[0], *args, extra={"route": route})
+    
+    def send_response(self, code, message=None):
+        """Send the response line, remembering the status code for metrics."""
+        self._status = code
+        super().send_response(code, message)
+    
     def do_GET(self):
-        """Handle GET requests to the API endpoints."""
-        # Check if this is an API request
-        parsed_url = urlparse(self.path)
-        # Normalize path to remove trailing slash for endpoint matching
-        path = parsed_url.path.rstrip('/')
-        query_params = parse_qs(parsed_url.query)
+        """Dispatch API routes; anything else is served from public/."""
+        if not self.dispatch() and not self.send_static():
+            # Directory redirects and listings, and 404s
+            super().do_GET()
+    
+    def do_HEAD(self):
+        """Headers of a file in public/."""
+        if not self.send_static(head=True):
+            super().do_HEAD()
+    
+    def send_static(self, head=False):
+        """Serve a file from public/ through the asset cache; returns False if there is no such file."""
+        asset = static_files.get(self.path.split('?', 1)[0])
+        if asset is None:
+            return False
+        variant = asset.variant(self.headers.get('Accept-Encoding', ''))
+        not_modified = etag_matches(self.headers.get('If-None-Match', ''), variant.etag)
+        self.send_response(304 if not_modified else 200)
+        self.send_header('ETag', variant.etag)
+        self.send_header('Cache-Control', asset.cache_control)
+        self.send_header('Last-Modified', asset.last_modified)
+        if asset.gzipped is not None:
+            self.send_header('Vary', 'Accept-Encoding')
+        if not_modified:
+            self.end_headers()
+            return True
+        self.send_header('Content-Type', asset.content_type)
+        self.send_header('Content-Length', str(variant.length))
+        if variant.encoding:
+            self.send_header('Content-Encoding', variant.encoding)
+        self.end_headers()
+        if not head:
+            send_variant(self, variant)
+        return True
+    
+    def do_POST(self):
+        """Dispatch API routes; unknown paths get a 404."""
+        if not self.dispatch():
+            # Log unhandled POST requests for debugging
+            logger.warning("Unhandled POST request to path: %s", self.path)
+            self.send_error(HTTPStatus.NOT_FOUND, "Endpoint not found")
+    
+    def do_DELETE(self):
+        """Dispatch API routes; unknown paths get a 404."""
+        if not self.dispatch():
+            self.send_error_json(404, "Endpoint not found")
+    
+    def reject(self, status_code, message):
+        """Answer with a JSON error; used by the routing middleware."""
+        if self.timer:
+            self.timer.annotate(error=message)
+        self.send_error_json(status_code, message)
+    
+    def handle_languages_api(self, request):
+        """Handle requests to the languages API endpoint."""
+        # Skipping API key validation in local development
+        url = request.param('url')
+        logger.info("Processing languages API request to: %s with URL: %s", request.path, url)
         
-        # Handle languages API endpoint
-        if path in ("/api/languages", "/api/languages_v4"):
-            # Check rate limiting
-            client_ip = self.client_address[0]
-            if rate_limiter.is_rate_limited(client_ip):
-                self.send_error_json(429, "Too many requests. Please try again later.")
-                return
-                
-            # Skipping API key validation in local development
-            logger.info(f"Processing languages API request to: {path} with URL: {query_params.get('url', [''])[0]}")
-            
-            # Verify referrer if allowed referrers are specified
-            if config["ALLOWED_REFERRERS"] and config["ALLOWED_REFERRERS"] != ["*"]:
-                referrer = self.headers.get('Referer', '')
-                valid_referrer = False
-                
-                if referrer:
-                    referrer_host = referrer.split('/')[2] if '://' in referrer else referrer
-                    
-                    for allowed in config["ALLOWED_REFERRERS"]:
-                        # Handle wildcard subdomains
-                        if allowed.startswith('*.') and referrer_host.endswith(allowed[1:]):
-                            valid_referrer = True
-                            break
-                        # Direct match
-                        elif allowed == referrer_host:
-                            valid_referrer = True
-                            break
-                
-                if not valid_referrer:
-                    client_ip = self.client_address[0]
-                    logger.warning(f"Invalid referrer: {referrer} from IP: {client_ip}")
-                    self.send_error_json(403, "Forbidden - Invalid referrer")
-                    return
-            
-            # Get URL from query string
-            url = query_params.get('url', [''])[0]
-            
-            if not url:
-                self.send_error_json(400, "Missing YouTube URL")
-                return
-            
-            logger.info(f"Processing languages request for URL: {url}")
-            
-            try:
-                languages = get_available_languages(url)
-                self.send_success_json({"languages": languages})
-            except ValueError as ve:
-                logger.error(f"Value error: {str(ve)}")
-                self.send_error_json(400, str(ve))
-            except (TranscriptsDisabled, NoTranscriptFound) as e:
-                logger.error(f"Transcript not available: {str(e)}")
-                self.send_error_json(404, "Transcripts not available for this video")
-            except VideoUnavailable as e:
-                logger.error(f"Video unavailable: {str(e)}")
-                self.send_error_json(400, "This video is unavailable or does not exist")
-            except Exception as e:
-                logger.error(f"Unexpected error: {str(e)}", exc_info=True)
-                self.send_error_json(500, "An error occurred while processing your request")
+        if not url:
+            self.send_error_json(400, "Missing YouTube URL")
             return
         
-        # Handle hello API endpoint
-        if path == "/api/hello":
-            self.send_json_response({"message": "Hello from YouTube Transcript API!", "status": "ok"})
-            return
-            
-        # Handle test API endpoint
-        if path == "/api/test":
-            self.send_json_response({"message": "Test endpoint working!", "status": "ok", "timestamp": time.time()})
-            return
-            
-        # Handle ping API endpoint
-        if path == "/api/ping":
-            self.send_json_response({"message": "pong", "status": "ok"})
+        client = get_client()
+        try:
+            languages = get_available_languages(url)
+            self.send_success_json({"languages": languages})
+        except ValueError as ve:
+            logger.error("Value error: %s", ve)
+            self.send_error_json(400, str(ve))
+        except (client.TranscriptsDisabled, client.NoTranscriptFound) as e:
+            logger.error("Transcript not available: %s", e)
+            self.send_error_json(404, "Transcripts not available for this video")
+        except client.VideoUnavailable as e:
+            logger.error("Video unavailable: %s", e)
+            self.send_error_json(400, "This video is unavailable or does not exist")
+        except Exception as e:
+            logger.error("Unexpected error: %s", e, exc_info=True)
+            self.send_error_json(500, "An error occurred while processing your request")
+    
+    def handle_metrics_api(self, request):
+        """Handle requests to the metrics endpoint."""
+        if not config["METRICS_ENABLED"]:
+            self.send_error_json(404, "Endpoint not found")
             return
-            
-        # Handle index API endpoint
-        if path == "/api" or path == "/api/":
-            self.send_json_response({
-                "message": "YouTube Transcript API", 
-                "status": "ok",
-                "endpoints": [
-                    "/api/transcript_v2",
-                    "/api/languages", 
-                    "/api/hello",
-                    "/api/test",
-                    "/api/ping",
-                    "/api/diagnostic",
-                    "/api/network_test",
-                    "/api/transcript_test"
+        self.send_metrics()
+    
+    def handle_test_api(self, request):
+        """Handle GET requests to the test endpoint."""
+        self.send_json_response({"message": "Test endpoint working!", "status": "ok", "timestamp": time.time()})
+    
+    def handle_diagnostic_info(self, request):
+        """Handle GET requests to the diagnostic endpoint."""
+        self.send_json_response({
+            "message": "Diagnostic endpoint", 
+            "status": "ok",
+            "server_info": {
+                "version": "1.0.0",
+                "environment": "local",
+                "cors_enabled": True,
+                "uptime_seconds": round(time.time() - process_start_time_seconds.value(), 3),
+                "requests_served": http_requests_total.total()
+            }
+        })
+    
+    def handle_network_test_info(self, request):
+        """Handle GET requests to the network test endpoint."""
+        self.send_json_response({
+            "message": "Network test successful", 
+            "status": "ok",
+            "network_info": {
+                "server_reachable": True,
+                "response_time": self.elapsed_ms(),
+                "cors_headers": True
+            }
+        })
+    
+    def handle_transcript_test_info(self, request):
+        """Handle GET requests to the transcript test endpoint."""
+        self.send_json_response({
+            "message": "Transcript test endpoint", 
+            "status": "ok",
+            "test_info": {
+                "youtube_api_available": True,
+                "sample_videos": [
+                    "https://www.youtube.com/watch?v=fJ9rUzIMcZQ",  # Google I/O 2023
+                    "https://www.youtube.com/watch?v=9bZkp7q19f0",  # Next.js Conf
+                    "https://www.youtube.com/watch?v=v2AC41dglnM"   # CGP Grey
                 ]
-            })
+            }
+        })
+    
+    def handle_transcript_api(self, request):
+        """Handle requests to the transcript API endpoint (JSON body for POST, query parameters for GET)."""
+        # Skipping API key validation in local development
+        timer = self.timer
+        get = request.json.get if request.method == 'POST' else (lambda name: request.param(name, None))
+        try:
+            check_string_params(get, ('url', 'language', 'group', 'format'))
+        except ValueError as ve:
+            self.reject(400, str(ve))
             return
+        url = get('url') or ''
+        language_code = get('language')
+        # "text" returns the formatted transcript as text/plain instead of JSON
+        response_format = get('format') or 'json'
+        # "sentences" or "paragraphs" merges the captions into larger blocks
+        grouping = get('group') or None
         
-        # Handle diagnostic API endpoint
-        if path == "/api/diagnostic":
-            # This endpoint can handle both GET and POST
-            if self.command == 'GET':
-                self.send_json_response({
-                    "message": "Diagnostic endpoint", 
-                    "status": "ok",
-                    "server_info": {
-                        "version": "1.0.0",
-                        "environment": "local",
-                        "cors_enabled": True
-                    }
-                })
+        if not url:
+            self.reject(400, "Missing YouTube URL")
             return
-            
-        # Handle network test API endpoint  
-        if path == "/api/network_test":
-            self.send_json_response({
-                "message": "Network test successful", 
-                "status": "ok",
-                "network_info": {
-                    "server_reachable": True,
-                    "response_time": "< 1ms",
-                    "cors_headers": True
-                }
-            })
+        if grouping is not None and grouping not in GROUPINGS:
+            self.reject(400, f"Invalid group: must be one of {', '.join(GROUPINGS)}")
             return
-            
-        # Handle transcript test API endpoint
-        if path == "/api/transcript_test":
-            self.send_json_response({
-                "message": "Transcript test endpoint", 
-                "status": "ok",
-                "test_info": {
-                    "youtube_api_available": True,
-                    "sample_videos": [
-                        "https://www.youtube.com/watch?v=fJ9rUzIMcZQ",  # Google I/O 2023
-                        "https://www.youtube.com/watch?v=9bZkp7q19f0",  # Next.js Conf
-                        "https://www.youtube.com/watch?v=v2AC41dglnM"   # CGP Grey
-                    ]
-                }
-            })
+        try:
+            # start=/end= (seconds) and offset=/limit= (segments) select part of it
+            window = parse_window(get)
+        except ValueError as ve:
+            self.reject(400, f"Invalid transcript window: {str(ve)}")
+            return
+        try:
+            # One or more languages to machine-translate the track into
+            targets = parse_translate_to(get('translate_to'))
+        except ValueError as ve:
+            self.reject(400, str(ve))
+            return
+        if targets is not None and len(targets) > 1 and response_format == 'text':
+            self.reject(400, "The text format takes a single translate_to language")
+            return
+        try:
+            # Several tracks at once, e.g. ["en", "es", "de"], keyed by language
+            languages = parse_languages(get('languages'))
+        except ValueError as ve:
+            self.reject(400, str(ve))
+            return
+        if languages is not None and (targets is not None or response_format == 'text'):
+            self.reject(400, "languages can't be combined with translate_to or the text format")
             return
         
-        # For all other GET requests, use the parent class implementation
-        super().do_GET()
+        client = get_client()
+        try:
+            if languages is not None:
+                transcripts, errors = fetch_languages(url, languages, timer=timer)
+                self.send_languages(transcripts, errors, grouping, window)
+                return
+            if targets is not None:
+                translations = fetch_translations(url, targets, language_code, timer=timer)
+                self.send_translations(translations, grouping, window, response_format)
+                return
+            if window is not None:
+                transcript = fetch_transcript(url, language_code, timer=timer)
+                if grouping is not None:
+                    with timer.phase("format"):
+                        transcript = transcript.grouped(grouping)
+                self.send_transcript_window(transcript, window, response_format)
+                return
+            if accepts_gzip(self.headers.get('Accept-Encoding', '')):
+                # Compressed once per cached transcript, then sent as is
+                transcript = fetch_transcript(url, language_code, timer=timer)
+                with timer.phase("format"):
+                    body = transcript.gzipped_body(grouping, response_format)
+                timer.annotate(gzipped_bytes=len(body))
+                content_type = 'text/plain; charset=utf-8' if response_format == 'text' else 'application/json'
+                self.write_body(200, body, content_type, encoding='gzip')
+                return
+            transcript_text = get_transcript_text(url, language_code, timer=timer, grouping=grouping)
+            timer.annotate(transcript_chars=len(transcript_text))
+            if response_format == 'text':
+                self.send_text(200, transcript_text)
+            else:
+                self.send_success_json({"transcript": transcript_text})
+        except Exception as e:
+            self.reject_transcript_error(client, e)
     
-    def do_POST(self):
-        # Parse URL and normalize path to remove trailing slash for endpoint matching
-        parsed_url = urlparse(self.path)
-        path = parsed_url.path.rstrip('/')
+    def send_translations(self, translations, grouping, window, response_format):
+        """Send one translated transcript like any other, or several keyed by language."""
+        timer = self.timer
+        if grouping is not None:
+            with timer.phase("format"):
+                translations = {target: transcript.grouped(grouping) for target, transcript in translations.items()}
+        if len(translations) == 1:
+            (target, transcript), = translations.items()
+            if window is not None:
+                self.send_transcript_window(transcript, window, response_format)
+                return
+            with timer.phase("format"):
+                transcript_text = transcript.text
+            if response_format == 'text':
+                self.send_text(200, transcript_text)
+            else:
+                self.send_success_json({"transcript": transcript_text, "translation": target})
+            return
+        with timer.phase("format"):
+            data = {target: transcript_body(transcript, window) for target, transcript in translations.items()}
+        self.send_success_json({"translations": data})
+    
+    def send_languages(self, transcripts, errors, grouping, window):
+        """Send the transcript in several languages, keyed by language, with an error for each one missing."""
+        with self.timer.phase("format"):
+            data = {}
+            for code, transcript in transcripts.items():
+                if grouping is not None:
+                    transcript = transcript.grouped(grouping)
+                data[code] = transcript_body(transcript, window)
+            data.update((code, {"error": message}) for code, message in errors.items())
+        self.send_success_json({"languages": data})
+    
+    def reject_transcript_error(self, client, error):
+        """Answer a failed transcript fetch with the matching status."""
+        if isinstance(error, (client.TranscriptsDisabled, client.NoTranscriptFound)):
+            self.reject(404, f"Transcript not available for this video: {str(error)}")
+        elif isinstance(error, client.VideoUnavailable):
+            self.reject(400, f"Cannot process video: {str(error)}")
+        elif isinstance(error, ValueError):
+            self.reject(400, str(error))
+        else:
+            logger.error("Unexpected error: %s", error, exc_info=error)
+            self.reject(500, f"Internal server error: {str(error)}")
+    
+    def handle_chunks_api(self, request):
+        """
+        Split a transcript into overlapping chunks for embedding and LLM pipelines
         
-        # Handle API requests
-        if path in ("/api/transcript", "/api/transcript_v2"):
-            self.handle_transcript_api()
+        Takes url, language and translate_to like /api/transcript, plus size,
+        overlap and unit ("tokens" or "chars"). Each parameter set is split
+        once per cached transcript.
+        """
+        timer = self.timer
+        get = request.json.get if request.method == 'POST' else (lambda name: request.param(name, None))
+        try:
+            check_string_params(get, ('url', 'language', 'unit'))
+        except ValueError as ve:
+            self.reject(400, str(ve))
             return
-            
-        # Handle diagnostic API endpoint (POST)
-        if path == "/api/diagnostic":
-            self.handle_diagnostic_api()
+        url = get('url') or ''
+        language_code = get('language')
+        
+        if not url:
+            self.reject(400, "Missing YouTube URL")
             return
-            
-        # Handle network test API endpoint (POST)
-        if path == "/api/network_test":
-            self.handle_network_test_api()
+        try:
+            chunking = parse_chunking(get)
+        except ValueError as ve:
+            self.reject(400, f"Invalid chunking: {str(ve)}")
             return
-            
-        # Handle transcript test API endpoint (POST)
-        if path == "/api/transcript_test":
-            self.handle_transcript_test_api()
+        try:
+            targets = parse_translate_to(get('translate_to'))
+        except ValueError as ve:
+            self.reject(400, str(ve))
             return
         
-        # Log unhandled POST requests for debugging
-        logger.warning(f"Unhandled POST request to path: {path}")
-        # If not an API request, return 404
-        self.send_error(HTTPStatus.NOT_FOUND, "Endpoint not found")
-    
-    def handle_transcript_api(self):
-        """Handle requests to the transcript API endpoint."""
+        client = get_client()
         try:
-            # Skipping API key validation in local development
-            logger.info(f"Processing transcript API request. Headers: {self.headers}")
-            
-            # Verify referrer if allowed referrers are specified
-            if config["ALLOWED_REFERRERS"] and config["ALLOWED_REFERRERS"] != ["*"]:
-                referrer = self.headers.get('Referer', '')
-                valid_referrer = False
-                
-                if referrer:
-                    referrer_host = referrer.split('/')[2] if '://' in referrer else referrer
-                    
-                    for allowed in config["ALLOWED_REFERRERS"]:
-                        # Handle wildcard subdomains
-                        if allowed.startswith('*.') and referrer_host.endswith(allowed[1:]):
-                            valid_referrer = True
-                            break
-                        # Direct match
-                        elif allowed == referrer_host:
-                            valid_referrer = True
-                            break
-                
-                if not valid_referrer:
-                    client_ip = self.client_address[0]
-                    logger.warning(f"Invalid referrer: {referrer} from IP: {client_ip}")
-                    self.send_error_json(403, "Forbidden - Invalid referrer")
-                    return
-            
-            # Get the request body
-            content_length = int(self.headers.get('Content-Length', 0))
-            post_data = self.rfile.read(content_length)
-            request_data = json.loads(post_data.decode('utf-8'))
-            
-            url = request_data.get('url', '')
-            language_code = request_data.get('language', None)
-            
-            if not url:
-                self.send_error_json(400, "Missing YouTube URL")
-                return
-            
-            logger.info(f"Processing request for URL: {url}, Language: {language_code or 'auto'}")
-            
-            try:
-                transcript_text = get_transcript_text(url, language_code)
-                logger.info(f"Successfully retrieved transcript, length: {len(transcript_text)}")
-                self.send_success_json({"transcript": transcript_text})
-            except (TranscriptsDisabled, NoTranscriptFound) as e:
-                logger.error(f"Transcript not available: {str(e)}")
-                self.send_error_json(404, f"Transcript not available for this video: {str(e)}")
-            except VideoUnavailable as e:
-                logger.error(f"Video unavailable: {str(e)}")
-                self.send_error_json(400, f"Cannot process video: {str(e)}")
-            except ValueError as ve:
-                logger.error(f"Value error: {str(ve)}")
-                self.send_error_json(400, str(ve))
-            except Exception as e:
-                logger.error(f"Unexpected error: {str(e)}", exc_info=True)
-                self.send_error_json(500, f"Internal server error: {str(e)}")
-                
-        except json.JSONDecodeError:
-            self.send_error_json(400, "Invalid JSON")
+            if targets is None:
+                transcript = fetch_transcript(url, language_code, timer=timer)
+                with timer.phase("format"):
+                    data = chunks_response(transcript, chunking)
+                timer.annotate(chunks=data["total"], chunking=chunking)
+            else:
+                translations = fetch_translations(url, targets, language_code, timer=timer)
+                with timer.phase("format"):
+                    data = {target: chunks_response(transcript, chunking) for target, transcript in translations.items()}
+                timer.annotate(chunking=chunking)
+                # A single language is answered like an untranslated request
+                data = data[targets[0]] if len(targets) == 1 else {"translations": data}
+            self.send_success_json(data)
         except Exception as e:
-            logger.error(f"Server error: {str(e)}", exc_info=True)
-            self.send_error_json(500, f"Server error: {str(e)}")
+            self.reject_transcript_error(client, e)
+    
+    def send_transcript_window(self, transcript, window, response_format):
+        """Send the segments of a transcript that fall in a window, as JSON or text."""
+        with self.timer.phase("format"):
+            if response_format == 'text':
+                body = format_transcript(transcript.window(**window)[0])
+            else:
+                data = window_response(transcript, window)
+        self.timer.annotate(window=window)
+        if response_format == 'text':
+            self.send_text(200, body)
+        else:
+            self.send_success_json(data)
     
-    def handle_diagnostic_api(self):
+    def handle_diagnostic_api(self, request):
         """Handle requests to the diagnostic API endpoint."""
         try:
-            # Get the request body if present
-            content_length = int(self.headers.get('Content-Length', 0))
-            if content_length > 0:
-                post_data = self.rfile.read(content_length)
-                request_data = json.loads(post_data.decode('utf-8'))
-                url = request_data.get('url', '')
-            else:
-                url = ''
+            url = request.json.get('url', '')
             
             # Perform diagnostic checks
             diagnostic_info = {
@@ -352,7 +582,7 @@ class LocalDevHandler(http.server.SimpleHTTPRequestHandler):
             if url:
                 # Add URL-specific diagnostics
                 diagnostic_info["url_analysis"] = {
-                    "valid_youtube_url": "youtube.com" in url or "youtu.be" in url,
+                    "valid_youtube_url": parse_video_id(url) is not None,
                     "url_provided": url
                 }
             
@@ -362,27 +592,17 @@ class LocalDevHandler(http.server.SimpleHTTPRequestHandler):
                 "diagnostics": diagnostic_info
             })
             
-        except json.JSONDecodeError:
-            self.send_error_json(400, "Invalid JSON")
         except Exception as e:
-            logger.error(f"Diagnostic error: {str(e)}", exc_info=True)
+            logger.error("Diagnostic error: %s", e, exc_info=True)
             self.send_error_json(500, f"Diagnostic error: {str(e)}")
     
-    def handle_network_test_api(self):
+    def handle_network_test_api(self, request):
         """Handle requests to the network test API endpoint."""
         try:
-            # Get the request body if present
-            content_length = int(self.headers.get('Content-Length', 0))
-            if content_length > 0:
-                post_data = self.rfile.read(content_length)
-                request_data = json.loads(post_data.decode('utf-8'))
-            else:
-                request_data = {}
-            
             # Perform network tests
             network_info = {
                 "server_reachable": True,
-                "response_time": "< 1ms",
+                "response_time": self.elapsed_ms(),
                 "cors_headers": True,
                 "server_time": time.time(),
                 "request_method": "POST",
@@ -395,21 +615,14 @@ class LocalDevHandler(http.server.SimpleHTTPRequestHandler):
                 "network_info": network_info
             })
             
-        except json.JSONDecodeError:
-            self.send_error_json(400, "Invalid JSON")
         except Exception as e:
-            logger.error(f"Network test error: {str(e)}", exc_info=True)
+            logger.error("Network test error: %s", e, exc_info=True)
             self.send_error_json(500, f"Network test error: {str(e)}")
     
-    def handle_transcript_test_api(self):
+    def handle_transcript_test_api(self, request):
         """Handle requests to the transcript test API endpoint."""
         try:
-            # Get the request body
-            content_length = int(self.headers.get('Content-Length', 0))
-            post_data = self.rfile.read(content_length)
-            request_data = json.loads(post_data.decode('utf-8'))
-            
-            url = request_data.get('url', '')
+            url = request.json.get('url', '')
             
             if not url:
                 self.send_error_json(400, "Missing YouTube URL")
@@ -431,46 +644,154 @@ class LocalDevHandler(http.server.SimpleHTTPRequestHandler):
                 "test_result": test_result
             })
             
-        except json.JSONDecodeError:
-            self.send_error_json(400, "Invalid JSON")
         except Exception as e:
-            logger.error(f"Transcript test error: {str(e)}", exc_info=True)
+            logger.error("Transcript test error: %s", e, exc_info=True)
             self.send_error_json(500, f"Transcript test error: {str(e)}")
     
+    def elapsed_ms(self):
+        """Server-side time spent on the current request so far, e.g. "0.42ms"."""
+        return f"{(time.perf_counter() - self._start_time) * 1000:.2f}ms"
+    
+    def handle_profile_api(self, request):
+        """Profile live requests for ?seconds=N, or return a stored X-Profile result by ?id=."""
+        if not config["PROFILING_ENABLED"]:
+            self.send_error_json(404, "Endpoint not found")
+            return
+        if not self.is_admin():
+            logger.warning("Unauthorized profiling request from IP: %s", self.client_address[0])
+            self.send_error_json(401, "Unauthorized - Invalid or missing API key")
+            return
+        
+        profile_id = request.param('id')
+        if profile_id:
+            dump = profiler.stored_profile(profile_id)
+            if dump is None:
+                self.send_error_json(404, "Profile not found")
+            else:
+                self.send_text(200, dump)
+            return
+        
+        try:
+            seconds = float(request.param('seconds', '10'))
+            limit = int(request.param('limit', '50'))
+            mode = request.param('mode', 'cprofile')
+            sort = request.param('sort', 'cumulative')
+            logger.info("Starting %s profiling session for %ss", mode, seconds)
+            self.send_text(200, profiler.run_session(seconds, mode=mode, sort=sort, limit=limit))
+        except ProfilerBusy as e:
+            self.send_error_json(409, str(e))
+        except (ValueError, KeyError) as e:
+            self.send_error_json(400, f"Invalid profiling parameters: {str(e)}")
+    
+    def handle_create_job_api(self, request):
+        """Queue a batch of videos: {"videos": [...], "language": ...}, or one video per NDJSON line."""
+        data = request.json
+        if isinstance(data, list):
+            videos, language = data, None
+        else:
+            videos, language = data.get('videos'), data.get('language')
+        if not isinstance(videos, list):
+            self.reject(400, "Missing list of videos")
+            return
+        
+        items = []
+        for video in videos:
+            if isinstance(video, str):
+                items.append((video, language))
+            elif isinstance(video, dict) and isinstance(video.get('url'), str):
+                items.append((video['url'], video.get('language', language)))
+            else:
+                self.reject(400, 'Each video must be a URL, a video ID or {"url": ..., "language": ...}')
+                return
+        
+        try:
+            job_id = job_manager.submit(items)
+        except ValueError as ve:
+            self.reject(400, str(ve))
+            return
+        self.write_json(202, {
+            "job_id": job_id,
+            "status": "queued",
+            "total": len(items),
+            "status_url": JOBS_PREFIX + job_id,
+        })
+    
+    def handle_list_jobs_api(self, request):
+        """The most recent jobs and their progress; admin only, since job IDs are the only access check."""
+        if not self.is_admin():
+            logger.warning("Unauthorized job listing request from IP: %s", self.client_address[0])
+            self.reject(401, "Unauthorized - Invalid or missing API key")
+            return
+        self.send_success_json({"jobs": job_manager.list()})
+    
+    def handle_job_api(self, request):
+        """A job's progress and a page of its results (?offset=&limit=), or cancel it (DELETE)."""
+        job_id = request.path[len(JOBS_PREFIX):]
+        try:
+            if request.method == 'DELETE':
+                job_manager.cancel(job_id)
+                self.send_success_json(job_manager.get(job_id, limit=0))
+                return
+            offset = int(request.param('offset', '0'))
+            limit = int(request.param('limit', str(DEFAULT_PAGE_SIZE)))
+            if offset < 0 or limit < 0:
+                raise ValueError("offset and limit must not be negative")
+            self.send_success_json(job_manager.get(job_id, offset, limit))
+        except JobNotFound:
+            self.reject(404, "Job not found")
+        except ValueError as ve:
+            self.reject(400, f"Invalid paging parameters: {str(ve)}")
+    
+    def send_metrics(self):
+        """Send all metrics in the Prometheus text exposition format."""
+        self.send_text(200, render_metrics(), 'text/plain; version=0.0.4; charset=utf-8')
+    
+    def send_text(self, status_code, text, content_type='text/plain; charset=utf-8'):
+        """Send a plain text response with the specified status code."""
+        self.write_body(status_code, text.encode('utf-8'), content_type)
+    
+    def write_json(self, status_code, data):
+        """Serialize data and send it as a JSON response with CORS and timing headers."""
+        if self.timer:
+            with self.timer.phase("serialize"):
+                body = dumps(data)
+        else:
+            body = dumps(data)
+        self.write_body(status_code, body, 'application/json')
+    
+    def write_body(self, status_code, body, content_type, encoding=None):
+        """Send an already encoded (and, with encoding, compressed) response body with CORS and timing headers."""
+        self.send_response(status_code)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+            self.send_header('Vary', 'Accept-Encoding')
+        for header in cors_headers:
+            self.send_header(*header)
+        if self.timer:
+            self.send_header('Server-Timing', self.timer.server_timing())
+            self.send_header('X-Request-ID', self.timer.request_id)
+            self.send_header('Access-Control-Expose-Headers', 'Server-Timing, X-Request-ID')
+            self.send_header('Timing-Allow-Origin', config["CORS_ALLOW_ORIGINS"])
+        self.end_headers()
+        self.wfile.write(body)
+    
     def send_success_json(self, data):
         """Send a JSON response with a 200 status code."""
-        self.send_response(200)
-        self.send_header('Content-Type', 'application/json')
-        self.send_header('Access-Control-Allow-Origin', config["CORS_ALLOW_ORIGINS"])
-        self.send_header('Access-Control-Allow-Methods', config["CORS_ALLOW_METHODS"])
-        self.send_header('Access-Control-Allow-Headers', config["CORS_ALLOW_HEADERS"])
-        self.end_headers()
-        self.wfile.write(json.dumps(data).encode('utf-8'))
+        self.write_json(200, data)
     
     def send_json_response(self, data, status_code=200):
         """Send a JSON response with the specified status code."""
-        self.send_response(status_code)
-        self.send_header('Content-Type', 'application/json')
-        self.send_header('Access-Control-Allow-Origin', config["CORS_ALLOW_ORIGINS"])
-        self.send_header('Access-Control-Allow-Methods', config["CORS_ALLOW_METHODS"])
-        self.send_header('Access-Control-Allow-Headers', config["CORS_ALLOW_HEADERS"])
-        self.end_headers()
-        self.wfile.write(json.dumps(data).encode('utf-8'))
+        self.write_json(status_code, data)
     
     def send_error_json(self, status_code, message):
         """Send a JSON error response with the specified status code."""
-        self.send_response(status_code)
-        self.send_header('Content-Type', 'application/json')
-        self.send_header('Access-Control-Allow-Origin', config["CORS_ALLOW_ORIGINS"])
-        self.send_header('Access-Control-Allow-Methods', config["CORS_ALLOW_METHODS"])
-        self.send_header('Access-Control-Allow-Headers', config["CORS_ALLOW_HEADERS"])
-        self.end_headers()
-        
         # In production, don't expose detailed error messages
         if not config["DETAILED_ERRORS"] and status_code >= 500:
             message = "Internal server error"
             
-        self.wfile.write(json.dumps({"detail": message}).encode('utf-8'))
+        self.write_json(status_code, {"detail": message})
     
     def do_OPTIONS(self):
         """Handle OPTIONS requests for CORS preflight."""
@@ -478,25 +799,113 @@ class LocalDevHandler(http.server.SimpleHTTPRequestHandler):
         path = parsed_url.path.rstrip('/')
         
         # Log the OPTIONS request for debugging
-        logger.info(f"Handling OPTIONS request for path: {path}")
+        logger.info("Handling OPTIONS request for path: %s", path, extra={"route": "OPTIONS"})
         
         self.send_response(200)
-        self.send_header('Access-Control-Allow-Origin', config["CORS_ALLOW_ORIGINS"])
-        self.send_header('Access-Control-Allow-Methods', config["CORS_ALLOW_METHODS"])
-        self.send_header('Access-Control-Allow-Headers', config["CORS_ALLOW_HEADERS"])
+        for header in cors_headers:
+            self.send_header(*header)
         self.end_headers()
 
+def timed(handler, request, call_next):
+    """Middleware timing the request's phases and logging one structured line for it."""
+    handler.timer = timer = RequestTimer(new_request_id(handler.headers.get('X-Request-ID')))
+    try:
+        return call_next(handler, request)
+    except Exception as e:
+        logger.error("Server error: %s", e, exc_info=True)
+        handler.reject(500, f"Server error: {str(e)}")
+    finally:
+        # One structured line per request, with the phase breakdown
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("%s", timer.log_line(
+                route=request.path,
+                method=request.method,
+                status=handler._status,
+                client_ip=handler.client_address[0],
+            ), extra={"route": route_label(request.path)})
+
+def constant_json(body):
+    """View sending a pre-serialized JSON body."""
+    def view(handler, request):
+        handler.write_body(200, body, 'application/json')
+    return view
+
+# Route table: (method, path) -> view, with the middleware each route needs
+limited = rate_limit(rate_limiter, on_limited=lambda request: record_rate_limited(route_label(request.path)))
+referrer_checked = check_referrer(lambda: referrer_matcher)
+
+def parsed_json(required=True, lines=False):
+    """json_body() with the configured size limit and read timeout."""
+    return json_body(required, max_bytes=config["MAX_BODY_BYTES"], timeout=config["BODY_READ_TIMEOUT"], lines=lines)
+
+router = Router()
+router.add("GET", ("/api/languages", "/api/languages_v4"), LocalDevHandler.handle_languages_api,
+           middleware=(limited, referrer_checked))
+router.add("POST", ("/api/transcript", "/api/transcript_v2"), LocalDevHandler.handle_transcript_api,
+           middleware=(timed, limited, referrer_checked, parsed_json()))
+# GET takes the same parameters in the query string, e.g. ?url=...&start=2400&end=2700
+router.add("GET", ("/api/transcript", "/api/transcript_v2"), LocalDevHandler.handle_transcript_api,
+           middleware=(timed, limited, referrer_checked))
+router.add("POST", "/api/transcript/chunks", LocalDevHandler.handle_chunks_api,
+           middleware=(timed, limited, referrer_checked, parsed_json()))
+router.add("GET", "/api/transcript/chunks", LocalDevHandler.handle_chunks_api,
+           middleware=(timed, limited, referrer_checked))
+router.add("GET", "/api/metrics", LocalDevHandler.handle_metrics_api)
+router.add("GET", "/api/debug/profile", LocalDevHandler.handle_profile_api)
+router.add("GET", "/api/hello", constant_json(HELLO_RESPONSE))
+router.add("GET", "/api/ping", constant_json(PING_RESPONSE))
+router.add("GET", "/api", constant_json(INDEX_RESPONSE))
+router.add("GET", "/api/test", LocalDevHandler.handle_test_api)
+router.add("GET", "/api/diagnostic", LocalDevHandler.handle_diagnostic_info)
+router.add("POST", "/api/diagnostic", LocalDevHandler.handle_diagnostic_api, middleware=(parsed_json(required=False),))
+router.add("GET", "/api/network_test", LocalDevHandler.handle_network_test_info)
+router.add("POST", "/api/network_test", LocalDevHandler.handle_network_test_api,
+           middleware=(parsed_json(required=False),))
+router.add("GET", "/api/transcript_test", LocalDevHandler.handle_transcript_test_info)
+router.add("POST", "/api/transcript_test", LocalDevHandler.handle_transcript_test_api, middleware=(parsed_json(),))
+router.add("POST", "/api/jobs", LocalDevHandler.handle_create_job_api,
+           middleware=(timed, limited, referrer_checked, parsed_json(lines=True)))
+router.add("GET", "/api/jobs", LocalDevHandler.handle_list_jobs_api, middleware=(referrer_checked,))
+# Progress is polled, so reads aren't rate limited
+router.add("GET", JOBS_PREFIX + "*", LocalDevHandler.handle_job_api, middleware=(referrer_checked,))
+router.add("DELETE", JOBS_PREFIX + "*", LocalDevHandler.handle_job_api, middleware=(limited, referrer_checked))
+LocalDevHandler.router = router
+
+class ThreadingServer(socketserver.ThreadingTCPServer):
+    """Handle each request on its own thread so slow requests don't block others."""
+    daemon_threads = True
+    allow_reuse_address = True
+    # The socketserver default of 5 drops connections in bursts
+    request_queue_size = 128
+
+def create_server(port=PORT, host=""):
+    """Create the HTTP server with the custom handler (port 0 picks a free port)."""
+    return ThreadingServer((host, port), LocalDevHandler)
+
 # Create an HTTP server with the custom handler
 Handler = LocalDevHandler
-httpd = socketserver.TCPServer(("", PORT), Handler)
 
-print(f"Starting local development server at http://localhost:{PORT}")
-print("This server simulates the Vercel deployment environment.")
-print("Press Ctrl+C to stop the server")
+def main():
+    httpd = create_server()
+    # Pick up config edits without a restart
+    config.watch(config["CONFIG_RELOAD_INTERVAL"])
+    config.reload_on_sighup()
+    # Resume jobs queued before the last shutdown
+    job_manager.start()
+    # A long-running server imports the transcript library up front
+    warm_transcript_client()
+    
+    print(f"Starting local development server at http://localhost:{PORT}")
+    print("This server simulates the Vercel deployment environment.")
+    print("Press Ctrl+C to stop the server")
+    
+    # Start the server
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("\nServer stopped.")
+        job_manager.stop()
+        httpd.server_close()
 
-# Start the server
-try:
-    httpd.serve_forever()
-except KeyboardInterrupt:
-    print("\nServer stopped.")
-    httpd.shutdown()
+if __name__ == "__main__":
+    main()
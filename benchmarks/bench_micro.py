@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the per-request hot paths.
+
+Covers transcript formatting (from the library's dicts and from the
+cache's compact segments), video-ID parsing (memoized and uncached),
+time-range lookups in a cached transcript (plain and zlib-compressed),
+grouping captions into paragraphs, de-duplicating rolling captions,
+splitting into token-budget chunks and JSON encoding of the transcript response (with the encoder
+selected by JSON_SERIALIZER, "auto" by default), with synthetic
+transcripts from 10 to 100k segments. Results are compared against the
+stored baseline (benchmarks/baselines/micro.json) so that optimizations and
+regressions in the formatting path are visible across commits. With
+--memory, the memory a cached transcript's segments hold is reported too.
+
+Examples:
+    python benchmarks/bench_micro.py                  # compare with baseline
+    python benchmarks/bench_micro.py --save-baseline  # record a new baseline
+    python benchmarks/bench_micro.py --quick --memory
+"""
+
+import argparse
+import json
+import os
+import sys
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fake_youtube
+from common import add_backend_to_path, find_regressions, load_baseline, print_table, save_baseline
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "micro.json")
+SIZES = (10, 100, 1000, 10000, 100000)
+QUICK_SIZES = (10, 100, 1000, 10000)
+
+# URL shapes seen in requests; the ID parser is timed over all of them
+SAMPLE_URLS = (
+    "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
+    "https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=42s&list=PL1234567890",
+    "https://youtu.be/dQw4w9WgXcQ?si=abcdef",
+    "https://m.youtube.com/watch?v=dQw4w9WgXcQ",
+    "https://www.youtube.com/embed/dQw4w9WgXcQ",
+    "https://www.youtube.com/shorts/dQw4w9WgXcQ",
+    "https://www.youtube.com/live/dQw4w9WgXcQ?feature=share",
+    "dQw4w9WgXcQ",
+)
+
+
+def time_per_call(func, repeat):
+    """Best-of-``repeat`` seconds per call, with the loop count picked by timeit."""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def peak_memory(func):
+    """Peak bytes allocated by Python while running ``func`` once."""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def build_cases(sizes):
+    """Name -> (size, callable) for every benchmark."""
+    fake_youtube.install()
+    add_backend_to_path()
+    from api.utils import formatting, serialization, video_id
+    from api.utils.compact import CompactSegments
+    from api.utils.compression import get_codec
+    from api.utils.segments import Transcript
+
+    zlib_codec = get_codec("zlib")
+    uncached_parse = video_id._parse.__wrapped__
+    cases = {
+        "parse_video_id": (len(SAMPLE_URLS), lambda: [video_id.parse_video_id(url) for url in SAMPLE_URLS]),
+        "parse_video_id/uncached": (len(SAMPLE_URLS), lambda: [uncached_parse(url) for url in SAMPLE_URLS]),
+    }
+    for size in sizes:
+        segments = fake_youtube.make_segments(size)
+        text = formatting.format_transcript(segments)
+        compact = CompactSegments.from_dicts(segments)
+        cases[f"format_transcript/{size}"] = (size, lambda s=segments: formatting.format_transcript(s))
+        cases[f"format_transcript/compact/{size}"] = (size, lambda s=compact: formatting.format_transcript(s))
+        cases[f"json_response/{size}"] = (size, lambda t=text: serialization.dumps({"transcript": t}))
+        # A 5-minute start=/end= window from the middle of a cached transcript
+        transcript = Transcript("dQw4w9WgXcQ", None, compact)
+        middle = segments[size // 2]['start']
+        cases[f"transcript_window/{size}"] = (size, lambda t=transcript, m=middle: t.window(start=m, end=m + 300))
+        # The same from a cache storing the text compressed: each window inflates it
+        packed = Transcript("dQw4w9WgXcQ", None, CompactSegments.from_dicts(segments, zlib_codec))
+        cases[f"transcript_window/zlib/{size}"] = (size, lambda t=packed, m=middle: t.window(start=m, end=m + 300))
+        cases[f"group_paragraphs/{size}"] = (size, lambda s=segments: formatting.group_segments(s, "paragraphs"))
+        rolling = fake_youtube.make_segments(size, rolling=True)
+        cases[f"dedupe_captions/{size}"] = (size, lambda s=rolling: formatting.dedupe_segments(s))
+        cases[f"chunk_tokens/{size}"] = (size, lambda s=segments: formatting.chunk_segments(s, 512, 64))
+    return cases
+
+
+def retained_memory(build):
+    """Bytes still allocated by Python, after ``build`` returns, for what it built."""
+    tracemalloc.start()
+    try:
+        built = build()
+        retained = tracemalloc.get_traced_memory()[0]
+        del built
+        return retained
+    finally:
+        tracemalloc.stop()
+
+
+def cache_memory_rows(sizes):
+    """Memory held per cached transcript: the library's list of dicts vs CompactSegments, plain and zlib."""
+    add_backend_to_path()
+    from api.utils.compact import CompactSegments
+    from api.utils.compression import get_codec
+
+    zlib_codec = get_codec("zlib")
+
+    rows = []
+    for size in sizes:
+        # Parsed from JSON so every segment has its own objects, as the library's do
+        raw = json.dumps(fake_youtube.make_segments(size))
+        for layout, build in (
+            ("dicts", lambda: json.loads(raw)),
+            ("compact", lambda: CompactSegments.from_dicts(json.loads(raw))),
+            ("compact+zlib", lambda: CompactSegments.from_dicts(json.loads(raw), zlib_codec)),
+        ):
+            retained = retained_memory(build)
+            rows.append({
+                "segments": f"{layout}/{size}",
+                "retained_kib": round(retained / 1024, 1),
+                "bytes_per_segment": round(retained / size, 1),
+            })
+    return rows
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quick", action="store_true", help="skip the 100k-segment cases")
+    parser.add_argument("--repeat", type=int, default=5, help="timing repeats (best is kept)")
+    parser.add_argument("--memory", action="store_true", help="also report peak allocated memory")
+    parser.add_argument("--filter", default="", help="only run benchmarks whose name contains this")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline file to compare with")
+    parser.add_argument("--save-baseline", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown vs baseline (0.25 = 25%%)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    cases = build_cases(QUICK_SIZES if args.quick else SIZES)
+
+    rows = []
+    results = {}
+    for name, (size, func) in cases.items():
+        if args.filter not in name:
+            continue
+        seconds = time_per_call(func, args.repeat)
+        row = {
+            "benchmark": name,
+            "per_call_us": round(seconds * 1e6, 3),
+            "per_item_ns": round(seconds * 1e9 / size, 1),
+        }
+        if args.memory:
+            row["peak_kib"] = round(peak_memory(func) / 1024, 1)
+        rows.append(row)
+        results[name] = {key: value for key, value in row.items() if key != "benchmark"}
+
+    columns = ["benchmark", "per_call_us", "per_item_ns"] + (["peak_kib"] if args.memory else [])
+    print_table(rows, columns)
+    if args.memory:
+        print("\nMemory held by a cached transcript's segments:")
+        print_table(cache_memory_rows(QUICK_SIZES), ["segments", "retained_kib", "bytes_per_segment"])
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        save_baseline(args.baseline, results)
+        print(f"\nBaseline written to {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print("\nNo baseline found; run with --save-baseline to create one.")
+        return 0
+
+    regressions = find_regressions(results, load_baseline(args.baseline), {"per_call_us": "lower"}, args.threshold)
+    if regressions:
+        print("\nRegressions against baseline:")
+        for regression in regressions:
+            print(f"  {regression}")
+        return 1
+    print("\nNo regressions against baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
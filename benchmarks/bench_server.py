@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark of the HTTP handlers against a fake YouTube upstream.
+
+Runs backend/server.py and the Vercel handlers in api/ in-process on free
+local ports, with youtube_transcript_api replaced by benchmarks/fake_youtube.py,
+and reports throughput, latency percentiles and memory for three workloads:
+
+- cold:  every request asks for a video not requested before
+- warm:  requests cycle over a few videos that were already requested
+- batch: bursts of distinct videos requested all at once
+
+Examples:
+    python benchmarks/bench_server.py
+    python benchmarks/bench_server.py --latency 0.05 --segments 5000 --targets server
+    python benchmarks/bench_server.py --json results.json
+    python benchmarks/bench_server.py --baseline results.json --threshold 0.2
+"""
+
+import argparse
+import concurrent.futures
+import http.client
+import http.server
+import importlib.util
+import itertools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import urllib.parse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fake_youtube
+from common import (
+    VERCEL_API_DIR, add_backend_to_path, current_rss_mb, find_regressions,
+    load_baseline, print_table, save_baseline, summarize_latencies
+)
+
+WORKLOADS = ("cold", "warm", "batch")
+# Metrics checked against --baseline and which direction is better
+REGRESSION_METRICS = {"throughput_rps": "higher", "p95_ms": "lower"}
+
+_run_ids = itertools.count()
+
+
+def video_ids(prefix, count):
+    """Distinct, valid 11-character video IDs."""
+    run = next(_run_ids)
+    return [f"{prefix}{run:02d}{i:08d}"[:11] for i in range(count)]
+
+
+def watch_url(video_id):
+    return f"https://www.youtube.com/watch?v={video_id}"
+
+
+class BenchHTTPServer(http.server.ThreadingHTTPServer):
+    """Local stand-in for the Vercel runtime serving one handler."""
+    request_queue_size = 128
+
+
+def load_vercel_handler(name):
+    """Import api/<name>.py by path and return its handler class."""
+    path = os.path.join(VERCEL_API_DIR, f"{name}.py")
+    spec = importlib.util.spec_from_file_location(f"bench_vercel_{name}", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    class QuietHandler(module.handler):
+        # Vercel collects logs itself; skip the per-request stderr line
+        def log_message(self, format, *args):
+            pass
+
+    return QuietHandler
+
+
+def start_server(server):
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def start_backend_server():
+    add_backend_to_path()
+    import server as backend_server
+
+    return start_server(backend_server.create_server(port=0, host="127.0.0.1"))
+
+
+def start_vercel_server(name):
+    handler = load_vercel_handler(name)
+    return start_server(BenchHTTPServer(("127.0.0.1", 0), handler))
+
+
+class Target:
+    """An endpoint to benchmark and how to build a request for a video."""
+
+    def __init__(self, name, start, method, path, query_param=None):
+        self.name = name
+        self.start = start
+        self.method = method
+        self.path = path
+        self.query_param = query_param
+        self.server = None
+
+    def request(self, video_id):
+        """Send one request, returning (seconds, ok)."""
+        host, port = self.server.server_address[:2]
+        connection = http.client.HTTPConnection(host, port, timeout=60)
+        body = None
+        headers = {}
+        path = self.path
+        if self.method == "GET":
+            path += "?" + urllib.parse.urlencode({self.query_param: watch_url(video_id)})
+        else:
+            body = json.dumps({"url": watch_url(video_id)})
+            headers["Content-Type"] = "application/json"
+        started = time.perf_counter()
+        try:
+            connection.request(self.method, path, body=body, headers=headers)
+            response = connection.getresponse()
+            payload = response.read()
+            ok = response.status == 200 and b'"error"' not in payload[:200]
+        except OSError:
+            ok = False
+        finally:
+            connection.close()
+        return time.perf_counter() - started, ok
+
+
+TARGETS = {
+    "server": lambda: Target("server", start_backend_server, "POST", "/api/transcript"),
+    "server_languages": lambda: Target("server_languages", start_backend_server, "GET", "/api/languages", "url"),
+    "transcript_v2": lambda: Target("transcript_v2", lambda: start_vercel_server("transcript_v2"),
+                                    "POST", "/api/transcript_v2"),
+    "languages_v4": lambda: Target("languages_v4", lambda: start_vercel_server("languages_v4"),
+                                   "GET", "/api/languages", "url"),
+}
+
+
+def run_requests(target, ids, concurrency):
+    """Request every ID with a pool of client threads; returns (latencies, errors, seconds)."""
+    latencies = []
+    errors = 0
+    started = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for seconds, ok in pool.map(target.request, ids):
+            latencies.append(seconds)
+            errors += 0 if ok else 1
+    return latencies, errors, time.perf_counter() - started
+
+
+def run_workload(target, workload, args):
+    if workload == "cold":
+        return run_requests(target, video_ids("c", args.requests), args.concurrency)
+
+    if workload == "warm":
+        hot = video_ids("w", args.warm_videos)
+        run_requests(target, hot, args.concurrency)  # prime, not measured
+        ids = [hot[i % len(hot)] for i in range(args.requests)]
+        return run_requests(target, ids, args.concurrency)
+
+    # batch: send bursts of batch_size distinct videos at once
+    latencies, errors, seconds = [], 0, 0.0
+    remaining = args.requests
+    while remaining > 0:
+        size = min(args.batch_size, remaining)
+        batch_latencies, batch_errors, batch_seconds = run_requests(target, video_ids("b", size), size)
+        latencies.extend(batch_latencies)
+        errors += batch_errors
+        seconds += batch_seconds
+        remaining -= size
+    return latencies, errors, seconds
+
+
+def benchmark(target, workload, args, upstream):
+    upstream.reset_calls()
+    rss_before = current_rss_mb()
+    if args.tracemalloc:
+        tracemalloc.start()
+    latencies, errors, seconds = run_workload(target, workload, args)
+    row = {
+        "target": target.name,
+        "workload": workload,
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / seconds, 1) if seconds else 0.0,
+    }
+    row.update(summarize_latencies(latencies))
+    if args.tracemalloc:
+        row["heap_peak_mb"] = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 2)
+        tracemalloc.stop()
+    row["rss_mb"] = current_rss_mb()
+    row["rss_delta_mb"] = round(row["rss_mb"] - rss_before, 2)
+    row["upstream_calls"] = sum(upstream.calls.values())
+    return row
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--targets", default=",".join(TARGETS), help="comma-separated targets: " + ", ".join(TARGETS))
+    parser.add_argument("--workloads", default=",".join(WORKLOADS), help="comma-separated workloads")
+    parser.add_argument("--requests", type=int, default=200, help="requests per workload")
+    parser.add_argument("--concurrency", type=int, default=8, help="client threads for cold/warm")
+    parser.add_argument("--batch-size", type=int, default=50, help="videos per burst in the batch workload")
+    parser.add_argument("--warm-videos", type=int, default=10, help="distinct videos in the warm workload")
+    parser.add_argument("--latency", type=float, default=0.02, help="fake upstream latency per call (s)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random upstream latency (s)")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="fraction of upstream calls that fail")
+    parser.add_argument("--segments", type=int, default=500, help="segments per fake transcript")
+    parser.add_argument("--tracemalloc", action="store_true", help="also report the Python heap peak (slower)")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="compare against results saved with --json")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed regression vs baseline (0.2 = 20%%)")
+    parser.add_argument("--log-level", default="WARNING", help="server log level during the run")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    upstream = fake_youtube.install(fake_youtube.FakeUpstream(
+        latency=args.latency,
+        jitter=args.jitter,
+        failure_rate=args.failure_rate,
+        segments=args.segments,
+    ))
+
+    rows = []
+    servers = {}
+    for name in args.targets.split(","):
+        target = TARGETS[name.strip()]()
+        # Targets served by the same module share one running server
+        if target.start not in servers:
+            servers[target.start] = target.start()
+            logging.getLogger().setLevel(args.log_level)
+        target.server = servers[target.start]
+        for workload in args.workloads.split(","):
+            rows.append(benchmark(target, workload.strip(), args, upstream))
+
+    for server in servers.values():
+        server.shutdown()
+        server.server_close()
+
+    columns = ["target", "workload", "requests", "errors", "throughput_rps",
+               "p50_ms", "p95_ms", "p99_ms", "rss_mb", "rss_delta_mb", "upstream_calls"]
+    if args.tracemalloc:
+        columns.insert(-1, "heap_peak_mb")
+    print_table(rows, columns)
+
+    results = {f"{row['target']}/{row['workload']}": row for row in rows}
+    if args.json:
+        save_baseline(args.json, results)
+    if args.baseline:
+        regressions = find_regressions(results, load_baseline(args.baseline), REGRESSION_METRICS, args.threshold)
+        if regressions:
+            print("\nRegressions against baseline:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print("\nNo regressions against baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
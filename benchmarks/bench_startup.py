@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark: how long each handler module takes to import.
+
+Every run imports one handler in a fresh interpreter, the way a new Vercel
+instance or a restarted local server does, and reports the median import
+time, how many modules it loaded and whether youtube_transcript_api (the
+most expensive dependency) was imported. The real library is used when it
+is installed, since its import cost is what this measures.
+
+Examples:
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --targets transcript_v2,server --detail 10
+    python benchmarks/bench_startup.py --budget-ms 20
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from common import BACKEND_DIR, ROOT_DIR, VERCEL_API_DIR, print_table, save_baseline
+
+TARGETS = {
+    "transcript_v2": os.path.join(VERCEL_API_DIR, "transcript_v2.py"),
+    "languages_v4": os.path.join(VERCEL_API_DIR, "languages_v4.py"),
+    "index": os.path.join(VERCEL_API_DIR, "index.py"),
+    "ping": os.path.join(VERCEL_API_DIR, "ping.py"),
+    "hello": os.path.join(VERCEL_API_DIR, "hello.py"),
+    "diagnostic": os.path.join(VERCEL_API_DIR, "diagnostic.py"),
+    "server": os.path.join(BACKEND_DIR, "server.py"),
+    "backend_transcript": os.path.join(BACKEND_DIR, "api", "transcript.py"),
+    "backend_languages": os.path.join(BACKEND_DIR, "api", "languages.py"),
+}
+
+# Printed to stderr right before the handler is imported, so -X importtime
+# lines for the interpreter's own startup can be skipped
+MARKER = "--- handler import ---"
+
+CHILD = """
+import importlib.util, json, sys, time
+path = sys.argv[1]
+before = len(sys.modules)
+print(%r, file=sys.stderr, flush=True)
+started = time.perf_counter()
+spec = importlib.util.spec_from_file_location("bench_startup_handler", path)
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+elapsed = time.perf_counter() - started
+print(json.dumps({
+    "import_ms": elapsed * 1000,
+    "modules": len(sys.modules) - before,
+    "transcript_api": "youtube_transcript_api" in sys.modules,
+}))
+""" % MARKER
+
+
+def run_child(path, importtime=False):
+    """Import ``path`` in a new interpreter; returns (result dict, stderr)."""
+    command = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", CHILD, path]
+    completed = subprocess.run(command, cwd=ROOT_DIR, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1] if completed.stderr else "import failed")
+    return json.loads(completed.stdout.strip().splitlines()[-1]), completed.stderr
+
+
+def slowest_imports(stderr, limit):
+    """Top-level modules imported by the handler, by cumulative microseconds."""
+    rows = []
+    seen_marker = False
+    for line in stderr.splitlines():
+        if line == MARKER:
+            seen_marker = True
+            continue
+        if not seen_marker or not line.startswith("import time:"):
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        # Nested imports are indented under the module that triggered them
+        if cumulative.isdigit() and not line.split("|")[2].startswith("  "):
+            rows.append((int(cumulative), name))
+    return sorted(rows, reverse=True)[:limit]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--targets", default=",".join(TARGETS), help="comma-separated targets: " + ", ".join(TARGETS))
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per target (median is reported)")
+    parser.add_argument("--detail", type=int, default=0, help="also list the N slowest imports per target")
+    parser.add_argument("--budget-ms", type=float, help="exit with status 1 if any import takes longer")
+    parser.add_argument("--json", help="write results to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    rows = []
+    details = {}
+    for name in (target.strip() for target in args.targets.split(",")):
+        path = TARGETS[name]
+        try:
+            runs = [run_child(path)[0] for _ in range(args.runs)]
+        except RuntimeError as e:
+            rows.append({"target": name, "error": str(e)})
+            continue
+        rows.append({
+            "target": name,
+            "import_ms": round(statistics.median(run["import_ms"] for run in runs), 2),
+            "max_ms": round(max(run["import_ms"] for run in runs), 2),
+            "modules": runs[-1]["modules"],
+            "transcript_api": runs[-1]["transcript_api"],
+        })
+        if args.detail:
+            details[name] = slowest_imports(run_child(path, importtime=True)[1], args.detail)
+
+    print_table(rows, ["target", "import_ms", "max_ms", "modules", "transcript_api", "error"])
+    for name, imports in details.items():
+        print(f"\n{name}: slowest imports")
+        for cumulative, module in imports:
+            print(f"  {cumulative / 1000:8.2f} ms  {module}")
+
+    if args.json:
+        save_baseline(args.json, {row["target"]: row for row in rows})
+
+    failed = [row for row in rows if "error" in row]
+    if args.budget_ms is not None:
+        over = [row for row in rows if row.get("import_ms", 0) > args.budget_ms]
+        for row in over:
+            print(f"\n{row['target']}: {row['import_ms']} ms is over the {args.budget_ms} ms budget")
+        failed.extend(over)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+"""Shared helpers for the benchmark scripts: paths, statistics, baselines."""
+
+import json
+import math
+import os
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKEND_DIR = os.path.join(ROOT_DIR, "backend")
+VERCEL_API_DIR = os.path.join(ROOT_DIR, "api")
+
+
+def add_backend_to_path():
+    """Make the backend's ``config`` and ``api`` packages importable."""
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(fraction * len(sorted_values))
+    return sorted_values[min(len(sorted_values), max(rank, 1)) - 1]
+
+
+def summarize_latencies(latencies):
+    """p50/p95/p99/mean in milliseconds for a list of durations in seconds."""
+    ordered = sorted(latencies)
+    mean = sum(ordered) / len(ordered) if ordered else 0.0
+    return {
+        "p50_ms": round(percentile(ordered, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(ordered, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 3),
+        "mean_ms": round(mean * 1000, 3),
+    }
+
+
+def current_rss_mb():
+    """Resident set size of this process in MiB (peak RSS where /proc is missing)."""
+    try:
+        with open("/proc/self/statm") as statm:
+            pages = int(statm.read().split()[1])
+        return round(pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024), 2)
+    except (OSError, ValueError, AttributeError):
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is KiB on Linux, bytes on macOS
+        divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+        return round(peak / divisor, 2)
+
+
+def load_baseline(path):
+    with open(path, encoding="utf-8") as baseline_file:
+        return json.load(baseline_file)
+
+
+def save_baseline(path, results):
+    with open(path, "w", encoding="utf-8") as baseline_file:
+        json.dump(results, baseline_file, indent=2, sort_keys=True)
+        baseline_file.write("\n")
+
+
+def find_regressions(results, baseline, metrics, threshold):
+    """
+    Compare results against a stored baseline
+
+    Args:
+        results (dict): Benchmark name -> {metric: value}
+        baseline (dict): Same shape, from a previous run
+        metrics (dict): Metric name -> "lower" or "higher" (which is better)
+        threshold (float): Allowed relative slowdown, e.g. 0.2 for 20%
+
+    Returns:
+        list: Human-readable descriptions of every regression found
+    """
+    regressions = []
+    for name, values in sorted(results.items()):
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        for metric, better in metrics.items():
+            old, new = previous.get(metric), values.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if better == "higher":
+                change = -change
+            if change > threshold:
+                regressions.append(f"{name}: {metric} {old} -> {new} ({change:+.0%} worse)")
+    return regressions
+
+
+def print_table(rows, columns):
+    """Print a list of dicts as an aligned text table."""
+    widths = {column: max(len(column), *(len(str(row.get(column, ""))) for row in rows)) for column in columns}
+    print("  ".join(column.ljust(widths[column]) for column in columns))
+    for row in rows:
+        print("  ".join(str(row.get(column, "")).ljust(widths[column]) for column in columns))
@@ -0,0 +1,213 @@
+"""
+Local stand-in for the youtube_transcript_api package.
+
+install() registers fake ``youtube_transcript_api`` and
+``youtube_transcript_api._errors`` modules in sys.modules, so any handler
+imported afterwards talks to a FakeUpstream instead of YouTube. The upstream's
+latency, failure rate and transcript size are configurable.
+"""
+
+import random
+import sys
+import threading
+import time
+import types
+
+WORDS = (
+    "the quick brown fox jumps over a lazy dog while we talk about "
+    "transcripts captions latency throughput caches and python"
+).split()
+
+
+class CouldNotRetrieveTranscript(Exception):
+    pass
+
+
+class TranscriptsDisabled(CouldNotRetrieveTranscript):
+    pass
+
+
+class NoTranscriptFound(CouldNotRetrieveTranscript):
+    pass
+
+
+class VideoUnavailable(CouldNotRetrieveTranscript):
+    pass
+
+
+class TooManyRequests(CouldNotRetrieveTranscript):
+    pass
+
+
+def make_segments(count, words_per_segment=8, seed=0, rolling=False):
+    """
+    Build a synthetic transcript of ``count`` segments.
+
+    With rolling=True each segment starts by repeating the second half of
+    the previous one, like auto-generated rolling captions.
+    """
+    rng = random.Random(seed)
+    segments = []
+    start = 0.0
+    words = []
+    for _ in range(count):
+        duration = round(rng.uniform(1.5, 4.5), 3)
+        repeated = words[len(words) // 2:] if rolling else []
+        words = repeated + [rng.choice(WORDS) for _ in range(words_per_segment - len(repeated))]
+        text = " ".join(words)
+        segments.append({"text": text, "start": round(start, 3), "duration": duration})
+        start += duration
+    return segments
+
+
+class FakeUpstream:
+    """
+    Configurable fake of the YouTube transcript service.
+
+    Args:
+        latency (float): Mean seconds added to every upstream call
+        jitter (float): Maximum extra random seconds per call
+        failure_rate (float): Probability that a call raises TranscriptsDisabled
+        segments (int): Segments per transcript
+        languages (tuple): Manually created language codes; each also gets an
+            auto-generated track
+        seed (int): Seed for failures and jitter
+        rolling (bool): Auto-generated tracks repeat text from one caption to
+            the next, like YouTube's rolling captions
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, failure_rate=0.0, segments=500,
+                 languages=("en", "es", "de"), seed=0, rolling=False):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.segment_count = segments
+        self.languages = tuple(languages)
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._template = make_segments(segments, seed=seed)
+        self._generated_template = make_segments(segments, seed=seed, rolling=True) if rolling else self._template
+        self.calls = {"get_transcript": 0, "list_transcripts": 0, "fetch": 0, "translate": 0}
+
+    def _call(self, name, video_id):
+        with self._lock:
+            self.calls[name] += 1
+            failed = self._rng.random() < self.failure_rate
+            delay = self.latency + (self._rng.random() * self.jitter if self.jitter else 0.0)
+        if delay:
+            time.sleep(delay)
+        if video_id.startswith("unavailable"):
+            raise VideoUnavailable(video_id)
+        if failed:
+            raise TranscriptsDisabled(video_id)
+
+    def segments(self, generated=False):
+        # Fresh dicts per call, like the real client parsing the caption XML
+        template = self._generated_template if generated else self._template
+        return [dict(segment) for segment in template]
+
+    def reset_calls(self):
+        with self._lock:
+            for name in self.calls:
+                self.calls[name] = 0
+
+
+class FakeTranscript:
+    def __init__(self, upstream, video_id, language_code, is_generated):
+        self._upstream = upstream
+        self.video_id = video_id
+        self.language_code = language_code
+        self.language = f"Language {language_code}"
+        self.is_generated = is_generated
+        self.is_translatable = True
+        self.translation_languages = [
+            {"language_code": code, "language": f"Language {code}"} for code in upstream.languages
+        ]
+
+    def fetch(self):
+        self._upstream._call("fetch", self.video_id)
+        return self._upstream.segments(self.is_generated)
+
+    def translate(self, language_code):
+        self._upstream._call("translate", self.video_id)
+        return FakeTranscript(self._upstream, self.video_id, language_code, True)
+
+
+class FakeTranscriptList:
+    def __init__(self, upstream, video_id):
+        self.video_id = video_id
+        self._manually_created_transcripts = {
+            code: FakeTranscript(upstream, video_id, code, False) for code in upstream.languages
+        }
+        self._generated_transcripts = {
+            code: FakeTranscript(upstream, video_id, code, True) for code in upstream.languages
+        }
+
+    def __iter__(self):
+        yield from self._manually_created_transcripts.values()
+        yield from self._generated_transcripts.values()
+
+    def _find(self, language_codes, transcript_dicts):
+        for code in language_codes:
+            for transcripts in transcript_dicts:
+                if code in transcripts:
+                    return transcripts[code]
+        raise NoTranscriptFound(self.video_id, language_codes, None)
+
+    def find_transcript(self, language_codes):
+        return self._find(language_codes, [self._manually_created_transcripts, self._generated_transcripts])
+
+    def find_manually_created_transcript(self, language_codes):
+        return self._find(language_codes, [self._manually_created_transcripts])
+
+    def find_generated_transcript(self, language_codes):
+        return self._find(language_codes, [self._generated_transcripts])
+
+
+def make_api(upstream):
+    """Build a YouTubeTranscriptApi class bound to ``upstream``."""
+
+    class YouTubeTranscriptApi:
+        @staticmethod
+        def list_transcripts(video_id, proxies=None, cookies=None):
+            upstream._call("list_transcripts", video_id)
+            return FakeTranscriptList(upstream, video_id)
+
+        @staticmethod
+        def get_transcript(video_id, languages=("en",), proxies=None, cookies=None, preserve_formatting=False):
+            upstream._call("get_transcript", video_id)
+            for code in languages:
+                if code in upstream.languages:
+                    return upstream.segments()
+            raise NoTranscriptFound(video_id, languages, None)
+
+    return YouTubeTranscriptApi
+
+
+def install(upstream=None):
+    """
+    Register the fake package in sys.modules
+
+    Must run before any handler imports youtube_transcript_api.
+
+    Returns:
+        FakeUpstream: The upstream the fake package talks to
+    """
+    upstream = upstream or FakeUpstream()
+
+    errors = types.ModuleType("youtube_transcript_api._errors")
+    for cls in (CouldNotRetrieveTranscript, TranscriptsDisabled, NoTranscriptFound,
+                VideoUnavailable, TooManyRequests):
+        setattr(errors, cls.__name__, cls)
+
+    package = types.ModuleType("youtube_transcript_api")
+    package.__path__ = []
+    package._errors = errors
+    package.YouTubeTranscriptApi = make_api(upstream)
+    for name in dir(errors):
+        if not name.startswith("_"):
+            setattr(package, name, getattr(errors, name))
+
+    sys.modules["youtube_transcript_api"] = package
+    sys.modules["youtube_transcript_api._errors"] = errors
+    return upstream
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Bulk transcript fetcher for offline pipelines
+
+Reads video IDs or URLs (one per line, "#" comments allowed) from a file or
+stdin and fetches their transcripts in parallel at a bounded rate. Results
+go to gzip-compressed JSONL shards in the output directory:
+
+    {"video_id": "...", "url": "...", "language": "en", "transcript": "..."}
+    {"video_id": "...", "url": "...", "language": "en", "error": "..."}
+
+A shard is written under a temporary name and renamed when it is complete;
+only then are its video IDs added to the checkpoint file, so a rerun over
+the same input skips everything already in a finished shard and refetches
+at most one shard's worth of work after a crash. Videos whose transcript is
+permanently unavailable are checkpointed too (see --retry-failed); network
+and other unexpected errors are not, so the next run tries them again.
+
+Examples:
+    python bulk_fetch.py videos.txt --out transcripts/
+    cat videos.txt | python bulk_fetch.py - --out transcripts/ --workers 16 --rate 10
+"""
+
+import argparse
+import gzip
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+
+from api.utils.jobs import Throttle
+from api.utils.segments import transcript_cache
+from api.utils.transcript_utils import get_transcript_text
+from api.utils.video_id import parse_video_id
+
+CHECKPOINT_FILE = "checkpoint.tsv"
+SHARD_PATTERN = "shard-{:05d}.jsonl.gz"
+# Checkpoint statuses
+DONE = "done"
+FAILED = "failed"
+
+
+def read_inputs(stream):
+    """Yield (video_id, url) for each line, skipping blanks and comments; invalid lines yield (None, line)."""
+    for line in stream:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        yield parse_video_id(line), line
+
+
+def load_checkpoint(out_dir):
+    """video_id -> status for every video in a completed shard."""
+    path = os.path.join(out_dir, CHECKPOINT_FILE)
+    finished = {}
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                video_id, _, status = line.rstrip("\n").partition("\t")
+                if video_id:
+                    finished[video_id] = status
+    return finished
+
+
+class ShardWriter:
+    """
+    Writes records to numbered gzip JSONL shards of at most shard_size records
+
+    Shard numbers continue after the highest one already in the directory.
+    Leftover ".tmp" shards from an interrupted run are removed.
+    """
+
+    def __init__(self, out_dir, shard_size, compresslevel=6):
+        self.out_dir = out_dir
+        self.shard_size = shard_size
+        self.compresslevel = compresslevel
+        self.shards_written = 0
+        self.bytes_written = 0
+        existing = []
+        for name in os.listdir(out_dir):
+            if name.endswith(".tmp"):
+                os.remove(os.path.join(out_dir, name))
+            elif name.startswith("shard-") and name.endswith(".jsonl.gz"):
+                existing.append(int(name[len("shard-"):-len(".jsonl.gz")]))
+        self.next_number = max(existing) + 1 if existing else 0
+        self.checkpoint = open(os.path.join(out_dir, CHECKPOINT_FILE), "a", encoding="utf-8")
+        self._file = None
+        self._pending = []
+
+    def write(self, record, status):
+        if self._file is None:
+            path = os.path.join(self.out_dir, SHARD_PATTERN.format(self.next_number) + ".tmp")
+            self._file = gzip.open(path, "wt", encoding="utf-8", compresslevel=self.compresslevel)
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._pending.append((record["video_id"], status))
+        if len(self._pending) >= self.shard_size:
+            self.flush()
+
+    def flush(self):
+        """Close the current shard, rename it into place and checkpoint its videos."""
+        if self._file is None:
+            return
+        tmp_path = self._file.name
+        self._file.close()
+        path = tmp_path[:-len(".tmp")]
+        os.replace(tmp_path, path)
+        self.bytes_written += os.path.getsize(path)
+        self.checkpoint.writelines(f"{video_id}\t{status}\n" for video_id, status in self._pending)
+        self.checkpoint.flush()
+        os.fsync(self.checkpoint.fileno())
+        self.shards_written += 1
+        self.next_number += 1
+        self._file = None
+        self._pending = []
+
+    def close(self):
+        self.flush()
+        self.checkpoint.close()
+
+
+class Progress:
+    """Counts results and prints throughput to stderr every `interval` seconds."""
+
+    def __init__(self, total, interval):
+        self.total = total
+        self.interval = interval
+        self.counts = {DONE: 0, FAILED: 0, "errors": 0}
+        self.started = self._last_report = time.monotonic()
+
+    def add(self, outcome):
+        self.counts[outcome] += 1
+        now = time.monotonic()
+        if self.interval and now - self._last_report >= self.interval:
+            self._last_report = now
+            self.report()
+
+    def report(self, final=False):
+        finished = sum(self.counts.values())
+        elapsed = time.monotonic() - self.started
+        rate = finished / elapsed if elapsed else 0.0
+        line = (f"{finished}/{self.total} videos in {elapsed:.1f}s ({rate:.1f}/s): "
+                f"{self.counts[DONE]} fetched, {self.counts[FAILED]} unavailable, {self.counts['errors']} errors")
+        if not final and rate and finished < self.total:
+            line += f", about {(self.total - finished) / rate:.0f}s left"
+        print(line, file=sys.stderr, flush=True)
+
+
+def fetch(video_id, url, language, throttle):
+    """Fetch one transcript; returns (record, outcome) where outcome is DONE, FAILED or "errors"."""
+    record = {"video_id": video_id, "url": url, "language": language}
+    throttle.wait()
+    try:
+        record["transcript"] = get_transcript_text(video_id, language)
+        return record, DONE
+    except ValueError as e:
+        # Invalid or unavailable: retrying won't help
+        record["error"] = str(e)
+        return record, FAILED
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {str(e)}"
+        return record, "errors"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", nargs="?", default="-", help="file of video IDs/URLs, or - for stdin (default)")
+    parser.add_argument("--out", required=True, help="output directory for shards and the checkpoint")
+    parser.add_argument("--language", help="transcript language code (default: auto-select)")
+    parser.add_argument("--workers", type=int, default=8, help="parallel fetches (default 8)")
+    parser.add_argument("--rate", type=float, default=5.0, help="fetches per second across workers, 0 for no limit (default 5)")
+    parser.add_argument("--shard-size", type=int, default=1000, help="records per shard (default 1000)")
+    parser.add_argument("--retry-failed", action="store_true", help="refetch videos checkpointed as unavailable")
+    parser.add_argument("--progress", type=float, default=10.0, help="seconds between progress lines, 0 for none (default 10)")
+    parser.add_argument("--verbose", action="store_true", help="show per-request log output")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not args.verbose:
+        # Failures are counted in the progress lines instead
+        logging.getLogger().setLevel(logging.CRITICAL)
+    os.makedirs(args.out, exist_ok=True)
+
+    finished = load_checkpoint(args.out)
+    skip = {video_id for video_id, status in finished.items() if status == DONE or not args.retry_failed}
+    stream = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    todo, seen, invalid = [], set(), 0
+    with stream:
+        for video_id, url in read_inputs(stream):
+            if video_id is None:
+                invalid += 1
+                print(f"Skipping invalid video ID or URL: {url}", file=sys.stderr)
+            elif video_id not in seen and video_id not in skip:
+                seen.add(video_id)
+                todo.append((video_id, url))
+    print(f"{len(todo)} videos to fetch ({len(skip)} already done, {invalid} invalid)", file=sys.stderr)
+
+    # Each transcript is written once, so keeping it in the process-wide cache only costs memory
+    transcript_cache.configure(0, 0, dedupe=transcript_cache.dedupe)
+    throttle = Throttle(args.rate)
+    writer = ShardWriter(args.out, args.shard_size)
+    progress = Progress(len(todo), args.progress)
+    # Only a few batches of work are in flight at once, however long the input
+    max_in_flight = args.workers * 4
+    remaining = iter(todo)
+    in_flight = set()
+    try:
+        with ThreadPoolExecutor(max_workers=args.workers) as executor:
+            try:
+                while True:
+                    for video_id, url in remaining:
+                        in_flight.add(executor.submit(fetch, video_id, url, args.language, throttle))
+                        if len(in_flight) >= max_in_flight:
+                            break
+                    if not in_flight:
+                        break
+                    completed, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in completed:
+                        record, outcome = future.result()
+                        if outcome == "errors":
+                            print(f"{record['video_id']}: {record['error']}", file=sys.stderr)
+                        else:
+                            writer.write(record, outcome)
+                        progress.add(outcome)
+            except KeyboardInterrupt:
+                # Drop the queued fetches; leaving the with block only waits for the running ones
+                executor.shutdown(wait=False, cancel_futures=True)
+                print("Interrupted; finished shards are checkpointed", file=sys.stderr)
+                return 130
+    finally:
+        writer.close()
+        progress.report(final=True)
+        print(f"Wrote {writer.shards_written} shards ({writer.bytes_written / 1e6:.2f} MB) to {args.out}", file=sys.stderr)
+    return 1 if progress.counts["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -10,6 +10,7 @@ const copyBtn = document.getElementById('copy-btn');
 const downloadBtn = document.getElementById('download-btn');
 const copyNotification = document.getElementById('copy-notification');
 const fontSizeSelect = document.getElementById('font-size');
+const groupSelect = document.getElementById('group-select');
 const languageSelection = document.getElementById('language-selection');
 const transcriptLanguageSelection = document.getElementById('transcript-language-selection');
 const languageSelect = document.getElementById('language-select');
@@ -149,6 +150,12 @@ function initEventListeners() {
         setFontSize(e.target.value);
         saveFontSizePreference(e.target.value);
     });
+    // Refetch the shown transcript with the chosen layout
+    if (groupSelect) {
+        groupSelect.addEventListener('change', () => {
+            if (currentVideoId) handleGetTranscript();
+        });
+    }
     
     // Only add language-related event listeners if the elements exist
     if (languageSelect && changeLanguageBtn) {
@@ -303,6 +310,10 @@ async function fetchTranscript(url, language = null) {
     
     try {
         const payload = { url };
+        // Captions are merged into sentences or paragraphs only when the user picks one
+        if (groupSelect && groupSelect.value) {
+            payload.group = groupSelect.value;
+        }
         if (language) {
             payload.language = language;
             console.log('🔍 Adding language to API request:', language);
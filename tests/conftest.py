@@ -0,0 +1,33 @@
+"""
+Offline test setup: the backend packages on the import path, and the fake
+YouTube upstream from the benchmarks installed in place of the real client.
+"""
+
+import os
+import sys
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, "benchmarks"))
+sys.path.insert(0, os.path.join(ROOT_DIR, "backend"))
+
+import fake_youtube  # noqa: E402
+
+fake_youtube.install()
+
+from api.utils import youtube_client  # noqa: E402
+from api.utils.segments import transcript_cache  # noqa: E402
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """
+    A fresh fake upstream (50 segments, rolling captions on its auto-generated
+    tracks) behind a new client, with an empty transcript cache
+    """
+    upstream = fake_youtube.install(fake_youtube.FakeUpstream(segments=50, rolling=True))
+    monkeypatch.setattr(youtube_client, "_client", None)
+    transcript_cache.clear()
+    yield upstream
+    transcript_cache.clear()
@@ -0,0 +1,90 @@
+import io
+import json
+import socket
+
+import pytest
+
+from api.utils.body import CHUNK_SIZE, BodyError, iter_body, iter_json_lines, read_body, read_json
+
+
+class TimingOut:
+    def read(self, size):
+        raise socket.timeout("timed out")
+
+
+class FakeHandler:
+    """The parts of a BaseHTTPRequestHandler the body readers use."""
+
+    def __init__(self, body=b"", headers=None, rfile=None):
+        self.headers = {"Content-Length": str(len(body)), **(headers or {})}
+        self.rfile = rfile if rfile is not None else io.BytesIO(body)
+        self.close_connection = False
+
+
+def status_of(handler, **kwargs):
+    with pytest.raises(BodyError) as error:
+        read_body(handler, **kwargs)
+    return error.value.status_code
+
+
+def test_reads_the_body_in_chunks():
+    body = b"x" * (CHUNK_SIZE * 2 + 10)
+    chunks = list(iter_body(FakeHandler(body)))
+    assert [len(chunk) for chunk in chunks] == [CHUNK_SIZE, CHUNK_SIZE, 10]
+    assert read_body(FakeHandler(b"")) == b""
+
+
+def test_over_the_limit_is_413_before_reading():
+    handler = FakeHandler(b"x" * 101)
+    assert status_of(handler, max_bytes=100) == 413
+    assert handler.rfile.tell() == 0
+    assert handler.close_connection
+
+
+@pytest.mark.parametrize("headers, status", [
+    ({"Transfer-Encoding": "chunked"}, 411),
+    ({"Content-Length": "ten"}, 400),
+    ({"Content-Length": "-1"}, 400),
+])
+def test_bad_lengths(headers, status):
+    handler = FakeHandler(b"{}", headers)
+    assert status_of(handler) == status
+    assert handler.close_connection
+
+
+def test_short_body_is_400():
+    assert status_of(FakeHandler(b"{}", {"Content-Length": "10"})) == 400
+
+
+def test_read_timeout_is_408():
+    handler = FakeHandler(headers={"Content-Length": "10"}, rfile=TimingOut())
+    assert status_of(handler) == 408
+    assert handler.close_connection
+
+
+def test_read_json():
+    assert read_json(FakeHandler(b'{"url": "a"}')) == {"url": "a"}
+    assert read_json(FakeHandler(b"")) is None
+    with pytest.raises(BodyError) as error:
+        read_json(FakeHandler(b'{"url": '))
+    assert error.value.status_code == 400
+
+
+def test_ndjson_lines_split_across_chunks():
+    records = [{"url": "a"}, {"url": "b", "language": "é"}, {"url": "c"}]
+    data = "\n".join(json.dumps(record, ensure_ascii=False) for record in records).encode("utf-8") + b"\n\n"
+    # Split mid-line and mid-character
+    chunks = [data[i:i + 7] for i in range(0, len(data), 7)]
+    assert list(iter_json_lines(chunks)) == records
+
+
+def test_ndjson_by_content_type():
+    handler = FakeHandler(b'{"url": "a"}\n{"url": "b"}', {"Content-Type": "application/x-ndjson; charset=utf-8"})
+    assert read_json(handler, lines=True) == [{"url": "a"}, {"url": "b"}]
+
+
+@pytest.mark.parametrize("data", [b'{"url": "a"}\nnot json\n', b'{"url": "\xff"}\n'])
+def test_invalid_ndjson(data):
+    with pytest.raises(BodyError) as error:
+        list(iter_json_lines([data]))
+    assert error.value.status_code == 400
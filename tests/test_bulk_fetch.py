@@ -0,0 +1,55 @@
+import gzip
+import importlib.util
+import json
+import os
+import time
+
+import pytest
+
+from api.utils.segments import transcript_cache
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_spec = importlib.util.spec_from_file_location("bulk_fetch", os.path.join(ROOT_DIR, "bulk_fetch.py"))
+bulk_fetch = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(bulk_fetch)
+
+
+@pytest.fixture
+def cache_settings():
+    """Restore the transcript cache's limits, which main() turns off."""
+    saved = (transcript_cache.max_entries, transcript_cache.ttl, transcript_cache.dedupe,
+             transcript_cache.codec, transcript_cache.max_bytes)
+    yield
+    transcript_cache.configure(*saved)
+
+
+def run(tmp_path, video_ids, *args):
+    videos = tmp_path / "videos.txt"
+    videos.write_text("\n".join(video_ids) + "\n")
+    return bulk_fetch.main([str(videos), "--out", str(tmp_path / "out"), "--rate", "0", "--progress", "0",
+                            "--verbose", *args])
+
+
+def test_fetches_into_shards_without_filling_the_cache(upstream, cache_settings, tmp_path):
+    video_ids = [f"video{i:06d}" for i in range(5)] + ["unavailable"]
+    assert run(tmp_path, video_ids, "--shard-size", "4") == 0
+    records = []
+    for name in sorted(os.listdir(tmp_path / "out")):
+        if name.endswith(".jsonl.gz"):
+            with gzip.open(tmp_path / "out" / name, "rt", encoding="utf-8") as f:
+                records.extend(json.loads(line) for line in f)
+    assert sorted(record["video_id"] for record in records) == sorted(video_ids)
+    assert len(transcript_cache) == 0
+
+
+def test_interrupt_drops_queued_fetches(upstream, cache_settings, tmp_path, monkeypatch):
+    upstream.latency = 0.2
+
+    def interrupted(futures, return_when):
+        raise KeyboardInterrupt
+    monkeypatch.setattr(bulk_fetch, "wait", interrupted)
+    started = time.monotonic()
+    assert run(tmp_path, [f"video{i:06d}" for i in range(20)], "--workers", "2") == 130
+    # Only the two running fetches finish; the other six submitted are cancelled
+    assert time.monotonic() - started < 0.6
+    assert upstream.calls["get_transcript"] <= 2
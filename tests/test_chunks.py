@@ -0,0 +1,76 @@
+import fake_youtube
+import pytest
+
+from api.utils.compact import CompactSegments
+from api.utils.formatting import chunk_segments
+from api.utils.segments import DEFAULT_CHUNK_OVERLAP, DEFAULT_CHUNK_SIZE, MAX_CHUNK_SIZE, parse_chunking
+
+
+def segment(text, start, duration=2.0):
+    return {"text": text, "start": start, "duration": duration}
+
+
+def query(**params):
+    return lambda name: params.get(name)
+
+
+def test_chunks_cover_every_segment_in_order():
+    segments = fake_youtube.make_segments(300)
+    chunks = chunk_segments(segments, 100, 0)
+    assert [chunk["index"] for chunk in chunks] == list(range(len(chunks)))
+    assert chunks[0]["segments"][0] == 0
+    assert chunks[-1]["segments"][1] == len(segments)
+    for previous, chunk in zip(chunks, chunks[1:]):
+        assert chunk["segments"][0] == previous["segments"][1]
+    assert all(chunk["size"] <= 100 for chunk in chunks)
+
+
+def test_chunk_fields():
+    captions = [segment("one two", 0.0), segment("  three\nfour ", 2.0), segment("five", 4.0, 1.25)]
+    assert chunk_segments(captions, 100, unit="chars") == [{
+        "index": 0,
+        "text": "one two three four five",
+        "start": 0.0,
+        "end": 5.25,
+        "size": len("one two three four five"),
+        "segments": [0, 3],
+    }]
+
+
+def test_overlap_repeats_the_end_of_the_previous_chunk():
+    captions = [segment("abcd", i * 2.0) for i in range(10)]
+    # Five characters per segment with the joining space
+    chunks = chunk_segments(captions, 15, 10, unit="chars")
+    assert [chunk["segments"] for chunk in chunks[:3]] == [[0, 3], [1, 4], [2, 5]]
+    assert chunks[-1]["segments"][1] == 10
+
+
+def test_oversized_segment_is_a_chunk_of_its_own():
+    captions = [segment("short", 0.0), segment("x" * 50, 2.0), segment("short", 4.0)]
+    chunks = chunk_segments(captions, 10, unit="chars")
+    assert [chunk["segments"] for chunk in chunks] == [[0, 1], [1, 2], [2, 3]]
+
+
+def test_compact_segments_chunk_like_dicts():
+    segments = fake_youtube.make_segments(200)
+    assert chunk_segments(CompactSegments.from_dicts(segments), 64, 8) == chunk_segments(segments, 64, 8)
+
+
+def test_unknown_unit():
+    with pytest.raises(ValueError):
+        chunk_segments([segment("text", 0.0)], 10, unit="words")
+
+
+def test_parse_chunking_defaults():
+    assert parse_chunking(query()) == {"size": DEFAULT_CHUNK_SIZE, "overlap": DEFAULT_CHUNK_OVERLAP, "unit": "tokens"}
+    # The default overlap is at most an eighth of the size
+    assert parse_chunking(query(size="80", unit="chars")) == {"size": 80, "overlap": 10, "unit": "chars"}
+
+
+@pytest.mark.parametrize("params", [
+    {"unit": "words"}, {"size": "big"}, {"size": "0"}, {"size": str(MAX_CHUNK_SIZE + 1)},
+    {"size": "100", "overlap": "100"}, {"overlap": "-1"},
+])
+def test_invalid_chunking(params):
+    with pytest.raises(ValueError):
+        parse_chunking(query(**params))
@@ -0,0 +1,62 @@
+import json
+
+import fake_youtube
+import pytest
+
+from api.utils import serialization
+from api.utils.compact import CompactSegments
+from api.utils.compression import get_codec
+
+SEGMENTS = fake_youtube.make_segments(40) + [
+    {"text": "café – naïve ♪", "start": 200.0, "duration": 1.5},
+    {"text": "", "start": 201.5, "duration": 0.5},
+]
+
+
+@pytest.mark.parametrize("codec", [None, get_codec("zlib")], ids=["plain", "zlib"])
+def test_round_trip(codec):
+    compact = CompactSegments.from_dicts(SEGMENTS, codec)
+    assert len(compact) == len(SEGMENTS)
+    assert list(compact) == SEGMENTS
+    assert compact[0] == SEGMENTS[0]
+    assert compact[-2] == SEGMENTS[-2]
+    assert list(compact.start_text_pairs()) == [(item["start"], item["text"]) for item in SEGMENTS]
+
+
+def test_codec_shrinks_text():
+    segments = fake_youtube.make_segments(500)
+    plain = CompactSegments.from_dicts(segments)
+    compressed = CompactSegments.from_dicts(segments, get_codec("zlib"))
+    assert compressed.nbytes < plain.nbytes
+    assert list(compressed) == list(plain)
+
+
+def test_out_of_range():
+    compact = CompactSegments.from_dicts(SEGMENTS)
+    with pytest.raises(IndexError):
+        compact[len(SEGMENTS)]
+    with pytest.raises(IndexError):
+        compact[-len(SEGMENTS) - 1]
+
+
+@pytest.mark.parametrize("codec", [None, get_codec("zlib")], ids=["plain", "zlib"])
+def test_slice_is_a_view(codec):
+    compact = CompactSegments.from_dicts(SEGMENTS, codec)
+    page = compact[38:41]
+    assert isinstance(page, CompactSegments)
+    assert list(page) == SEGMENTS[38:41]
+    assert list(compact[5:2]) == []
+    assert compact[::10] == SEGMENTS[::10]
+    # A view holds its own columns, not the whole track's
+    assert page.nbytes < compact.nbytes
+
+
+@pytest.mark.parametrize("name", ["json", "auto"])
+def test_views_serialize_as_lists(name):
+    previous = serialization.current()
+    serialization.use(name)
+    try:
+        page = CompactSegments.from_dicts(SEGMENTS)[39:]
+        assert json.loads(serialization.dumps({"segments": page})) == {"segments": SEGMENTS[39:]}
+    finally:
+        serialization.use(previous)
@@ -0,0 +1,42 @@
+import importlib.util
+import logging
+
+import pytest
+
+from api.utils.compression import CODECS, get_codec
+
+TEXT = "the quick brown fox jumps over the lazy dog ".encode("utf-8") * 50
+
+
+def test_none_is_no_codec():
+    assert get_codec("none") is None
+
+
+def test_unknown_codec():
+    with pytest.raises(ValueError):
+        get_codec("lz4")
+
+
+@pytest.mark.parametrize("name", [name for name in CODECS if name != "none"])
+@pytest.mark.parametrize("dictionary", [b"", b"quick brown fox captions " * 2000])
+def test_round_trip(name, dictionary):
+    codec = get_codec(name, dictionary)
+    compressed = codec.compress(TEXT)
+    assert len(compressed) < len(TEXT)
+    assert codec.decompress(compressed) == TEXT
+    assert codec.decompress(codec.compress(b"")) == b""
+
+
+def test_dictionary_helps_short_text():
+    sample = b"the quick brown fox jumps"
+    plain = get_codec("zlib").compress(sample)
+    primed = get_codec("zlib", b"the quick brown fox jumps over the lazy dog").compress(sample)
+    assert len(primed) < len(plain)
+
+
+@pytest.mark.skipif(importlib.util.find_spec("zstandard") is not None, reason="zstandard is installed")
+def test_zstd_falls_back_to_zlib(caplog):
+    with caplog.at_level(logging.WARNING):
+        codec = get_codec("zstd")
+    assert codec.name == "zlib"
+    assert "zstandard is not installed" in caplog.text
@@ -0,0 +1,113 @@
+import pytest
+
+from config import DEFAULT_CONFIG, RESTART_KEYS, Config, ConfigError, check_value, validate_config
+
+
+def fresh(**overrides):
+    values, errors = validate_config({**DEFAULT_CONFIG, **overrides})
+    assert errors == []
+    return values
+
+
+def test_defaults_are_valid():
+    assert validate_config(DEFAULT_CONFIG) == (DEFAULT_CONFIG, [])
+
+
+def test_conversions():
+    assert check_value("TRANSCRIPT_CACHE_TTL", 60) == 60.0
+    assert isinstance(check_value("TRANSCRIPT_CACHE_TTL", 60), float)
+    assert check_value("ALLOWED_REFERRERS", ("example.com",)) == ["example.com"]
+
+
+@pytest.mark.parametrize("key, value", [
+    ("API_PORT", "3002"),
+    ("API_PORT", 70000),
+    ("RATE_LIMIT", True),
+    ("RATE_LIMIT", -1),
+    ("TRANSCRIPT_CACHE_TTL", "1h"),
+    ("LOG_LEVEL", "LOUD"),
+    ("ALLOWED_REFERRERS", ["example.com", 3]),
+    ("LOG_SAMPLE_RATES", {"static": 2}),
+    ("TRANSCRIPT_CACHE_COMPRESSION", "lz4"),
+])
+def test_invalid_values(key, value):
+    with pytest.raises(ConfigError, match=key):
+        check_value(key, value)
+
+
+def test_invalid_values_fall_back_to_defaults():
+    values, errors = validate_config({"RATE_LIMIT": "ten", "LOG_LEVEL": "DEBUG"})
+    assert values["RATE_LIMIT"] == DEFAULT_CONFIG["RATE_LIMIT"]
+    assert values["LOG_LEVEL"] == "DEBUG"
+    assert len(errors) == 1 and "RATE_LIMIT" in errors[0]
+
+
+def test_apply_swaps_and_notifies():
+    config = Config(fresh())
+    seen = []
+    config.subscribe(seen.append)
+    before = config.snapshot()
+    assert config.apply({"RATE_LIMIT": 30})
+    assert config["RATE_LIMIT"] == 30
+    assert config.version == 2
+    # The old snapshot is left as it was
+    assert before["RATE_LIMIT"] == DEFAULT_CONFIG["RATE_LIMIT"]
+    assert [values["RATE_LIMIT"] for values in seen] == [DEFAULT_CONFIG["RATE_LIMIT"], 30]
+    # Nothing changed, nobody notified
+    assert not config.apply({"RATE_LIMIT": 30})
+    assert len(seen) == 2
+
+
+def test_apply_rejects_bad_values_without_swapping():
+    config = Config(fresh())
+    seen = []
+    config.subscribe(seen.append)
+    assert not config.apply({"RATE_LIMIT": 30, "LOG_LEVEL": ["DEBUG"]})
+    assert config["RATE_LIMIT"] == DEFAULT_CONFIG["RATE_LIMIT"]
+    assert config.version == 1
+    assert len(seen) == 1
+
+
+def test_apply_ignores_restart_keys():
+    config = Config(fresh())
+    assert "API_PORT" in RESTART_KEYS
+    assert not config.apply({"API_PORT": DEFAULT_CONFIG["API_PORT"] + 1})
+    assert config["API_PORT"] == DEFAULT_CONFIG["API_PORT"]
+    assert config.apply({"API_PORT": 1, "RATE_LIMIT": 5})
+    assert (config["API_PORT"], config["RATE_LIMIT"]) == (DEFAULT_CONFIG["API_PORT"], 5)
+
+
+def test_a_failing_listener_does_not_stop_the_others():
+    config = Config(fresh())
+    seen = []
+
+    def broken(values):
+        if seen:
+            raise RuntimeError("boom")
+    config.subscribe(broken)
+    config.subscribe(seen.append)
+    assert config.apply({"RATE_LIMIT": 7})
+    assert seen[-1]["RATE_LIMIT"] == 7
+
+
+def test_reload_reads_the_file(tmp_path, monkeypatch):
+    monkeypatch.delenv("API_KEY", raising=False)
+    path = tmp_path / "local.py"
+    path.write_text("RATE_LIMIT = 10\n")
+    config = Config(fresh(RATE_LIMIT=10), str(path))
+    assert not config.reload()
+
+    path.write_text("RATE_LIMIT = 20\nJOBS_WORKERS = 9\n")
+    assert config.reload()
+    assert config["RATE_LIMIT"] == 20
+    assert config["JOBS_WORKERS"] == DEFAULT_CONFIG["JOBS_WORKERS"]
+
+    path.write_text("RATE_LIMIT = \n")
+    assert not config.reload()
+    path.write_text("RATE_LIMIT = 'fast'\n")
+    assert not config.reload()
+    assert config["RATE_LIMIT"] == 20
+
+
+def test_reload_without_a_file():
+    assert not Config(fresh()).reload()
@@ -0,0 +1,71 @@
+import fake_youtube
+import pytest
+
+from api.utils import transcript_utils
+from api.utils.formatting import dedupe_segments
+from api.utils.segments import transcript_cache
+
+
+def segment(text, start, duration=2.0):
+    return {"text": text, "start": start, "duration": duration}
+
+
+def test_rolling_overlap_is_dropped():
+    captions = [
+        segment("so today we are going to talk", 0.0),
+        segment("we are going to talk about caches", 2.0),
+        segment("talk about caches", 4.0),
+    ]
+    deduped = dedupe_segments(captions)
+    assert [item["text"] for item in deduped] == ["so today we are going to talk", "about caches"]
+    # The caption left empty extends the one before it
+    assert deduped[1]["duration"] == 4.0
+    assert captions[1]["text"] == "we are going to talk about caches"
+
+
+def test_short_overlaps_are_kept():
+    captions = [segment("one of the", 0.0), segment("of the best", 2.0)]
+    assert dedupe_segments(captions) == captions
+
+
+def test_generated_template_is_shortened():
+    rolling = fake_youtube.make_segments(50, rolling=True)
+    deduped = dedupe_segments(rolling)
+    assert sum(len(item["text"].split()) for item in deduped) < sum(len(item["text"].split()) for item in rolling)
+
+
+@pytest.fixture
+def dedupe(monkeypatch):
+    monkeypatch.setattr(transcript_cache, "dedupe", True)
+
+
+# Lines a manual track really repeats
+MANUAL = [
+    segment("we will rock you", 0.0),
+    segment("we will rock you", 2.0),
+    segment("No.", 4.0),
+    segment("No.", 5.0),
+    segment("I said it is what it is", 6.0),
+    segment("what it is and that is all", 8.0),
+]
+
+
+def test_manual_track_is_unchanged(upstream, dedupe, monkeypatch):
+    monkeypatch.setattr(upstream, "_template", MANUAL)
+    transcript = transcript_utils.fetch_transcript("dQw4w9WgXcQ", "en")
+    assert list(transcript.segments) == MANUAL
+    # Found through the listing, which says the track is manual
+    assert upstream.calls["list_transcripts"] == 1 and upstream.calls["get_transcript"] == 0
+
+
+def test_generated_track_is_deduped(upstream, dedupe):
+    track = fake_youtube.FakeTranscriptList(upstream, "dQw4w9WgXcQ")._generated_transcripts["en"]
+    transcript = transcript_utils._fetch_track(track, "dQw4w9WgXcQ", "en")
+    assert list(transcript.segments) == dedupe_segments(upstream.segments(generated=True))
+
+
+def test_off_by_default(upstream):
+    assert transcript_cache.dedupe is False
+    track = fake_youtube.FakeTranscriptList(upstream, "dQw4w9WgXcQ")._generated_transcripts["en"]
+    transcript = transcript_utils._fetch_track(track, "dQw4w9WgXcQ", "en")
+    assert list(transcript.segments) == upstream.segments(generated=True)
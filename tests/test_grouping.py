@@ -0,0 +1,84 @@
+import pytest
+
+from api.utils.formatting import MAX_PARAGRAPH_SENTENCES, MAX_SENTENCE_SECONDS, group_segments
+
+
+def captions(*texts, step=2.0):
+    """Back-to-back captions, one every `step` seconds."""
+    return [{"text": text, "start": i * step, "duration": step} for i, text in enumerate(texts)]
+
+
+def texts(blocks):
+    return [block["text"] for block in blocks]
+
+
+def test_sentences_end_at_punctuation():
+    blocks = group_segments(captions("so this is", "the first one.", "and here", "is the second?"), "sentences")
+    assert texts(blocks) == ["so this is the first one.", "and here is the second?"]
+    assert blocks[1]["start"] == 4.0
+    assert blocks[1]["duration"] == 4.0
+
+
+def test_sentences_end_at_a_pause():
+    segments = [{"text": "no punctuation", "start": 0.0, "duration": 1.0},
+                {"text": "after a pause", "start": 3.0, "duration": 1.0}]
+    assert texts(group_segments(segments, "sentences")) == ["no punctuation", "after a pause"]
+
+
+def test_unpunctuated_sentences_are_cut_at_their_maximum_length():
+    blocks = group_segments(captions(*["words"] * 30), "sentences")
+    assert len(blocks) > 1
+    assert all(block["duration"] <= MAX_SENTENCE_SECONDS + 2.0 for block in blocks)
+
+
+def test_paragraphs_hold_several_sentences():
+    blocks = group_segments(captions("One.", "Two.", "Three."), "paragraphs")
+    assert texts(blocks) == ["One. Two. Three."]
+
+
+def test_paragraphs_end_at_a_long_pause():
+    segments = [{"text": "First.", "start": 0.0, "duration": 1.0},
+                {"text": "Second.", "start": 1.0, "duration": 1.0},
+                {"text": "Third.", "start": 6.0, "duration": 1.0}]
+    assert texts(group_segments(segments, "paragraphs")) == ["First. Second.", "Third."]
+
+
+def test_paragraphs_end_after_max_sentences():
+    blocks = group_segments(captions(*["Yes."] * (MAX_PARAGRAPH_SENTENCES + 1)), "paragraphs")
+    assert [len(block["text"].split()) for block in blocks] == [MAX_PARAGRAPH_SENTENCES, 1]
+
+
+@pytest.mark.parametrize("text, speaker", [
+    ("Anna: welcome back", "Anna"),
+    ("Dr Smith: thanks for having me", "Dr Smith"),
+    ("MARY JANE: hello", "MARY JANE"),
+    (">> Anna: welcome back", "Anna"),
+    (">> and welcome back", None),
+])
+def test_speaker_changes_start_a_paragraph(text, speaker):
+    blocks = group_segments(captions("We were talking about caches", text), "paragraphs")
+    assert texts(blocks) == ["We were talking about caches", text]
+    assert blocks[1]["speaker"] == speaker
+
+
+@pytest.mark.parametrize("text", [
+    "Note: this is important",
+    "Step 2: open the settings",
+    "So here's the thing: it works",
+    "the answer: forty-two",
+    "Warning: hot surface",
+    "At 10:30 we started",
+])
+def test_ordinary_colons_are_not_speakers(text):
+    blocks = group_segments(captions("We were talking about caches", text), "paragraphs")
+    assert texts(blocks) == [f"We were talking about caches {text}"]
+    assert blocks[0]["speaker"] is None
+
+
+def test_blank_captions_are_skipped():
+    assert texts(group_segments(captions("Hello.", "  ", "\n"), "sentences")) == ["Hello."]
+
+
+def test_unknown_grouping():
+    with pytest.raises(ValueError):
+        group_segments(captions("text"), "chapters")
@@ -0,0 +1,90 @@
+import threading
+
+import pytest
+
+from api.utils.jobs import CANCELLED, COMPLETED, QUEUED, RUNNING, JobManager, JobNotFound, JobStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    yield store
+    store.close()
+
+
+def test_items_run_in_order_and_complete_the_job(store):
+    job_id = store.create([("https://youtu.be/a", None), ("https://youtu.be/b", "en")])
+    assert store.get(job_id)["status"] == QUEUED
+
+    first = store.claim()
+    assert first == (job_id, 0, "https://youtu.be/a", None)
+    assert store.get(job_id)["status"] == RUNNING
+    store.finish(job_id, 0, result='"text"')
+    second = store.claim()
+    store.finish(job_id, second[1], error="Transcript not available")
+    assert store.claim() is None
+
+    job = store.get(job_id)
+    assert (job["status"], job["done"], job["failed"], job["pending"]) == (COMPLETED, 1, 1, 0)
+    assert job["results"][0]["result"] == "text"
+    assert job["results"][1]["error"] == "Transcript not available"
+
+
+def test_paging(store):
+    job_id = store.create([(f"video{i}", None) for i in range(5)])
+    page = store.get(job_id, offset=2, limit=2)
+    assert page["offset"] == 2
+    assert [item["index"] for item in page["results"]] == [2, 3]
+
+
+def test_cancel_skips_pending_items(store):
+    job_id = store.create([("a", None), ("b", None)])
+    store.claim()
+    store.cancel(job_id)
+    assert store.claim() is None
+    job = store.get(job_id)
+    assert job["status"] == CANCELLED
+    assert [item["status"] for item in job["results"]] == ["running", "cancelled"]
+
+
+def test_recover_requeues_running_items(store):
+    job_id = store.create([("a", None)])
+    store.claim()
+    assert store.recover() == 1
+    assert store.claim()[:2] == (job_id, 0)
+
+
+def test_unknown_job(store):
+    with pytest.raises(JobNotFound):
+        store.get("missing")
+    with pytest.raises(JobNotFound):
+        store.cancel("missing")
+
+
+def test_stop_while_an_item_runs(tmp_path):
+    started, release = threading.Event(), threading.Event()
+
+    def fetch(url, language):
+        started.set()
+        release.wait(5)
+        return "text"
+    manager = JobManager(str(tmp_path / "jobs.sqlite3"), fetch, workers=1)
+    errors = []
+    previous_hook = threading.excepthook
+    threading.excepthook = errors.append
+    try:
+        job_id = manager.submit([("a", None)])
+        assert started.wait(5)
+        thread = manager._threads[0]
+        manager.stop(timeout=0.05)
+        release.set()
+        thread.join(5)
+    finally:
+        threading.excepthook = previous_hook
+    assert not thread.is_alive()
+    assert errors == []
+    # The interrupted item is requeued when the manager starts again
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    assert store.recover() == 1
+    assert store.claim()[:2] == (job_id, 0)
+    store.close()
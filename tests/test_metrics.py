@@ -0,0 +1,10 @@
+from api.utils.metrics import route_label
+
+
+def test_route_labels_are_bounded():
+    assert route_label("/api/transcript/") == "/api/transcript"
+    assert route_label("/api/jobs/3f9a1c2e5b7d4a60") == "/api/jobs/{id}"
+    assert route_label("/api/jobs/another-id") == "/api/jobs/{id}"
+    assert route_label("/api/unknown") == "other"
+    assert route_label("/styles.css") == "static"
+
@@ -0,0 +1,21 @@
+import time
+
+import pytest
+
+from api.utils.profiling import Profiler
+
+
+def test_unknown_sort_fails_before_the_session():
+    started = time.monotonic()
+    with pytest.raises(ValueError, match="sort"):
+        Profiler().run_session(5, sort="slowest")
+    assert time.monotonic() - started < 1
+
+
+def test_unknown_mode():
+    with pytest.raises(ValueError, match="mode"):
+        Profiler().run_session(5, mode="trace")
+
+
+def test_empty_session():
+    assert Profiler().run_session(0, sort="time").startswith("# No requests")
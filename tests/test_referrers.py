@@ -0,0 +1,54 @@
+import pytest
+
+from api.utils.referrers import ReferrerMatcher, referrer_host
+
+ALLOWED = ["example.com", "*.example.org", "localhost:3000", " Docs.Example.NET "]
+
+
+@pytest.mark.parametrize("allowed", [[], None, ["*"], ["example.com", "*"]])
+def test_allow_all(allowed):
+    matcher = ReferrerMatcher(allowed)
+    assert matcher.allows("")
+    assert matcher.allows("https://anything.test/page")
+
+
+@pytest.mark.parametrize("referrer", [
+    "https://example.com/",
+    "http://EXAMPLE.com/watch?v=1",
+    "https://www.example.org/page",
+    "https://a.b.example.org/",
+    "http://localhost:3000/index.html",
+    "https://docs.example.net/x",
+    # A bare host, as some clients send
+    "example.com",
+])
+def test_allowed(referrer):
+    assert ReferrerMatcher(ALLOWED).allows(referrer)
+
+
+@pytest.mark.parametrize("referrer", [
+    "",
+    None,
+    # Exact hosts don't allow their subdomains, and wildcards not the bare domain
+    "https://www.example.com/",
+    "https://example.org/",
+    # Suffixes only match on a dot boundary
+    "https://evilexample.org/",
+    "https://example.org.evil.test/",
+    # The port is part of the host
+    "https://example.com:8443/",
+    "http://localhost/",
+    "http://localhost:4000/",
+    # Malformed headers
+    "://",
+    "https:///example.com",
+    "not a url",
+])
+def test_refused(referrer):
+    assert not ReferrerMatcher(ALLOWED).allows(referrer)
+
+
+def test_referrer_host():
+    assert referrer_host("https://example.com:8080/a/b?c") == "example.com:8080"
+    assert referrer_host("example.com") == "example.com"
+    assert referrer_host("://") == ""
@@ -0,0 +1,75 @@
+from api.utils.routing import ANY_PATH, Request, RoutedHandlerMixin, Router, normalize_path
+
+
+def view(name):
+    return lambda handler, request: handler.calls.append((name, request.path))
+
+
+class Handler(RoutedHandlerMixin):
+    def __init__(self, router, method, path):
+        self.router = router
+        self.command = method
+        self.path = path
+        self.calls = []
+        self.sent = []
+
+    def write_json(self, status_code, data):
+        self.sent.append((status_code, data))
+
+
+def test_normalize_path():
+    assert normalize_path("/api/ping/") == "/api/ping"
+    assert normalize_path("/") == "/"
+
+
+def test_exact_prefix_and_fallback():
+    router = Router()
+    router.add("GET", ("/api/ping", "/api/hello"), view("exact"))
+    router.add("GET", "/api/jobs/*", view("jobs"))
+    router.add("GET", "/api/*", view("api"))
+    router.add("POST", ANY_PATH, view("any"))
+
+    assert router.resolve("GET", "/api/hello") is not None
+    for method, path, expected in [
+        ("GET", "/api/ping/", "exact"),
+        ("GET", "/api/jobs/abc", "jobs"),
+        ("GET", "/api/other", "api"),
+        ("POST", "/whatever", "any"),
+    ]:
+        handler = Handler(router, method, path)
+        assert handler.dispatch()
+        assert handler.calls[0][0] == expected
+    assert not Handler(router, "GET", "/static.css").dispatch()
+    assert router.paths() == ["/api/*", "/api/hello", "/api/jobs/*", "/api/ping"]
+
+
+def test_middleware_order_and_short_circuit():
+    order = []
+
+    def layer(name, stop=False):
+        def middleware(handler, request, call_next):
+            order.append(name)
+            if stop:
+                handler.reject(403, "no")
+                return
+            return call_next(handler, request)
+        return middleware
+
+    router = Router()
+    router.add("GET", "/a", view("a"), middleware=(layer("outer"), None, layer("inner")))
+    router.add("GET", "/b", view("b"), middleware=(layer("guard", stop=True),))
+
+    handler = Handler(router, "GET", "/a")
+    handler.dispatch()
+    assert order == ["outer", "inner"] and handler.calls == [("a", "/a")]
+
+    handler = Handler(router, "GET", "/b")
+    handler.dispatch()
+    assert handler.calls == [] and handler.sent == [(403, {"detail": "no"})]
+
+
+def test_request_query_is_parsed_lazily():
+    request = Request("GET", "/api/transcript", "url=abc&limit=5&limit=6")
+    assert request._query is None
+    assert request.param("limit") == "5"
+    assert request.param("missing", None) is None
@@ -0,0 +1,169 @@
+import fake_youtube
+import pytest
+
+from api.utils import segments as segments_module
+from api.utils.compact import CompactSegments
+from api.utils.compression import Codec, get_codec
+from api.utils.segments import (MAX_LANGUAGES, MAX_TRANSLATIONS, Transcript, TranscriptCache, parse_languages,
+                                 parse_translate_to, parse_window)
+
+
+def query(**params):
+    """A parameter getter like the handlers pass, over string values."""
+    return lambda name: params.get(name)
+
+
+def test_no_window_params():
+    assert parse_window(query()) is None
+    assert parse_window(query(start="", limit="")) is None
+
+
+def test_parse_window():
+    assert parse_window(query(start="1.5", end="30", limit="10")) == {"start": 1.5, "end": 30.0, "offset": 0, "limit": 10}
+    assert parse_window(query(offset=20)) == {"start": None, "end": None, "offset": 20, "limit": None}
+
+
+@pytest.mark.parametrize("params", [
+    {"start": "soon"}, {"limit": "1.5"}, {"offset": "-1"}, {"start": "5", "end": "5"}, {"limit": "0"},
+])
+def test_invalid_window(params):
+    with pytest.raises(ValueError):
+        parse_window(query(**params))
+
+
+def test_parse_translate_to():
+    assert parse_translate_to(None) is None
+    assert parse_translate_to("") is None
+    assert parse_translate_to("fr, de,fr") == ["fr", "de"]
+    assert parse_translate_to(["pt-BR", "zh-Hans"]) == ["pt-BR", "zh-Hans"]
+
+
+@pytest.mark.parametrize("value", [
+    "fr;de", "english", ["fr", 3], {"fr": True}, ",".join(chr(97 + i) * 2 for i in range(MAX_TRANSLATIONS + 1)),
+])
+def test_invalid_translate_to(value):
+    with pytest.raises(ValueError):
+        parse_translate_to(value)
+
+
+def test_parse_languages():
+    assert parse_languages(None) is None
+    assert parse_languages("en,es") == ["en", "es"]
+    assert parse_languages(["en-GB"]) == ["en-GB"]
+    with pytest.raises(ValueError):
+        parse_languages(",".join(chr(97 + i) * 2 for i in range(MAX_LANGUAGES + 1)))
+    with pytest.raises(ValueError, match="languages"):
+        parse_languages("en,e")
+
+
+def test_window_and_paging():
+    segments = [{"text": f"line {i}", "start": i * 2.0, "duration": 3.0} for i in range(10)]
+    transcript = Transcript("video", "en", CompactSegments.from_dicts(segments))
+    page, total = transcript.window(start=5.0, end=11.0)
+    # The segment starting at 4s is still on screen at 5s
+    assert [segment["start"] for segment in page] == [4.0, 6.0, 8.0, 10.0]
+    assert total == 4
+    page, total = transcript.window(start=5.0, end=11.0, offset=1, limit=2)
+    assert [segment["start"] for segment in page] == [6.0, 8.0]
+    assert total == 4
+    page, total = transcript.window(start=100.0)
+    assert len(page) == total == 0
+
+
+def test_cache_evicts_least_recently_used():
+    cache = TranscriptCache(max_entries=2)
+    for video_id in ("a", "b"):
+        cache.add(video_id, "en", fake_youtube.make_segments(5))
+    assert cache.get("a", "en") is not None
+    cache.add("c", "en", fake_youtube.make_segments(5))
+    assert cache.get("b", "en") is None
+    assert cache.get("a", "en") is not None
+    assert cache.get("c", "en") is not None
+    assert len(cache) == 2
+
+
+def test_cache_entries_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(segments_module.time, "monotonic", lambda: now[0])
+    cache = TranscriptCache(ttl=60)
+    cache.add("a", "en", fake_youtube.make_segments(5))
+    now[0] += 59
+    assert cache.get("a", "en") is not None
+    now[0] += 1
+    assert cache.get("a", "en") is None
+    assert len(cache) == 0
+    assert cache.nbytes == 0
+
+
+def counting_codec():
+    """A zlib codec that counts its decompressions."""
+    zlib_codec = get_codec("zlib")
+    calls = []
+
+    def decompress(data):
+        calls.append(len(data))
+        return zlib_codec.decompress(data)
+    return Codec("zlib", zlib_codec.compress, decompress), calls
+
+
+def compressed_transcript(count=2000):
+    codec, calls = counting_codec()
+    segments = CompactSegments.from_dicts(fake_youtube.make_segments(count), codec)
+    return Transcript("video", "en", segments), calls
+
+
+def test_compressed_chunks_inflate_once_and_are_kept():
+    transcript, calls = compressed_transcript()
+    chunks = transcript.chunks(512, 64, "tokens")
+    assert len(calls) == 1
+    assert transcript.chunks(512, 64, "tokens") is chunks
+    assert len(calls) == 1
+    plain = Transcript("video", "en", CompactSegments.from_dicts(fake_youtube.make_segments(2000)))
+    assert plain.chunks(512, 64, "tokens") == chunks
+
+
+def test_compressed_groupings_are_kept_and_counted():
+    transcript, calls = compressed_transcript()
+    before = transcript.nbytes
+    paragraphs = transcript.grouped("paragraphs")
+    assert transcript.grouped("paragraphs") is paragraphs
+    assert len(calls) == 1
+    assert transcript.nbytes > before
+
+
+def test_compressed_window_inflates_once():
+    transcript, calls = compressed_transcript()
+    page, total = transcript.window(start=10.0, end=60.0)
+    assert len(page) == total
+    plain = Transcript("video", "en", CompactSegments.from_dicts(fake_youtube.make_segments(2000)))
+    assert list(page) == list(plain.window(start=10.0, end=60.0)[0])
+    assert len(calls) == 1
+
+
+def test_cache_evicts_oldest_past_max_bytes():
+    size = Transcript("a", "en", CompactSegments.from_dicts(fake_youtube.make_segments(100))).nbytes
+    cache = TranscriptCache(max_bytes=int(size * 2.5))
+    for video_id in ("a", "b", "c"):
+        cache.add(video_id, "en", fake_youtube.make_segments(100))
+    assert cache.get("a", "en") is None
+    assert len(cache) == 2
+    assert cache.nbytes == 2 * size
+
+
+def test_cache_remeasures_entries_on_hits():
+    cache = TranscriptCache()
+    transcript = cache.add("a", "en", fake_youtube.make_segments(100))
+    before = cache.nbytes
+    transcript.gzipped_body()
+    assert cache.nbytes == before
+    cache.get("a", "en")
+    assert cache.nbytes == transcript.nbytes > before
+
+
+def test_compressed_entries_are_smaller():
+    plain = TranscriptCache()
+    compressed = TranscriptCache(codec=get_codec("zlib"))
+    for cache in (plain, compressed):
+        cache.add("a", "en", fake_youtube.make_segments(500))
+    assert compressed.nbytes < plain.nbytes
+    assert list(compressed.get("a", "en").segments) == list(plain.get("a", "en").segments)
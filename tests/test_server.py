@@ -0,0 +1,66 @@
+"""End-to-end checks against the local server, on a free port, with the fake upstream."""
+
+import http.client
+import json
+import threading
+
+import pytest
+
+import server
+from api.utils import metrics
+
+
+@pytest.fixture(scope="module")
+def port():
+    httpd = server.create_server(port=0, host="127.0.0.1")
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd.server_address[1]
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def request(port, method, path, body=None, headers=None):
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    connection.request(method, path, body=body, headers={"Content-Type": "application/json", **(headers or {})})
+    response = connection.getresponse()
+    return response, response.read()
+
+
+def test_job_listing_needs_the_api_key(port, monkeypatch):
+    monkeypatch.setattr(server.job_manager, "list", lambda: [])
+    response, body = request(port, "GET", "/api/jobs")
+    assert response.status == 401
+    response, body = request(port, "GET", "/api/jobs", headers={"X-API-Key": server.config["API_KEY"]})
+    assert response.status == 200
+    assert json.loads(body) == {"jobs": []}
+
+
+def test_rate_limited_job_requests_share_one_label(port, monkeypatch):
+    monkeypatch.setattr(server.rate_limiter, "rate_limit", 2)
+    monkeypatch.setattr(server.rate_limiter, "request_counts", {})
+    before = metrics.rate_limited_total.value("/api/jobs/{id}")
+    statuses = [request(port, "DELETE", f"/api/jobs/job{number}")[0].status for number in range(5)]
+    assert statuses.count(429) == 3
+    assert metrics.rate_limited_total.value("/api/jobs/{id}") == before + 3
+    exposition = metrics.render_metrics()
+    assert not any(f"/api/jobs/job{number}" in exposition for number in range(5))
+
+
+@pytest.mark.parametrize("path, body", [
+    ("/api/transcript", {"url": 123}),
+    ("/api/transcript", {"url": "dQw4w9WgXcQ", "language": ["en"]}),
+    ("/api/transcript", {"url": "dQw4w9WgXcQ", "group": {"by": "paragraphs"}}),
+    ("/api/transcript", {"url": "dQw4w9WgXcQ", "format": 1}),
+    ("/api/transcript/chunks", {"url": ["dQw4w9WgXcQ"]}),
+])
+def test_non_string_fields_are_rejected(port, upstream, path, body):
+    response, content = request(port, "POST", path, body=json.dumps(body))
+    assert response.status == 400
+    assert "must be a string" in json.loads(content)["detail"]
+
+
+def test_transcript_request(port, upstream):
+    response, content = request(port, "POST", "/api/transcript", body=json.dumps({"url": "dQw4w9WgXcQ"}))
+    assert response.status == 200
+    assert json.loads(content)["transcript"].startswith("[0:00] ")
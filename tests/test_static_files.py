@@ -0,0 +1,38 @@
+import pytest
+
+from api.utils.static_files import StaticFiles, accepts_gzip
+
+
+@pytest.mark.parametrize("header", [
+    "gzip",
+    "gzip, deflate, br",
+    "GZIP; q=0.5",
+    "x-gzip",
+    "*",
+    "br, *;q=0.1",
+])
+def test_accepts_gzip(header):
+    assert accepts_gzip(header)
+
+
+@pytest.mark.parametrize("header", [
+    "",
+    "deflate",
+    "identity",
+    "gzip;q=0",
+    "gzip; q=0.000",
+    "*;q=0",
+    "gzip;q=0, *",
+    "gzip;q=bad",
+])
+def test_refuses_gzip(header):
+    assert not accepts_gzip(header)
+
+
+@pytest.mark.parametrize("threshold, on_disk", [(100, True), (100000, False)])
+def test_gzip_variant_uses_the_configured_sendfile_threshold(tmp_path, threshold, on_disk):
+    (tmp_path / "app.js").write_text("let x = 1;\n" * 100)
+    (tmp_path / "app.js.gz").write_bytes(b"\x1f\x8b" + b"x" * 500)
+    asset = StaticFiles(str(tmp_path), preload=(), sendfile_min_bytes=threshold).get("/app.js")
+    assert (asset.identity.path is not None) == on_disk
+    assert (asset.gzipped.path is not None) == on_disk
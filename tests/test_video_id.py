@@ -0,0 +1,50 @@
+import pytest
+
+from api.utils.video_id import MAX_URL_LENGTH, parse_video_id
+
+VIDEO_ID = "dQw4w9WgXcQ"
+
+
+@pytest.mark.parametrize("url", [
+    VIDEO_ID,
+    f"  {VIDEO_ID}\n",
+    f"https://www.youtube.com/watch?v={VIDEO_ID}",
+    f"http://youtube.com/watch?v={VIDEO_ID}",
+    f"www.youtube.com/watch?v={VIDEO_ID}",
+    f"https://www.youtube.com/watch?feature=share&v={VIDEO_ID}&t=42s",
+    f"https://m.youtube.com/watch?v={VIDEO_ID}",
+    f"https://music.youtube.com/watch?v={VIDEO_ID}&list=PL1234567890",
+    f"https://www.youtube.com:443/watch?v={VIDEO_ID}",
+    f"https://youtu.be/{VIDEO_ID}",
+    f"https://youtu.be/{VIDEO_ID}?si=abcdef",
+    f"https://www.youtube.com/embed/{VIDEO_ID}?rel=0",
+    f"https://www.youtube-nocookie.com/embed/{VIDEO_ID}",
+    f"https://www.youtube.com/v/{VIDEO_ID}",
+    f"https://www.youtube.com/e/{VIDEO_ID}",
+    f"https://www.youtube.com/shorts/{VIDEO_ID}",
+    f"https://www.youtube.com/live/{VIDEO_ID}?feature=share",
+    f"https://www.youtube.com/user/somebody#p/a/u/1/{VIDEO_ID}",
+])
+def test_youtube_urls(url):
+    assert parse_video_id(url) == VIDEO_ID
+
+
+@pytest.mark.parametrize("url", [
+    None,
+    "",
+    "not a video",
+    f"https://evil.example/?v={VIDEO_ID}",
+    "https://vimeo.com/x?v=abcdefghijk",
+    f"https://youtube.com.evil.example/?v={VIDEO_ID}",
+    f"https://youtube.com@evil.example/?v={VIDEO_ID}",
+    f"https://evil.example/youtube.com/embed/{VIDEO_ID}",
+    f"https://notyoutu.be/{VIDEO_ID}",
+    f"v={VIDEO_ID}",
+    # IDs are exactly 11 characters
+    f"https://www.youtube.com/watch?v={VIDEO_ID}x",
+    "https://youtu.be/short",
+    VIDEO_ID + "x",
+    f"https://www.youtube.com/watch?v={VIDEO_ID}&pad=" + "x" * MAX_URL_LENGTH,
+])
+def test_not_youtube_videos(url):
+    assert parse_video_id(url) is None